@@ -1,13 +1,11 @@
 import tkinter as tk
 from tkinter import ttk, font, messagebox
+import logging
 import threading
 import socket
 import time
-import random
 import numpy as np
 import networkx as nx
-import hashlib
-import json
 import os
 
 import matplotlib
@@ -15,99 +13,138 @@ matplotlib.use("TkAgg")
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import matplotlib.pyplot as plt
 
+from auth import Authenticator
+from metrics import MetricsServer, WsnMetrics
+from protocol import ESP_CMD, PACKET_DTYPE, STREAM_CMD, StreamDecoder, decode_any
+from ringbuffer import RingBuffer
+from charts import BlitChartRenderer, TopologyRenderer
+from scheduler import UIScheduler
+from telemetry import TelemetryBus
+from sdn import DECISIONS, DecisionStream
+from energy import FIELD_SIZE, BatteryModel, route_energy
+from logview import BoundedTextLog, rotating_logger
+from montecarlo import MonteCarloComparison, process_pool
+from netsim import REROUTE_STEP, engine_tables
+from routing import DECISION_CLASS, RoutingEngine
+from topology import NODE_TYPES, generate_topology
+from tsstore import TimeSeriesStore
+from userstore import UserStore
+
+log = logging.getLogger(__name__)
 
 # ============================================================
 # USER DATABASE CONFIGURATION
 # ============================================================
-USER_DB_FILE = "users.json"
+USER_DB_FILE = os.path.join("data", "users.db")  # SQLite, indexed by username and email
+USER_LEGACY_FILE = "users.json"  # imported once into USER_DB_FILE on first start
+AUTH_COST = 14  # scrypt N = 2**AUTH_COST (~16 MiB, ~60 ms per hash); `python auth.py` to tune
+AUTH_WORKERS = 2  # logins verified in parallel, off the Tk thread
 
 # ============================================================
 # ESP32 CONFIGURATION
 # ============================================================
 ESP32_IP = "10.181.87.217"
 ESP32_PORT = 8080
-ESP_CMD = "READ_ALL\n"
+ESP32_MODE = "stream"  # "stream" (one long-lived connection) or "poll" (connect per reading)
+STREAM_RECONNECT_MIN = 0.5
+STREAM_RECONNECT_MAX = 10.0
 BUFFER = 250
+CHART_WINDOW = 150  # samples shown per realtime chart
+CHART_HISTORY = 0   # seconds; > 0 charts that span from the history store instead
+CHART_DOWNSAMPLE = "minmax"  # "minmax" (keeps spikes), "lttb" or None
+TOPOLOGY_RADIUS = None  # WSN link radius; None = density-aware (~10 neighbours per node)
+TOPOLOGY_MAX_NODES = 10_000  # upper end of the node-count slider
+COMPARE_TRAFFIC = dict(duration=30.0, rate=5.0)  # per sensor, for "Compare Networks"
+ENERGY_TIME_SCALE = 3600.0  # simulated seconds of battery drain per GUI second
+ENERGY_RATE = 1.0  # packets/s each topology sensor sends while batteries drain
+ENERGY_REROUTE_MAX = 128  # drained nodes re-weighed per energy step (largest drift first; ~50 ms at 10k nodes)
+COMPARE_REPLICATIONS = 32  # seeded runs per policy; bands are 95% confidence intervals
+COMPARE_POLICIES = {"SDN": "sdn", "Traditional": "shortest-hop", "Flooding": "flooding"}
+ESP32_DEVICE_ID = "esp32"
+GUI_FRAME_MS = 50  # every GUI update is batched into one Tk after() per frame
+SDN_LOG_ENTRIES = 200  # snapshots kept in the SDN log view
+SDN_LOG_FILE = os.path.join("data", "logs", "sdn-decisions.log")  # full history, rotated at 5 MB
+HISTORY_DIR = os.path.join("data", "history")  # one memory-mapped file per device per day
+METRICS_PORT = 9108  # Prometheus text format at http://127.0.0.1:9108/metrics; None = off
 
 # ============================================================
 # REALTIME DATA BUFFERS
 # ============================================================
-temp_buf, hum_buf = [], []
-hr_buf, spo2_buf = [], []
-lat_buf, thr_buf, jit_buf = [], [], []
+# Single writer (listener thread), many readers (GUI / SDN threads)
+temp_buf, hum_buf = RingBuffer(BUFFER, np.float32), RingBuffer(BUFFER, np.float32)
+hr_buf, spo2_buf = RingBuffer(BUFFER, np.float32), RingBuffer(BUFFER, np.float32)
+lat_buf, thr_buf, jit_buf = RingBuffer(BUFFER), RingBuffer(BUFFER), RingBuffer(BUFFER)
 
-_prev_lat = None
+# Full history on disk (batched writes, fsync on an interval); opened by
+# start_services(), not at import -- spawned worker processes
+# (Compare Networks) re-import this module
+history = None
 
-# PACKET COUNTERS
-packet_hr = 0
-packet_spo2 = 0
-packet_temp = 0
-packet_hum = 0
+# SDN decisions are made as packets arrive (see record_batch)
+decisions = DecisionStream(heartbeat=2.0)
+
+# Every parsed batch is published once; buffers, decisions and history
+# subscribe, and the GUI reads consistent snapshots (packet counts,
+# newest reading, connection state) instead of shared globals
+bus = TelemetryBus()
 
 # Connection tracking
-esp32_connected = False
-last_successful_data = 0
-popup_shown = False
 connection_timeout = 10  # seconds before showing disconnected
 
 
 # ============================================================
-# USER MANAGEMENT FUNCTIONS
+# METRICS
 # ============================================================
-def load_users():
-    """Load users from JSON file"""
-    if os.path.exists(USER_DB_FILE):
-        try:
-            with open(USER_DB_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
+# The ingestion and decision instruments are shared with the headless
+# controller (metrics.WsnMetrics); the listeners feed them per poll, chunk
+# and batch. Buffer fill is read from the ring buffers only when scraped.
+metrics = WsnMetrics().decisions(decisions)
+gui_frame_time = metrics.registry.histogram(
+    "wsn_gui_frame_seconds", "Time spent in one dashboard frame (updates + periodic tasks)")
+_realtime_buffers = {"temp": temp_buf, "hum": hum_buf, "hr": hr_buf, "spo2": spo2_buf,
+                     "lat": lat_buf, "thr": thr_buf, "jit": jit_buf}
+metrics.registry.callback(
+    "wsn_buffer_fill_ratio", "Fill level of the realtime ring buffers",
+    lambda: {(name,): len(buf) / buf.capacity for name, buf in _realtime_buffers.items()},
+    labels=["buffer"])
+metrics.registry.callback(
+    "wsn_subscriber_errors_total", "Telemetry bus callbacks that raised",
+    lambda: {(name,): n for name, n in dict(bus.errors).items()},
+    kind="counter", labels=["subscriber"])
+metrics_server = MetricsServer(metrics.registry, port=METRICS_PORT)
 
-def save_users(users):
-    """Save users to JSON file"""
-    with open(USER_DB_FILE, 'w') as f:
-        json.dump(users, f, indent=4)
-
-def hash_password(password):
-    """Hash password using SHA-256"""
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def register_user(username, password, email):
-    """Register a new user"""
-    users = load_users()
-    
-    if username in users:
-        return False, "Username already exists!"
-    
-    if len(password) < 6:
-        return False, "Password must be at least 6 characters!"
-    
-    users[username] = {
-        'password': hash_password(password),
-        'email': email,
-        'created_at': time.strftime("%Y-%m-%d %H:%M:%S"),
-        'last_login': None
-    }
-    
-    save_users(users)
-    return True, "Registration successful!"
 
-def login_user(username, password):
-    """Authenticate user"""
-    users = load_users()
-    
-    if username not in users:
-        return False, "Invalid username or password!"
-    
-    if users[username]['password'] != hash_password(password):
-        return False, "Invalid username or password!"
-    
-    # Update last login time
-    users[username]['last_login'] = time.strftime("%Y-%m-%d %H:%M:%S")
-    save_users(users)
-    
-    return True, "Login successful!"
+# ============================================================
+# USER MANAGEMENT FUNCTIONS
+# ============================================================
+# Lookups are served from an in-memory cache; last_login stamps are
+# written in batches by the store's flush thread. Password checks (scrypt;
+# legacy SHA-256 hashes are upgraded at login) run on a worker pool and
+# come back as futures of (ok, message). Both are opened by start_services().
+users = None
+auth = None
+
+
+def start_services():
+    """Open the user store, the auth pool and the history store (idempotent)"""
+    global users, auth, history
+    if users is None:
+        users = UserStore(USER_DB_FILE, legacy_json=USER_LEGACY_FILE)
+        users.start()
+        auth = Authenticator(users, cost=AUTH_COST, workers=AUTH_WORKERS)
+    if history is None:
+        history = TimeSeriesStore(HISTORY_DIR)
+
+
+def stop_services():
+    global users, auth, history
+    if auth is not None:
+        auth.shutdown()
+        users.close()
+        users = auth = None
+    if history is not None:
+        history.close()
+        history = None
 
 
 # ============================================================
@@ -149,6 +186,9 @@ class AuthScreen:
         # Store current user
         self.current_user = None
 
+        # Auth results arrive on the auth pool thread; hand them to Tk here
+        self.scheduler = UIScheduler(self.root).start()
+
     def setup_left_panel(self):
         """Setup the left brand/info panel"""
         # Logo and brand area
@@ -309,7 +349,7 @@ class AuthScreen:
         forgot_btn.bind("<Button-1>", lambda e: self.show_forgot_password())
         
         # Login button
-        login_btn = tk.Button(login_frame, text="Sign In", 
+        self.login_btn = login_btn = tk.Button(login_frame, text="Sign In", 
                              font=self.button_font, bg='#6f42c1', 
                              fg='white', relief='flat', cursor='hand2',
                              activebackground='#7952b3', 
@@ -422,7 +462,7 @@ class AuthScreen:
         terms_link.pack(side='left')
         
         # Register button
-        register_btn = tk.Button(register_frame, text="Create Account", 
+        self.register_btn = register_btn = tk.Button(register_frame, text="Create Account", 
                                 font=self.button_font, bg='#6f42c1', 
                                 fg='white', relief='flat', cursor='hand2',
                                 activebackground='#7952b3', 
@@ -452,7 +492,21 @@ class AuthScreen:
             messagebox.showerror("Error", "Please fill in all fields!")
             return
         
-        success, message = login_user(username, password)
+        # Verified on the auth pool; the button stays disabled until it answers
+        self.login_btn.config(state='disabled')
+        auth.login(username, password).add_done_callback(
+            lambda f: self.scheduler.post(self.finish_login, username, f))
+
+    def finish_login(self, username, future):
+        """Show the login result (Tk thread)"""
+        try:
+            self.login_btn.config(state='normal')
+        except tk.TclError:
+            pass  # the form was switched while the check ran
+        try:
+            success, message = future.result()
+        except Exception as e:
+            success, message = False, f"Login failed: {e}"
         
         if success:
             self.current_user = username
@@ -482,7 +536,20 @@ class AuthScreen:
             messagebox.showerror("Error", "Please agree to the Terms & Conditions!")
             return
         
-        success, message = register_user(username, password, email)
+        self.register_btn.config(state='disabled')
+        auth.register(username, password, email).add_done_callback(
+            lambda f: self.scheduler.post(self.finish_register, f))
+
+    def finish_register(self, future):
+        """Show the registration result (Tk thread)"""
+        try:
+            self.register_btn.config(state='normal')
+        except tk.TclError:
+            pass  # the form was switched while the check ran
+        try:
+            success, message = future.result()
+        except Exception as e:
+            success, message = False, f"Registration failed: {e}"
         
         if success:
             messagebox.showinfo("Success", message)
@@ -525,14 +592,12 @@ class AuthScreen:
                 messagebox.showerror("Error", "Please enter your email!", parent=dialog)
                 return
             
-            users = load_users()
-            for user, data in users.items():
-                if data['email'] == email:
-                    messagebox.showinfo("Success", 
-                                      f"Password reset instructions sent to:\n{email}", 
-                                      parent=dialog)
-                    dialog.destroy()
-                    return
+            if users.find_by_email(email) is not None:
+                messagebox.showinfo("Success", 
+                                  f"Password reset instructions sent to:\n{email}", 
+                                  parent=dialog)
+                dialog.destroy()
+                return
             
             messagebox.showerror("Error", "Email not found!", parent=dialog)
         
@@ -550,38 +615,69 @@ class AuthScreen:
 
     def open_dashboard(self):
         """Open the main dashboard"""
+        self.scheduler.stop()
         self.root.destroy()  # Close auth window
         start_main_app(self.current_user)  # Start main app with logged in user
 
 
 # ============================================================
-# PARSE SENSOR PACKET
+# ESP32 LISTENER THREAD
 # ============================================================
-def parse_packet(line):
-    vals = {"TEMP": None, "HUM": None, "HR": None, "SPO2": None}
+def record_batch(records, latency, nbytes, arrival=None):
+    """Publish parsed packets (PACKET_DTYPE array) + link metrics on the
+    telemetry bus (arrival: perf_counter()); False if there were none"""
+    return bus.publish(ESP32_DEVICE_ID, records, latency, nbytes, arrival) is not None
 
-    try:
-        for p in line.strip().split("|"):
-            if ":" in p:
-                key, val = p.split(":")
-                if key in vals:
-                    vals[key] = float(val)
-    except:
-        pass
 
-    return vals
+@bus.subscribe
+def buffer_record(rec):
+    """Realtime buffers (single writer: the publishing listener thread)"""
+    p = rec.packets
+    temp_buf.extend(p["temp"], rec.ts)
+    hum_buf.extend(p["hum"], rec.ts)
+    hr_buf.extend(p["hr"], rec.ts)
+    spo2_buf.extend(p["spo2"], rec.ts)
+    lat_buf.append(rec.latency_ms, rec.ts)
+    if not np.isnan(rec.jitter):
+        jit_buf.append(rec.jitter, rec.ts)
+    thr_buf.append(rec.throughput, rec.ts)
+
+
+def decide_record(rec):
+    """Subscribed only while the SDN controller runs (see App.start_sdn), so
+    nothing queues up undecided in between"""
+    decisions.submit(rec.device_id, rec.packets, rec.arrival)
+
+
+@bus.subscribe
+def count_record(rec):
+    """Packets and valid readings per sensor for /metrics"""
+    metrics.record(rec.device_id, rec.packets)
+
+
+def reject(count):
+    """Count packets that failed to parse (bus snapshot and /metrics)"""
+    bus.reject(ESP32_DEVICE_ID, count)
+    metrics.reject(ESP32_DEVICE_ID, count)
+
+
+@bus.subscribe
+def persist_record(rec):
+    """Stage for the history store (flushed on its own thread)"""
+    p = rec.packets
+    history.append_batch(rec.device_id, {
+        "ts": np.full(rec.n, rec.ts), "temp": p["temp"], "hum": p["hum"],
+        "hr": p["hr"], "spo2": p["spo2"],
+        "lat": rec.latency_ms, "thr": rec.throughput, "jit": rec.jitter})
+
+
+_esp_connect_failures = metrics.connect_failures.labels(ESP32_DEVICE_ID)
+_esp_poll_latency = metrics.poll_latency.labels(ESP32_DEVICE_ID)
+_esp_stream_gap = metrics.stream_gap.labels(ESP32_DEVICE_ID)
 
 
-# ============================================================
-# ESP32 LISTENER THREAD
-# ============================================================
 def esp32_listener():
-    global _prev_lat, packet_hr, packet_spo2, packet_temp, packet_hum
-    global esp32_connected, last_successful_data, popup_shown
-    
     while True:
-        data_received = False
-        
         try:
             start = time.time()
 
@@ -589,72 +685,103 @@ def esp32_listener():
             s.settimeout(3)  # 3 second timeout
             s.connect((ESP32_IP, ESP32_PORT))
             s.send(ESP_CMD.encode())
-            raw = s.recv(1024).decode()
+            # The sketch closes the socket after its packet; keep every line
+            raw = b""
+            while len(raw) < 65536:
+                chunk = s.recv(4096)
+                if not chunk:
+                    break
+                raw += chunk
             s.close()
+            arrival = time.perf_counter()
 
-            line = next((x for x in raw.split("\n") if "TEMP:" in x), "")
-            vals = parse_packet(line)
-
-            # Append data + count packets
-            if vals["TEMP"] is not None:
-                temp_buf.append(vals["TEMP"])
-                packet_temp += 1
-                data_received = True
-
-            if vals["HUM"] is not None:
-                hum_buf.append(vals["HUM"])
-                packet_hum += 1
-                data_received = True
-
-            if vals["HR"] is not None:
-                hr_buf.append(vals["HR"])
-                packet_hr += 1
-                data_received = True
-
-            if vals["SPO2"] is not None:
-                spo2_buf.append(vals["SPO2"])
-                packet_spo2 += 1
-                data_received = True
-
-            # NETWORK METRICS
-            if data_received:
-                latency = (time.time() - start) * 1000
-                lat_buf.append(latency)
-
-                if _prev_lat is not None:
-                    jitter = abs(latency - _prev_lat)
-                    jit_buf.append(jitter)
-                _prev_lat = latency
-
-                thr_buf.append(len(raw) * 8 / ((latency / 1000) + 0.001))
-
-                # Trim buffers
-                for b in (temp_buf, hum_buf, hr_buf, spo2_buf, lat_buf, thr_buf, jit_buf):
-                    if len(b) > BUFFER:
-                        b.pop(0)
-                
-                # Update last successful data time
-                last_successful_data = time.time()
-                
-                # If ESP32 was not connected, now it is
-                if not esp32_connected:
-                    esp32_connected = True
-                    popup_shown = False
-                
-        except Exception as e:
+            latency = time.time() - start
+            _esp_poll_latency.observe(latency)
+
+            records, bad = decode_any(raw)
+            reject(bad)
+            record_batch(records, latency * 1000, len(raw), arrival)
+
+        except OSError:
             # Connection failed
-            pass
-        
-        # Check if we should show disconnected popup
-        if esp32_connected:
-            time_since_last_data = time.time() - last_successful_data
-            if time_since_last_data > connection_timeout:
-                esp32_connected = False
-                popup_shown = False
-        
+            _esp_connect_failures.inc()
+        except Exception:
+            # Reply could not be processed
+            reject(1)
+
         time.sleep(1)
 
 
+def esp32_stream_listener():
+    """Keep one connection open and decode every packet it carries.
+
+    Text lines and binary frames are both accepted (auto-detected per
+    connection). Latency here is the gap between packets, since there is
+    no per-sample request to time. Reconnects with exponential backoff.
+    """
+    backoff = STREAM_RECONNECT_MIN
+    parser = StreamDecoder()
+    while True:
+        s = None
+        try:
+            s = socket.create_connection((ESP32_IP, ESP32_PORT), timeout=3)
+            s.send(STREAM_CMD.encode())
+            parser.reset()
+            last = time.time()
+            prev_chunk = time.perf_counter()
+
+            while True:
+                chunk = s.recv(4096)
+                if not chunk:
+                    break
+                arrival = time.perf_counter()
+                now = time.time()
+                _esp_stream_gap.observe(arrival - prev_chunk)
+                prev_chunk = arrival
+                records, bad = parser.feed(chunk)
+                reject(bad)
+                if len(records):
+                    gap = (now - last) * 1000 / len(records)
+                    if record_batch(records, gap, len(chunk), arrival):
+                        backoff = STREAM_RECONNECT_MIN
+                    last = now
+        except OSError:
+            # Connection failed, dropped or went quiet for 3 s
+            _esp_connect_failures.inc()
+        except Exception:
+            # Anything else must not end the thread: reconnect after the backoff
+            log.exception("ESP32 stream listener failed")
+        finally:
+            if s is not None:
+                s.close()
+
+        time.sleep(backoff)
+        backoff = min(backoff * 2, STREAM_RECONNECT_MAX)
+
+
+_listener = None
+
+
+def start_listener():
+    """Start the ESP32 listener thread for ESP32_MODE (idempotent)"""
+    global _listener
+    if _listener is None or not _listener.is_alive():
+        target = esp32_stream_listener if ESP32_MODE == "stream" else esp32_listener
+        _listener = threading.Thread(target=target, daemon=True)
+        _listener.start()
+    return _listener
+
+
+def start_metrics():
+    """Serve /metrics on METRICS_PORT (idempotent; skipped if the port is taken)"""
+    if METRICS_PORT is None:
+        return None
+    try:
+        return metrics_server.start()
+    except OSError:
+        return None
+
+
 # ============================================================
 # ENHANCED STYLED CARD WIDGET
 # ============================================================
@@ -745,6 +872,15 @@ class App:
         # Card references
         self.cards = {}
         
+        # One after() chain runs every periodic task and every update posted
+        # by the worker threads; it exists before the tabs, whose first
+        # comparison already posts its results to it
+        self.running = True
+        self.sdn_active = False
+        self.scheduler = UIScheduler(self.root, GUI_FRAME_MS, on_frame=gui_frame_time.observe)
+        self.comparison = None
+        self.compare_pool = None        # worker processes, shared by every comparison
+        
         self.layout()
         self.sidebar()
         self.tabs()
@@ -752,12 +888,15 @@ class App:
         # Initialize cards
         self.initialize_monitor_cards()
         
-        # Start ESP32 listener thread
-        threading.Thread(target=esp32_listener, daemon=True).start()
+        # Start ESP32 listener thread (once per process; it outlives logouts)
+        start_listener()
+        start_metrics()
+        history.start()
         
-        # Schedule updates in main thread
-        self.running = True
-        self.schedule_updates()
+        self.scheduler.every("gui", 1.0, self.update_gui)
+        self.energy_errors = 0
+        self.scheduler.every("energy", 1.0, self.update_energy)
+        self.scheduler.start()
 
     # --------------------------------------------------------
     def layout(self):
@@ -881,6 +1020,14 @@ class App:
         """Logout and return to auth screen"""
         if messagebox.askyesno("Logout", "Are you sure you want to logout?"):
             self.running = False
+            self.scheduler.stop()
+            bus.unsubscribe(decide_record)
+            decisions.stop()
+            decisions.on_decision = None
+            self.stop_comparisons()
+            history.flush()
+            history.sync()
+            users.flush()
             self.root.destroy()
             start_auth_screen()
 
@@ -916,6 +1063,7 @@ class App:
         self.tabs.add(self.tab_compare, text="Network Comparison")
         self.tabs.add(self.tab_topology, text="Network Topology")
         self.tabs.add(self.tab_sdn, text="SDN Controller")
+        self.tabs.bind("<<NotebookTabChanged>>", self.on_tab_changed)
         
         self.monitor_tab()
         self.compare_tab()
@@ -1008,76 +1156,52 @@ class App:
         canvas_widget = self.canvas.get_tk_widget()
         canvas_widget.pack(fill="both", expand=True, padx=20, pady=20)
 
-    # --------------------------------------------------------
-    # SCHEDULE UPDATES SAFELY
-    # --------------------------------------------------------
-    def schedule_updates(self):
-        """Schedule updates using after() method for thread safety"""
-        if not self.running:
-            return
-            
-        try:
-            self.update_gui()
-            # Schedule next update if window still exists
-            self.root.after(1000, self.schedule_updates)
-        except:
-            # Window destroyed, stop updates
-            pass
-    
+        # Lines are created once and blitted on every update
+        self.chart_renderer = BlitChartRenderer(self.canvas, [
+            (self.ax[0][0], "Heart Rate (BPM)", '#7e57c2'),
+            (self.ax[0][1], "SpO₂ (%)", '#5e35b1'),
+            (self.ax[1][0], "Temperature (°C)", '#4527a0'),
+            (self.ax[1][1], "Humidity (%)", '#9575cd'),
+            (self.ax[2][0], "Latency (ms)", '#b39ddb'),
+            (self.ax[2][1], "Throughput (bps)", '#d1c4e9'),
+        ], window=CHART_WINDOW, downsample=CHART_DOWNSAMPLE,
+           xlim=(-CHART_HISTORY, 0) if CHART_HISTORY else None)
+        self.chart_history_last = None  # newest history ts charted (CHART_HISTORY mode)
+
     def update_gui(self):
         """Update GUI elements - called from main thread"""
         try:
-            # Update card values
-            if hr_buf:
-                self.hr_card.safe_update_value(f"{hr_buf[-1]:.1f}")
+            # Card values and status from one snapshot (all from the same packet)
+            snap = bus.snapshot()
+            rec = snap.latest.get(ESP32_DEVICE_ID)
+            if rec is not None:
+                temp, hum, hr, spo2 = rec.last
+                self.hr_card.safe_update_value(f"{hr:.1f}")
+                self.spo2_card.safe_update_value(f"{spo2:.1f}")
+                self.temp_card.safe_update_value(f"{temp:.1f}")
+                self.hum_card.safe_update_value(f"{hum:.1f}")
+                self.lat_card.safe_update_value(f"{rec.latency_ms:.1f}")
+                self.thr_card.safe_update_value(f"{rec.throughput:.0f}")
             else:
-                self.hr_card.safe_update_value("--")
-                
-            if spo2_buf:
-                self.spo2_card.safe_update_value(f"{spo2_buf[-1]:.1f}")
-            else:
-                self.spo2_card.safe_update_value("--")
-                
-            if temp_buf:
-                self.temp_card.safe_update_value(f"{temp_buf[-1]:.1f}")
-            else:
-                self.temp_card.safe_update_value("--")
-                
-            if hum_buf:
-                self.hum_card.safe_update_value(f"{hum_buf[-1]:.1f}")
-            else:
-                self.hum_card.safe_update_value("--")
-                
-            if lat_buf:
-                self.lat_card.safe_update_value(f"{lat_buf[-1]:.1f}")
-            else:
-                self.lat_card.safe_update_value("--")
-                
-            if thr_buf:
-                self.thr_card.safe_update_value(f"{thr_buf[-1]:.0f}")
-            else:
-                self.thr_card.safe_update_value("--")
+                for card in (self.hr_card, self.spo2_card, self.temp_card,
+                             self.hum_card, self.lat_card, self.thr_card):
+                    card.safe_update_value("--")
             
             # Update status indicators
-            time_since_last_data = time.time() - last_successful_data
+            time_since_last_data = snap.age(ESP32_DEVICE_ID)
             
-            if esp32_connected:
-                if time_since_last_data < 5:
-                    self.conn_status.config(text="● ESP32: CONNECTED", fg='#a5d6a7')
-                    self.data_status.config(text="● Data: STREAMING", fg='#a5d6a7')
-                elif time_since_last_data < connection_timeout:
-                    self.conn_status.config(text="● ESP32: CONNECTED", fg='#ffcc80')
-                    self.data_status.config(text="● Data: INTERMITTENT", fg='#ffcc80')
-                else:
-                    self.conn_status.config(text="● ESP32: DISCONNECTED", fg='#ef9a9a')
-                    self.data_status.config(text="● Data: NO SIGNAL", fg='#ef9a9a')
+            if rec is None:
+                self.conn_status.config(text="● ESP32: CONNECTING...", fg='#ffcc80')
+                self.data_status.config(text="● Data: WAITING", fg='#ef9a9a')
+            elif time_since_last_data < 5:
+                self.conn_status.config(text="● ESP32: CONNECTED", fg='#a5d6a7')
+                self.data_status.config(text="● Data: STREAMING", fg='#a5d6a7')
+            elif time_since_last_data <= connection_timeout:
+                self.conn_status.config(text="● ESP32: CONNECTED", fg='#ffcc80')
+                self.data_status.config(text="● Data: INTERMITTENT", fg='#ffcc80')
             else:
-                if time_since_last_data < 2:
-                    self.conn_status.config(text="● ESP32: CONNECTING...", fg='#ffcc80')
-                    self.data_status.config(text="● Data: CHECKING", fg='#ffcc80')
-                else:
-                    self.conn_status.config(text="● ESP32: DISCONNECTED", fg='#ef9a9a')
-                    self.data_status.config(text="● Data: WAITING", fg='#ef9a9a')
+                self.conn_status.config(text="● ESP32: DISCONNECTED", fg='#ef9a9a')
+                self.data_status.config(text="● Data: NO SIGNAL", fg='#ef9a9a')
             
             # Update charts
             self.update_charts()
@@ -1089,49 +1213,24 @@ class App:
     def update_charts(self):
         """Update the charts"""
         try:
-            self.ax[0][0].clear()
-            if hr_buf:
-                self.ax[0][0].plot(hr_buf[-150:], color='#7e57c2', linewidth=2.5)
-            self.ax[0][0].set_title("Heart Rate (BPM)", fontweight='bold', color='#5e35b1', fontsize=11)
-            self.ax[0][0].grid(True, alpha=0.2, linestyle='--', color='#b39ddb')
-            self.ax[0][0].set_facecolor('#ede7f6')
-            
-            self.ax[0][1].clear()
-            if spo2_buf:
-                self.ax[0][1].plot(spo2_buf[-150:], color='#5e35b1', linewidth=2.5)
-            self.ax[0][1].set_title("SpO₂ (%)", fontweight='bold', color='#5e35b1', fontsize=11)
-            self.ax[0][1].grid(True, alpha=0.2, linestyle='--', color='#b39ddb')
-            self.ax[0][1].set_facecolor('#ede7f6')
-            
-            self.ax[1][0].clear()
-            if temp_buf:
-                self.ax[1][0].plot(temp_buf[-150:], color='#4527a0', linewidth=2.5)
-            self.ax[1][0].set_title("Temperature (°C)", fontweight='bold', color='#5e35b1', fontsize=11)
-            self.ax[1][0].grid(True, alpha=0.2, linestyle='--', color='#b39ddb')
-            self.ax[1][0].set_facecolor('#ede7f6')
-            
-            self.ax[1][1].clear()
-            if hum_buf:
-                self.ax[1][1].plot(hum_buf[-150:], color='#9575cd', linewidth=2.5)
-            self.ax[1][1].set_title("Humidity (%)", fontweight='bold', color='#5e35b1', fontsize=11)
-            self.ax[1][1].grid(True, alpha=0.2, linestyle='--', color='#b39ddb')
-            self.ax[1][1].set_facecolor('#ede7f6')
-            
-            self.ax[2][0].clear()
-            if lat_buf:
-                self.ax[2][0].plot(lat_buf[-150:], color='#b39ddb', linewidth=2.5)
-            self.ax[2][0].set_title("Latency (ms)", fontweight='bold', color='#5e35b1', fontsize=11)
-            self.ax[2][0].grid(True, alpha=0.2, linestyle='--', color='#b39ddb')
-            self.ax[2][0].set_facecolor('#ede7f6')
-            
-            self.ax[2][1].clear()
-            if thr_buf:
-                self.ax[2][1].plot(thr_buf[-150:], color='#d1c4e9', linewidth=2.5)
-            self.ax[2][1].set_title("Throughput (bps)", fontweight='bold', color='#5e35b1', fontsize=11)
-            self.ax[2][1].grid(True, alpha=0.2, linestyle='--', color='#b39ddb')
-            self.ax[2][1].set_facecolor('#ede7f6')
-            
-            self.canvas.draw()
+            if CHART_HISTORY:
+                # Hours of samples: zero-copy views, downsampled by the renderer
+                # only once the store has published a newer row
+                now = time.time()
+                cols = history.read(ESP32_DEVICE_ID, now - CHART_HISTORY, now + 1)
+                last = cols["ts"][-1] if len(cols["ts"]) else None
+                if last == self.chart_history_last:
+                    return
+                self.chart_history_last = last
+                ago = cols["ts"] - now
+                self.chart_renderer.update([(ago, cols[name]) for name in
+                                            ("hr", "spo2", "temp", "hum", "lat", "thr")])
+                return
+            self.chart_renderer.update([
+                hr_buf.window(CHART_WINDOW), spo2_buf.window(CHART_WINDOW),
+                temp_buf.window(CHART_WINDOW), hum_buf.window(CHART_WINDOW),
+                lat_buf.window(CHART_WINDOW), thr_buf.window(CHART_WINDOW),
+            ])
         except:
             pass
 
@@ -1145,57 +1244,74 @@ class App:
         canvas = FigureCanvasTkAgg(fig, master=self.tab_compare)
         canvas.get_tk_widget().pack(fill="both", expand=True, padx=20, pady=20)
         
-        # Initial comparison
+        # Initial comparison (replications run in worker processes)
+        self.comparison = None
         self.compare()
 
     def compare(self):
-        t, thr_sdn, lat_sdn, e_sdn = simulate("SDN")
-        t, thr_tr, lat_tr, e_tr = simulate("Traditional")
-
-        colors = {'SDN': '#7e57c2', 'Traditional': '#ff9800'}  # Purple vs Orange
-        
-        for ax in self.cax:
+        """Start seeded replications on the current topology; bands fill in as they finish"""
+        if self.comparison is not None:
+            self.comparison.cancel()
+        topo = getattr(self, 'topology', None)
+        engine = getattr(self, 'routing', None)
+        if topo is None:
+            topo, engine = generate_topology(25, radius=TOPOLOGY_RADIUS), None
+        # A private copy for the workers, at the current drained battery
+        # levels; SDN tables are taken from the live engine here, on the Tk
+        # thread that also updates it
+        topo = topo.copy()
+        if engine is not None:
+            topo.battery = self.batteries.percent()
+        if self.compare_pool is None:
+            self.compare_pool = process_pool()
+        comparison = MonteCarloComparison(topo, policies=list(COMPARE_POLICIES.values()),
+                                          replications=COMPARE_REPLICATIONS, engine=engine,
+                                          pool=self.compare_pool, **COMPARE_TRAFFIC)
+        self.comparison = comparison
+
+        def on_update(summary):
+            if self.running and self.comparison is comparison:
+                self.scheduler.post(self.draw_comparison, comparison, summary, key="comparison")
+
+        comparison.start(on_update)
+
+    def stop_comparisons(self):
+        """Cancel the running comparison and shut the worker pool down"""
+        if self.comparison is not None:
+            self.comparison.cancel()
+        if self.compare_pool is not None:
+            self.compare_pool.shutdown(wait=False, cancel_futures=True)
+            self.compare_pool = None
+
+    def draw_comparison(self, comparison, summary):
+        if self.comparison is not comparison:
+            return                          # a newer comparison was started
+        colors = {'SDN': '#7e57c2', 'Traditional': '#ff9800', 'Flooding': '#8d6e63'}  # Purple vs Orange
+        styles = {'SDN': '-', 'Traditional': '--', 'Flooding': ':'}
+        panels = (("throughput_kbps", "Throughput Comparison", "Throughput (kbps)"),
+                  ("latency_ms", "Latency Comparison", "Latency (ms)"),
+                  ("energy_mj", "Energy Consumption", "Energy Used (mJ)"))
+        runs = f"{comparison.completed}/{comparison.total} runs"
+
+        for ax, (key, title, ylabel) in zip(self.cax, panels):
+            ax.clear()
+            for name, policy in COMPARE_POLICIES.items():
+                entry = summary[policy]
+                mean, lo, hi = entry["series"][key]
+                ax.plot(entry["t"], mean, label=f"{name} (PDR {entry['pdr'][0]:.1%})",
+                        color=colors[name], linewidth=3, linestyle=styles[name])
+                ax.fill_between(entry["t"], lo, hi, color=colors[name], alpha=0.2, linewidth=0)
+            ax.set_title(f"{title} ({runs})", fontweight='bold', color='#5e35b1', fontsize=12)
+            ax.set_xlabel("Time (s)", color='#5e35b1')
+            ax.set_ylabel(ylabel, color='#5e35b1')
+            ax.legend(framealpha=0.9, facecolor='white')
+            ax.grid(True, alpha=0.2, linestyle='--', color='#b39ddb')
             ax.set_facecolor('#ede7f6')
-            ax.spines['bottom'].set_color('#b39ddb')
-            ax.spines['top'].set_color('#b39ddb')
-            ax.spines['right'].set_color('#b39ddb')
-            ax.spines['left'].set_color('#b39ddb')
+            for spine in ax.spines.values():
+                spine.set_color('#b39ddb')
             ax.tick_params(colors='#5e35b1')
-        
-        self.cax[0].clear()
-        self.cax[0].plot(t, thr_sdn, label="SDN", color=colors['SDN'], linewidth=3, marker='o', markersize=4)
-        self.cax[0].plot(t, thr_tr, label="Traditional", color=colors['Traditional'], 
-                        linewidth=3, linestyle='--', marker='s', markersize=4)
-        self.cax[0].set_title("Throughput Comparison", fontweight='bold', color='#5e35b1', fontsize=12)
-        self.cax[0].set_xlabel("Time (s)", color='#5e35b1')
-        self.cax[0].set_ylabel("Throughput", color='#5e35b1')
-        self.cax[0].legend(framealpha=0.9, facecolor='white')
-        self.cax[0].grid(True, alpha=0.2, linestyle='--', color='#b39ddb')
-        self.cax[0].set_facecolor('#ede7f6')
-        
-        self.cax[1].clear()
-        self.cax[1].plot(t, lat_sdn, label="SDN", color=colors['SDN'], linewidth=3, marker='o', markersize=4)
-        self.cax[1].plot(t, lat_tr, label="Traditional", color=colors['Traditional'], 
-                        linewidth=3, linestyle='--', marker='s', markersize=4)
-        self.cax[1].set_title("Latency Comparison", fontweight='bold', color='#5e35b1', fontsize=12)
-        self.cax[1].set_xlabel("Time (s)", color='#5e35b1')
-        self.cax[1].set_ylabel("Latency (ms)", color='#5e35b1')
-        self.cax[1].legend(framealpha=0.9, facecolor='white')
-        self.cax[1].grid(True, alpha=0.2, linestyle='--', color='#b39ddb')
-        self.cax[1].set_facecolor('#ede7f6')
-        
-        self.cax[2].clear()
-        self.cax[2].plot(t, e_sdn, label="SDN", color=colors['SDN'], linewidth=3, marker='o', markersize=4)
-        self.cax[2].plot(t, e_tr, label="Traditional", color=colors['Traditional'], 
-                        linewidth=3, linestyle='--', marker='s', markersize=4)
-        self.cax[2].set_title("Energy Consumption", fontweight='bold', color='#5e35b1', fontsize=12)
-        self.cax[2].set_xlabel("Time (s)", color='#5e35b1')
-        self.cax[2].set_ylabel("Energy Level", color='#5e35b1')
-        self.cax[2].legend(framealpha=0.9, facecolor='white')
-        self.cax[2].grid(True, alpha=0.2, linestyle='--', color='#b39ddb')
-        self.cax[2].set_facecolor('#ede7f6')
-        
-        self.cax[0].figure.canvas.draw()
+
+        self.cax[0].figure.canvas.draw_idle()
 
     # --------------------------------------------------------
     # ENHANCED NETWORK TOPOLOGY TAB
@@ -1215,7 +1331,7 @@ class App:
                   command=self.show_topology).pack(side='left')
         
         self.node_count = tk.IntVar(value=25)
-        tk.Scale(control_frame, from_=10, to=50, variable=self.node_count,
+        tk.Scale(control_frame, from_=10, to=TOPOLOGY_MAX_NODES, variable=self.node_count,
                 orient='horizontal', label="Node Count:",
                 bg='#f5f1fe', fg='#5e35b1',
                 troughcolor='#d1c4e9',
@@ -1225,6 +1341,9 @@ class App:
         # Create figure with purple theme
         self.topology_fig = plt.figure(figsize=(10, 8), facecolor='#f5f1fe')
         self.taxa = self.topology_fig.add_subplot(111)
+        self.topology_view = TopologyRenderer(self.taxa)
+        self.route_artists = []
+        self.topology_fig.tight_layout()
         
         canvas = FigureCanvasTkAgg(self.topology_fig, master=self.topology_frame)
         canvas.get_tk_widget().pack(fill='both', expand=True)
@@ -1234,81 +1353,113 @@ class App:
 
     def show_topology(self):
         nodes = self.node_count.get()
-        G, pos, battery, node_types, traffic_load, node_colors = generate_enhanced_topology(nodes)
-        
-        self.taxa.clear()
-        self.taxa.set_facecolor('#ede7f6')
-        
-        # Draw edges with purple gradient
-        for (u, v) in G.edges():
-            edge_load = (traffic_load[u] + traffic_load[v]) / 2
-            width = 1 + edge_load * 4
-            alpha = 0.3 + edge_load * 0.4
-            nx.draw_networkx_edges(G, pos, edgelist=[(u, v)], 
-                                  width=width, alpha=alpha, edge_color='#9575cd',
-                                  style='dashed' if edge_load < 0.5 else 'solid',
-                                  ax=self.taxa)
-        
-        # Draw nodes with purple color scheme
-        node_sizes = []
-        node_edge_colors = []
-        for node in G.nodes():
-            if node_types[node] == 'sensor':
-                node_sizes.append(400)
-                node_edge_colors.append('#5e35b1')
-            elif node_types[node] == 'router':
-                node_sizes.append(600)
-                node_edge_colors.append('#4527a0')
-            elif node_types[node] == 'gateway':
-                node_sizes.append(900)
-                node_edge_colors.append('#311b92')
-            else:  # controller
-                node_sizes.append(1200)
-                node_edge_colors.append('#1a237e')
-        
-        # Use purple colormap
-        scatter = nx.draw_networkx_nodes(G, pos, node_color=node_colors,
-                                        node_size=node_sizes,
-                                        cmap=plt.cm.Purples,
-                                        alpha=0.9,
-                                        edgecolors=node_edge_colors,
-                                        linewidths=2,
-                                        ax=self.taxa)
-        
-        # Add node labels
-        labels = {node: f"{battery[node]}%" for node in G.nodes()}
-        nx.draw_networkx_labels(G, pos, labels, font_size=9, 
-                               font_weight='bold', font_color='#311b92', ax=self.taxa)
-        
-        # Add legend with purple theme
-        legend_elements = [
-            plt.Line2D([0], [0], marker='o', color='w', label='Sensor',
-                      markerfacecolor='#b39ddb', markersize=12, markeredgecolor='#5e35b1', markeredgewidth=2),
-            plt.Line2D([0], [0], marker='o', color='w', label='Router',
-                      markerfacecolor='#9575cd', markersize=12, markeredgecolor='#4527a0', markeredgewidth=2),
-            plt.Line2D([0], [0], marker='o', color='w', label='Gateway',
-                      markerfacecolor='#7e57c2', markersize=12, markeredgecolor='#311b92', markeredgewidth=2),
-            plt.Line2D([0], [0], marker='*', color='w', label='Controller',
-                      markerfacecolor='#5e35b1', markersize=15, markeredgecolor='#1a237e', markeredgewidth=2)
-        ]
-        self.taxa.legend(handles=legend_elements, loc='upper right', 
-                        facecolor='#f5f1fe', edgecolor='#d1c4e9', framealpha=0.9)
-        
-        self.taxa.set_title("Wireless Sensor Network Topology", 
-                           fontweight='bold', fontsize=14, color='#5e35b1', pad=20)
-        self.taxa.grid(True, alpha=0.1, color='#b39ddb')
-        
-        # Add colorbar for traffic load with purple theme
-        sm = plt.cm.ScalarMappable(cmap=plt.cm.Purples, 
-                                  norm=plt.Normalize(vmin=0, vmax=1))
-        sm.set_array([])
-        cbar = self.topology_fig.colorbar(sm, ax=self.taxa, shrink=0.8)
-        cbar.set_label('Traffic Load', rotation=270, labelpad=20, color='#5e35b1', fontweight='bold')
-        cbar.ax.yaxis.set_tick_params(color='#5e35b1')
-        plt.setp(plt.getp(cbar.ax.axes, 'yticklabels'), color='#5e35b1')
-        
-        self.topology_fig.tight_layout()
-        self.taxa.figure.canvas.draw()
+        topo = self.topology = generate_topology(nodes, radius=TOPOLOGY_RADIUS)
+        G, pos, battery, node_types, traffic_load, _ = topo.as_dicts()
+
+        # Routing tables for every decision class, built once per topology
+        self.routing = RoutingEngine(G, battery, node_types, traffic_load)
+        self.topology_pos = pos
+        sensors = [n for n in G.nodes() if node_types[n] == 'sensor']
+        routed = [n for n in sensors if self.routing.route(n) is not None]
+        self.route_sensor = (routed or sensors or [None])[0]
+
+        # Batteries drain from here on (update_energy), feeding routing and
+        # colours; the Topology itself keeps its starting levels
+        self.batteries = BatteryModel.from_topology(topo)
+        self.routed_battery = self.batteries.percent()
+        self.shown_battery = self.routed_battery.copy()
+        self.energy_tables = engine_tables(self.routing, topo.n)
+        self.topology_stale = False
+
+        # One edge collection + one node scatter; legend and colorbar are reused
+        self.topology_view.draw(topo)
+        last = decisions.last.get(ESP32_DEVICE_ID)
+        self.highlight_route(last[0] if last else "Normal Routing")
+
+    def topology_shown(self):
+        return self.tabs.select() == str(self.tab_topology)
+
+    def on_tab_changed(self, event=None):
+        """Catch the topology view up with what changed while it was hidden"""
+        if getattr(self, 'topology_stale', False) and self.topology_shown():
+            self.topology_stale = False
+            self.shown_battery = self.batteries.percent()
+            self.topology_view.set_battery(self.shown_battery)
+            self.highlight_route(self.route_decision)
+
+    def update_energy(self):
+        """Advance every battery one step: traffic on the current decision's routes + listening"""
+        try:
+            topo = self.topology
+            batteries = self.batteries
+            sensors = np.flatnonzero((topo.node_type == NODE_TYPES.index("sensor")) & batteries.alive())
+            dt = ENERGY_TIME_SCALE
+            spent = route_energy(topo.pos * FIELD_SIZE, self.energy_tables, sensors, ENERGY_RATE * dt,
+                                 cls=self.energy_tables.classes.index(DECISION_CLASS[self.route_decision]))
+            died = batteries.drain(spent, dt)
+            pct = batteries.percent()
+
+            # Dead relays leave the graph in one repair. Idle drain moves whole
+            # cohorts of nodes past REROUTE_STEP at once, so at most
+            # ENERGY_REROUTE_MAX of them (largest drift first) are re-weighed
+            # per step; the rest follow in the next steps
+            changed = len(died) > 0
+            if changed:
+                self.routing.remove_nodes(died.tolist())
+            drift = np.where(batteries.alive(), np.abs(pct - self.routed_battery), 0)
+            moved = np.flatnonzero(drift >= REROUTE_STEP)
+            if len(moved) > ENERGY_REROUTE_MAX:
+                moved = moved[np.argpartition(drift[moved], -ENERGY_REROUTE_MAX)[-ENERGY_REROUTE_MAX:]]
+            if len(moved):
+                self.routing.update_nodes(battery=dict(zip(moved.tolist(), pct[moved].tolist())))
+                self.routed_battery[moved] = pct[moved]
+                changed = True
+            if changed:
+                self.energy_tables = engine_tables(self.routing, topo.n)
+                self.highlight_route(self.route_decision)
+
+            # Redrawing 10k nodes costs ~0.4 s: only while the tab is shown
+            if not np.array_equal(pct, self.shown_battery):
+                if self.topology_shown():
+                    self.shown_battery = pct
+                    self.topology_view.set_battery(pct)
+                else:
+                    self.topology_stale = True
+        except Exception:
+            self.energy_errors += 1
+            log.exception("Energy step failed (%d so far)", self.energy_errors)
+
+    def highlight_route(self, decision):
+        """Overlay the monitored sensor's route for the current SDN decision"""
+        try:
+            for artist in self.route_artists:
+                artist.remove()
+            self.route_artists = []
+            self.route_decision = decision
+            if not self.topology_shown():
+                self.topology_stale = True      # drawn by on_tab_changed()
+                return
+
+            path = self.routing.route(self.route_sensor, decision)
+            color = dict(DECISIONS).get(decision, '#ef5350')
+            if path:
+                xy = np.array([self.topology_pos[n] for n in path])
+                self.route_artists += self.taxa.plot(xy[:, 0], xy[:, 1], color=color, linewidth=4,
+                                                     alpha=0.9, solid_capstyle='round', zorder=3)
+                self.route_artists.append(self.taxa.scatter(*xy[0], s=500, marker='o', facecolors='none',
+                                                            edgecolors=color, linewidths=3, zorder=4))
+                hops = " → ".join(str(n) for n in path)
+                cost = self.routing.cost(self.route_sensor, decision)
+                label = f"{decision}: {hops}  (cost {cost:.1f})"
+            else:
+                label = f"{decision}: no route from sensor {self.route_sensor} to a controller"
+            self.route_artists.append(self.taxa.text(0.01, 0.01, label, transform=self.taxa.transAxes,
+                                                     fontsize=9, fontweight='bold', color=color,
+                                                     bbox=dict(facecolor='white', alpha=0.8,
+                                                               edgecolor=color)))
+            self.taxa.figure.canvas.draw_idle()
+        except Exception:
+            pass
 
     # --------------------------------------------------------
     # ENHANCED SDN CONTROLLER TAB WITH PURPLE THEME
@@ -1365,7 +1516,7 @@ class App:
         tk.Label(card_header2, text="Packet Statistics", 
                  font=self.subtitle_font, bg='#5e35b1', fg='white').pack(pady=10)
         
-        self.packet_stats = tk.Text(stats_card, width=40, height=8,
+        self.packet_stats = tk.Text(stats_card, width=40, height=12,
                                     bg='#0a1a0a', fg='#c8e6c9',
                                     font=('Consolas', 10), relief='flat',
                                     insertbackground='#5e35b1')
@@ -1415,14 +1566,27 @@ class App:
                                insertbackground='#7e57c2')
         self.sdn_log.pack(side='left', fill='both', expand=True)
         scrollbar.config(command=self.sdn_log.yview)
+        # Last SDN_LOG_ENTRIES on screen; every decision also goes to a rotating file
+        self.sdn_view = BoundedTextLog(self.sdn_log, SDN_LOG_ENTRIES)
+        self.sdn_history = rotating_logger("sdn.decisions", SDN_LOG_FILE)
 
     # --------------------------------------------------------
     # START SDN CONTROLLER
     # --------------------------------------------------------
     def start_sdn(self):
-        threading.Thread(target=self.update_device_status, daemon=True).start()
-        threading.Thread(target=self.update_packet_stats, daemon=True).start()
-        threading.Thread(target=self.sdn_loop_snapshot, daemon=True).start()
+        """Start the controller; clicking again while it runs does nothing"""
+        if self.sdn_active:
+            return
+        self.sdn_active = True
+        self.scheduler.every("device_status", 1.0, self.update_device_status)
+        self.scheduler.every("packet_stats", 1.0, self.update_packet_stats)
+
+        # Decisions are pushed from the ingestion path as packets arrive
+        if bus.latest(ESP32_DEVICE_ID) is None:
+            self.append_to_sdn_log("\n⚠️  Waiting for sensor data...\n")
+        decisions.on_decision = self.on_decisions
+        decisions.start()
+        bus.subscribe(decide_record)
         
         # Update status indicators
         self.sdn_status.config(text="● SDN: ACTIVE", fg='#a5d6a7')
@@ -1431,33 +1595,24 @@ class App:
     # DEVICE STATUS PANEL UPDATER
     # --------------------------------------------------------
     def update_device_status(self):
-        while True:
-            try:
-                time_since_last_data = time.time() - last_successful_data
-                
-                if esp32_connected:
-                    if time_since_last_data < 5:
-                        status_color = '#a5d6a7'
-                        status_text = "CONNECTED ✓"
-                    elif time_since_last_data < connection_timeout:
-                        status_color = '#ffcc80'
-                        status_text = "CONNECTED (SLOW) ⚠"
-                    else:
-                        status_color = '#ef9a9a'
-                        status_text = "DISCONNECTED ✗"
-                else:
-                    if time_since_last_data < 2:
-                        status_color = '#ffcc80'
-                        status_text = "CONNECTING... ⚡"
-                    else:
-                        status_color = '#ef9a9a'
-                        status_text = "DISCONNECTED ✗"
-
-                # Update in main thread
-                self.root.after(0, self.update_device_status_text, status_text, status_color, time_since_last_data)
-            except:
-                pass
-            time.sleep(1)
+        """Scheduler task (main thread, every second)"""
+        snap = bus.snapshot()
+        time_since_last_data = snap.age(ESP32_DEVICE_ID)
+        
+        if ESP32_DEVICE_ID not in snap.latest:
+            status_color = '#ffcc80'
+            status_text = "CONNECTING... ⚡"
+        elif time_since_last_data < 5:
+            status_color = '#a5d6a7'
+            status_text = "CONNECTED ✓"
+        elif time_since_last_data <= connection_timeout:
+            status_color = '#ffcc80'
+            status_text = "CONNECTED (SLOW) ⚠"
+        else:
+            status_color = '#ef9a9a'
+            status_text = "DISCONNECTED ✗"
+
+        self.update_device_status_text(status_text, status_color, time_since_last_data)
     
     def update_device_status_text(self, status_text, status_color, time_since_last_data):
         """Update device status text in main thread"""
@@ -1486,29 +1641,33 @@ class App:
     # PACKET STATISTICS PANEL UPDATER
     # --------------------------------------------------------
     def update_packet_stats(self):
-        while True:
-            try:
-                total = packet_hr + packet_spo2 + packet_temp + packet_hum
-                
-                # Update in main thread
-                self.root.after(0, self.update_packet_stats_text, total)
-            except:
-                pass
-            time.sleep(1)
+        """Scheduler task (main thread, every second)"""
+        snap = bus.snapshot()
+        self.update_packet_stats_text(snap.packets.get(ESP32_DEVICE_ID, 0),
+                                      snap.malformed.get(ESP32_DEVICE_ID, 0))
     
-    def update_packet_stats_text(self, total):
-        """Update packet stats text in main thread"""
+    def update_packet_stats_text(self, packets, malformed):
+        """Update packet stats text in main thread (every packet carries all four vitals)"""
         try:
             self.packet_stats.delete("1.0", "end")
             self.packet_stats.insert("end", f"╔{'═'*38}╗\n")
             self.packet_stats.insert("end", "║        PACKET STATISTICS         ║\n")
             self.packet_stats.insert("end", f"╠{'═'*38}╣\n")
-            self.packet_stats.insert("end", f"║ Temperature : {packet_temp:6d} packets      ║\n")
-            self.packet_stats.insert("end", f"║ Humidity    : {packet_hum:6d} packets      ║\n")
-            self.packet_stats.insert("end", f"║ Heart Rate  : {packet_hr:6d} packets      ║\n")
-            self.packet_stats.insert("end", f"║ SpO₂        : {packet_spo2:6d} packets      ║\n")
+            self.packet_stats.insert("end", f"║ Temperature : {packets:6d} packets      ║\n")
+            self.packet_stats.insert("end", f"║ Humidity    : {packets:6d} packets      ║\n")
+            self.packet_stats.insert("end", f"║ Heart Rate  : {packets:6d} packets      ║\n")
+            self.packet_stats.insert("end", f"║ SpO₂        : {packets:6d} packets      ║\n")
+            self.packet_stats.insert("end", f"╠{'═'*38}╣\n")
+            self.packet_stats.insert("end", f"║ Total       : {4 * packets:6d} readings     ║\n")
+            self.packet_stats.insert("end", f"║ Malformed   : {malformed:6d} packets      ║\n")
             self.packet_stats.insert("end", f"╠{'═'*38}╣\n")
-            self.packet_stats.insert("end", f"║ Total       : {total:6d} packets      ║\n")
+            hist = decisions.latency
+            if hist.count:
+                self.packet_stats.insert("end", f"║ Decisions   : {hist.count:6d} events       ║\n")
+                self.packet_stats.insert("end", f"║ Latency p50 : {hist.percentile(50):8.2f} ms         ║\n")
+                self.packet_stats.insert("end", f"║ Latency p99 : {hist.percentile(99):8.2f} ms         ║\n")
+            else:
+                self.packet_stats.insert("end", "║ Decisions   : waiting for data    ║\n")
             self.packet_stats.insert("end", f"╚{'═'*38}╝\n")
         except:
             pass
@@ -1516,48 +1675,22 @@ class App:
     # --------------------------------------------------------
     # SDN SNAPSHOT ENGINE
     # --------------------------------------------------------
-    def sdn_loop_snapshot(self):
-        while True:
-            try:
-                if not (hr_buf and spo2_buf and temp_buf and hum_buf):
-                    self.root.after(0, self.append_to_sdn_log, "\n⚠️  Waiting for sensor data...\n")
-                    time.sleep(2)
-                    continue
-
-                hr = hr_buf[-1]
-                spo2 = spo2_buf[-1]
-                temp = temp_buf[-1]
-                hum = hum_buf[-1]
-
-                # Classify states
-                hr_state = "HIGH" if hr > 120 else "Normal"
-                spo2_state = "LOW" if spo2 < 95 else "Normal"
-                temp_state = "HIGH" if temp > 38 else "Normal"
-                hum_state = "HIGH" if hum > 85 else "Normal"
-
-                # SDN decision with purple theme colors
-                if spo2_state == "LOW":
-                    decision = "Medical Priority Path"
-                    decision_color = "#ef5350"
-                elif hr_state == "HIGH":
-                    decision = "Emergency Routing"
-                    decision_color = "#ff9800"
-                elif temp_state == "HIGH":
-                    decision = "Alert Routing"
-                    decision_color = "#ffb74d"
-                elif hum_state == "HIGH":
-                    decision = "Environmental Routing"
-                    decision_color = "#4fc3f7"
-                else:
-                    decision = "Normal Routing"
-                    decision_color = "#81c784"
-
-                # Update live values in main thread
-                self.root.after(0, self.update_live_values, temp, hum, hr, spo2, temp_state, hum_state, hr_state, spo2_state)
-                
-                # Create snapshot
-                timestamp = time.strftime("%H:%M:%S")
-                snapshot = f"""
+    def on_decisions(self, events):
+        """DecisionStream callback (decision thread): one snapshot per event"""
+        for event in events:
+            temp, hum, hr, spo2 = event.values
+            states = event.states
+            hr_state, spo2_state = states["hr"], states["spo2"]
+            temp_state, hum_state = states["temp"], states["hum"]
+            decision, decision_color = event.decision, event.color
+
+            # Update live values in main thread (only the latest per frame is drawn)
+            self.scheduler.post(self.update_live_values, temp, hum, hr, spo2,
+                                temp_state, hum_state, hr_state, spo2_state, key="live_values")
+
+            # Create snapshot
+            timestamp = time.strftime("%H:%M:%S")
+            snapshot = f"""
 ╔{'═'*52}╗
 ║{' ':20}SDN SNAPSHOT [{timestamp}]{' ':20}║
 ╠{'═'*52}╣
@@ -1567,16 +1700,18 @@ class App:
 ║ SpO₂ : {spo2:6.1f}%  ({spo2_state:10}){' ':18}║
 ╠{'─'*52}╣
 ║ {decision:50} ║
+║ {f'decided {event.latency_ms:.2f} ms after arrival':50} ║
 ╚{'═'*52}╝
 
 """
-                
-                # Update SDN log in main thread
-                self.root.after(0, self.append_to_sdn_log, snapshot, decision, decision_color)
-            except:
-                pass
-            time.sleep(2)
-    
+
+            # Full history on disk (this thread), bounded view in the main thread
+            self.sdn_history.info("%s %s temp=%.1f hum=%.1f hr=%.1f spo2=%.1f latency_ms=%.2f",
+                                  event.device_id, decision, temp, hum, hr, spo2, event.latency_ms)
+            self.scheduler.post(self.append_to_sdn_log, snapshot, decision, decision_color)
+            if decision != getattr(self, 'route_decision', None):
+                self.scheduler.post(self.highlight_route, decision, key="route")
+
     def update_live_values(self, temp, hum, hr, spo2, temp_state, hum_state, hr_state, spo2_state):
         """Update live values in main thread"""
         try:
@@ -1593,73 +1728,19 @@ class App:
             pass
     
     def append_to_sdn_log(self, text, decision=None, decision_color=None):
-        """Append text to SDN log in main thread"""
+        """Append text to SDN log in main thread (bounded; decision coloured on insert)"""
         try:
-            self.sdn_log.insert("end", text)
-            self.sdn_log.see("end")
-            
-            if decision:
-                # Apply color to decision line
-                lines = self.sdn_log.get("1.0", "end").split('\n')
-                for i, line in enumerate(lines):
-                    if decision.strip("║ ") in line:
-                        line_num = i + 1
-                        self.sdn_log.tag_add("decision", f"{line_num}.3", f"{line_num}.51")
-                        self.sdn_log.tag_config("decision", foreground=decision_color, font=('Consolas', 9, 'bold'))
-                        break
+            self.sdn_view.append(text, decision, decision_color)
         except:
             pass
 
 
-# ============================================================
-# SIMULATION (SDN vs TRADITIONAL)
-# ============================================================
-def simulate(mode):
-    t = list(range(30))
-    if mode == "SDN":
-        thr_base, lat_base, e_base = 0.55, 4.6, 9
-    else:
-        thr_base, lat_base, e_base = 0.48, 5.2, 10
-
-    thr = [thr_base + random.uniform(-0.02, 0.02) for _ in t]
-    lat = [lat_base + random.uniform(-0.25, 0.25) for _ in t]
-
-    e = e_base
-    energy = []
-
-    for _ in t:
-        e -= random.uniform(0.05, 0.15)
-        energy.append(max(e, 2))
-
-    return t, thr, lat, energy
-
-
 # ============================================================
 # ENHANCED TOPOLOGY GENERATOR
 # ============================================================
 def generate_enhanced_topology(n):
-    G = nx.random_geometric_graph(n, 0.35)
-    pos = nx.get_node_attributes(G, "pos")
-    
-    # Enhanced node attributes
-    battery = {node: random.randint(10, 100) for node in G.nodes()}
-    node_types = {node: random.choice(['sensor', 'router', 'gateway', 'controller']) 
-                  for node in G.nodes()}
-    traffic_load = {node: random.uniform(0.1, 0.9) for node in G.nodes()}
-    
-    # Color mapping
-    node_colors = []
-    for node in G.nodes():
-        if node_types[node] == 'sensor':
-            node_colors.append(traffic_load[node])
-        elif node_types[node] == 'router':
-            node_colors.append(0.5 + traffic_load[node] * 0.5)
-        elif node_types[node] == 'gateway':
-            node_colors.append(0.8)
-        else:  # controller
-            node_colors.append(1.0)
-    
-    return G, pos, battery, node_types, traffic_load, node_colors
+    topo = generate_topology(n, radius=TOPOLOGY_RADIUS)
+    return topo.as_dicts()
 
 
 # ============================================================
@@ -1677,6 +1758,10 @@ def start_main_app(username):
     root = tk.Tk()
     app = App(root, username)
     root.mainloop()
+    app.stop_comparisons()
+    bus.unsubscribe(decide_record)
+    decisions.stop()
+    history.close()
 
 
 # ============================================================
@@ -1684,4 +1769,6 @@ def start_main_app(username):
 # ============================================================
 if __name__ == "__main__":
     # Start with authentication screen
-    start_auth_screen()
\ No newline at end of file
+    start_services()
+    start_auth_screen()
+    stop_services()
\ No newline at end of file
@@ -0,0 +1,173 @@
+import hashlib
+import hmac
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+# ============================================================
+# PASSWORD KDF CONFIGURATION
+# ============================================================
+# scrypt is salted and memory-hard: one hash touches 128 * R * 2**COST
+# bytes (16 MiB at the defaults). Hashes are stored self-describing, so
+# COST can be raised later and old hashes are upgraded at their next login:
+#     scrypt$<cost>$<r>$<p>$<salt hex>$<key hex>
+COST = 14                       # log2 of the scrypt N parameter
+R = 8                           # block size
+P = 1                           # parallelism
+SALT_BYTES = 16
+KEY_BYTES = 32
+WORKERS = 2                     # concurrent hashes (each holds 128 * R * 2**COST bytes)
+MIN_PASSWORD = 6
+
+
+def _scrypt(password, salt, cost, r, p):
+    n = 1 << cost
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=2 * 128 * r * n * p + (1 << 20), dklen=KEY_BYTES)
+
+
+def hash_password(password, cost=COST, r=R, p=P):
+    """Salted scrypt hash in the self-describing storage format"""
+    salt = os.urandom(SALT_BYTES)
+    key = _scrypt(password, salt, cost, r, p)
+    return f"scrypt${cost}${r}${p}${salt.hex()}${key.hex()}"
+
+
+def legacy_hash(password):
+    """The original unsalted SHA-256 hex digest"""
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def verify_password(password, stored, cost=COST, r=R, p=P):
+    """(matches, needs_rehash) for a stored scrypt or legacy SHA-256 hash.
+
+    needs_rehash is True for legacy hashes and for scrypt hashes made
+    with other parameters than (cost, r, p).
+    """
+    if not stored.startswith("scrypt$"):
+        return hmac.compare_digest(legacy_hash(password), stored), True
+    try:
+        _, c, rr, pp, salt, key = stored.split("$")
+        c, rr, pp, salt, key = int(c), int(rr), int(pp), bytes.fromhex(salt), bytes.fromhex(key)
+    except ValueError:
+        return False, False
+    ok = hmac.compare_digest(_scrypt(password, salt, c, rr, pp), key)
+    return ok, (c, rr, pp) != (cost, r, p)
+
+
+# ============================================================
+# NON-BLOCKING AUTHENTICATOR
+# ============================================================
+class Authenticator:
+    """Login / registration against a userstore.UserStore on a worker pool.
+
+    login() and register() return a Future of (ok, message) at once, so a
+    GUI only hands the result back to its own loop (e.g. root.after).
+    hashlib.scrypt releases the GIL, so WORKERS hashes run in parallel.
+    A successful login with a legacy or outdated hash re-hashes the
+    password with the current parameters.
+    """
+
+    def __init__(self, store, cost=COST, r=R, p=P, workers=WORKERS):
+        self.store = store
+        self.params = (cost, r, p)
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="auth")
+        self._dummy = None
+        self.upgraded = 0
+
+    def login(self, username, password):
+        return self._pool.submit(self._login, username, password)
+
+    def register(self, username, password, email):
+        return self._pool.submit(self._register, username, password, email)
+
+    def _login(self, username, password):
+        user = self.store.get(username)
+        if user is None:
+            # Spend the same time as a real check, so unknown names don't stand out
+            if self._dummy is None:
+                self._dummy = hash_password("", *self.params)
+            verify_password(password, self._dummy, *self.params)
+            return False, "Invalid username or password!"
+
+        ok, rehash = verify_password(password, user['password'], *self.params)
+        if not ok:
+            return False, "Invalid username or password!"
+        if rehash:
+            self.store.set_password(username, hash_password(password, *self.params))
+            self.upgraded += 1
+        self.store.touch(username)
+        return True, "Login successful!"
+
+    def _register(self, username, password, email):
+        if username in self.store:
+            return False, "Username already exists!"
+        if len(password) < MIN_PASSWORD:
+            return False, f"Password must be at least {MIN_PASSWORD} characters!"
+        if not self.store.add(username, hash_password(password, *self.params), email):
+            return False, "Username already exists!"
+        return True, "Registration successful!"
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+
+# ============================================================
+# BENCHMARK
+# ============================================================
+def benchmark(costs=(12, 13, 14, 15, 16), burst=64, workers=WORKERS, users=16):
+    """Logins/s and latency of a burst of concurrent logins at each cost"""
+    import tempfile
+    from userstore import UserStore
+
+    print(f"{burst} logins at once, {workers} worker(s)")
+    print(f"{'cost':>4} {'MiB/hash':>9} {'hash ms':>8} {'logins/s':>9} "
+          f"{'p50 ms':>7} {'p99 ms':>7} {'legacy upgrade ms':>18}")
+    for cost in costs:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = UserStore(os.path.join(tmp, "users.db"))
+            for i in range(users):
+                store.add(f"user{i}", legacy_hash(f"pw{i}"))
+
+            t0 = time.perf_counter()
+            hash_password("pw", cost)
+            one = (time.perf_counter() - t0) * 1000
+
+            auth = Authenticator(store, cost=cost, workers=workers)
+            # The first login per user verifies SHA-256 and re-hashes with scrypt
+            t0 = time.perf_counter()
+            auth._login("user0", "pw0")
+            upgrade = (time.perf_counter() - t0) * 1000
+            for f in [auth.login(f"user{i}", f"pw{i}") for i in range(1, users)]:
+                f.result()
+
+            latencies = []
+
+            def timed(i, start):
+                auth._login(f"user{i % users}", f"pw{i % users}")
+                latencies.append(time.perf_counter() - start)
+
+            t0 = time.perf_counter()
+            futures = [auth._pool.submit(timed, i, t0) for i in range(burst)]
+            for f in futures:
+                f.result()
+            wall = time.perf_counter() - t0
+            auth.shutdown()
+            store.close()
+
+        ms = sorted(x * 1000 for x in latencies)
+        p99 = ms[min(len(ms) - 1, int(0.99 * len(ms)))]
+        print(f"{cost:4d} {128 * R * (1 << cost) / 2**20:9.0f} {one:8.1f} {burst / wall:9.1f} "
+              f"{statistics.median(ms):7.0f} {p99:7.0f} {upgrade:18.1f}")
+
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser(description="Login throughput per scrypt cost")
+    p.add_argument("--costs", type=int, nargs="+", default=[12, 13, 14, 15, 16])
+    p.add_argument("--burst", type=int, default=64)
+    p.add_argument("--workers", type=int, default=WORKERS)
+    args = p.parse_args()
+    benchmark(args.costs, args.burst, args.workers)
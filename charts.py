@@ -0,0 +1,370 @@
+import time
+
+import numpy as np
+
+from downsample import downsample, pixel_width
+
+
+# ============================================================
+# CHART STYLE (shared with the Realtime Monitor tab)
+# ============================================================
+TITLE_STYLE = dict(fontweight='bold', color='#5e35b1', fontsize=11)
+GRID_STYLE = dict(alpha=0.2, linestyle='--', color='#b39ddb')
+AXES_FACE = '#ede7f6'
+LINE_WIDTH = 2.5
+
+
+# ============================================================
+# BLITTED REALTIME CHART RENDERER
+# ============================================================
+class BlitChartRenderer:
+    """Incremental renderer for a fixed set of line panels.
+
+    Titles, grids and one Line2D per axis are created once. Each update()
+    only calls set_data() and redraws the panels whose data changed,
+    restoring that panel's cached background and blitting its bbox. A
+    full canvas.draw() happens only when data leaves the current y-limits
+    (or after a resize, which invalidates the cached backgrounds).
+
+    Series longer than the axis is wide (in pixels) are downsampled first
+    ("minmax" keeps every spike, "lttb" keeps the shape; None disables).
+    """
+
+    def __init__(self, canvas, panels, window=150, margin=0.1, downsample="minmax", xlim=None):
+        # panels: [(ax, title, color), ...]
+        self.canvas = canvas
+        self.window = window
+        self.margin = margin
+        self.downsample = downsample
+        self.lines = []
+        self._last = []
+        self._bg = None
+        self._x = np.arange(window)
+
+        for ax, title, color in panels:
+            ax.set_title(title, **TITLE_STYLE)
+            ax.grid(True, **GRID_STYLE)
+            ax.set_facecolor(AXES_FACE)
+            ax.set_xlim(*(xlim or (0, window - 1)))
+            line, = ax.plot([], [], color=color, linewidth=LINE_WIDTH, animated=True)
+            self.lines.append(line)
+            self._last.append(None)
+
+        self.full_draws = 0
+        self.blits = 0
+        self._cid = canvas.mpl_connect('draw_event', self._on_draw)
+
+    # --------------------------------------------------------
+    def _on_draw(self, event):
+        """After any full draw: cache the empty panels, then paint the lines"""
+        self._bg = [self.canvas.copy_from_bbox(line.axes.bbox) for line in self.lines]
+        for line in self.lines:
+            line.axes.draw_artist(line)
+
+    def _fit_ylim(self, ax, y):
+        """Widen y-limits if y left them; returns True when limits changed"""
+        finite = y[np.isfinite(y)]
+        if not len(finite):
+            return False
+        lo, hi = float(finite.min()), float(finite.max())
+        cur_lo, cur_hi = ax.get_ylim()
+        if lo >= cur_lo and hi <= cur_hi and (cur_lo, cur_hi) != (0.0, 1.0):
+            return False
+        span = hi - lo if hi > lo else max(abs(hi), 1.0)
+        ax.set_ylim(lo - span * self.margin, hi + span * self.margin)
+        return True
+
+    def update(self, series):
+        """series: per panel, either a 1-D array (the newest window samples,
+        plotted against sample index) or an (x, y) pair (e.g. seconds ago).
+
+        A window is skipped when it equals the previous one; an (x, y) pair
+        only when its length and last x are unchanged (it may span hours, so
+        it is neither copied nor compared -- skip unchanged data upstream)."""
+        changed = []
+        rescale = False
+        for i, (line, item) in enumerate(zip(self.lines, series)):
+            prev = self._last[i]
+            if isinstance(item, tuple):
+                x, y = np.asarray(item[0]), np.asarray(item[1])
+                key = (len(y), x[-1] if len(x) else None)
+                if key == prev:
+                    continue
+                self._last[i] = key
+            else:
+                y = np.asarray(item)[-self.window:]
+                x = self._x[:len(y)]
+                if (prev is not None and len(prev[1]) == len(y) and len(y)
+                        and prev[0] == x[-1] and np.array_equal(prev[1], y)):
+                    continue
+                self._last[i] = (x[-1] if len(x) else None, y.copy())
+            x, y = downsample(x, y, pixel_width(line.axes), self.downsample)
+            line.set_data(x, y)
+            rescale |= self._fit_ylim(line.axes, y)
+            changed.append(i)
+
+        if not changed:
+            return
+        if rescale or self._bg is None:
+            self.full_draws += 1
+            self.canvas.draw()              # _on_draw re-caches and paints the lines
+            return
+
+        for i in changed:
+            line = self.lines[i]
+            self.canvas.restore_region(self._bg[i])
+            line.axes.draw_artist(line)
+            self.canvas.blit(line.axes.bbox)
+        self.blits += len(changed)
+
+    def invalidate(self):
+        """Force a full redraw on the next update (e.g. after restyling)"""
+        self._bg = None
+        self._last = [None] * len(self.lines)
+
+
+# ============================================================
+# BATCHED TOPOLOGY RENDERER
+# ============================================================
+# Per node type: (marker size, edge colour), indexed like topology.NODE_TYPES
+NODE_SIZES = np.array([400, 600, 900, 1200])
+NODE_EDGE_COLORS = np.array(['#5e35b1', '#4527a0', '#311b92', '#1a237e'])
+EDGE_COLOR = '#9575cd'
+LOW_BATTERY = 20            # %, node outlined in LOW_BATTERY_COLOR below this
+LOW_BATTERY_COLOR = '#e53935'
+DEAD_COLOR = '#9e9e9e'
+LABEL_LIMIT = 150           # no per-node labels above this many nodes
+
+
+class TopologyRenderer:
+    """Draws a topology.Topology with a fixed set of artists.
+
+    Edges are two LineCollections (solid / dashed, per-edge width and
+    alpha), all nodes one scatter; the legend, title and traffic-load
+    colorbar are created once. draw() only swaps the data, so
+    regenerating never adds axes or artists. Node labels are skipped above
+    label_limit nodes, and markers / lines shrink as the node count grows.
+    set_battery() restyles only the nodes, for batteries that drain over time.
+    """
+
+    def __init__(self, ax, label_limit=LABEL_LIMIT, cmap='Purples'):
+        from matplotlib import colormaps
+        from matplotlib.cm import ScalarMappable
+        from matplotlib.collections import LineCollection
+        from matplotlib.colors import Normalize, to_rgba
+        from matplotlib.lines import Line2D
+
+        self.ax = ax
+        self.label_limit = label_limit
+        self.cmap = colormaps[cmap]
+        self.norm = Normalize(vmin=0, vmax=1)
+        self.labels = []
+        self._types = np.empty(0, dtype=np.uint8)
+        self._edge_rgba = to_rgba(EDGE_COLOR)
+
+        ax.set_facecolor(AXES_FACE)
+        ax.set_xlim(-0.05, 1.05)
+        ax.set_ylim(-0.05, 1.05)
+        ax.set_aspect('equal', adjustable='box')
+        ax.set_xticks([])
+        ax.set_yticks([])
+        ax.grid(True, alpha=0.1, color='#b39ddb')
+        ax.set_title("Wireless Sensor Network Topology",
+                     fontweight='bold', fontsize=14, color='#5e35b1', pad=20)
+
+        # Solid (load >= 0.5) and dashed edges: matplotlib cycles per-segment
+        # dash patterns against the widths, so one style per collection
+        self.edges = {style: LineCollection([], linestyles=style, zorder=1)
+                      for style in ('solid', 'dashed')}
+        for coll in self.edges.values():
+            ax.add_collection(coll)
+        self.nodes = ax.scatter([], [], c=[], cmap=self.cmap, norm=self.norm, alpha=0.9,
+                                linewidths=2, zorder=2)
+
+        ax.legend(handles=[
+            Line2D([0], [0], marker='o', color='w', label='Sensor',
+                   markerfacecolor='#b39ddb', markersize=12, markeredgecolor='#5e35b1', markeredgewidth=2),
+            Line2D([0], [0], marker='o', color='w', label='Router',
+                   markerfacecolor='#9575cd', markersize=12, markeredgecolor='#4527a0', markeredgewidth=2),
+            Line2D([0], [0], marker='o', color='w', label='Gateway',
+                   markerfacecolor='#7e57c2', markersize=12, markeredgecolor='#311b92', markeredgewidth=2),
+            Line2D([0], [0], marker='*', color='w', label='Controller',
+                   markerfacecolor='#5e35b1', markersize=15, markeredgecolor='#1a237e', markeredgewidth=2),
+        ], loc='upper right', facecolor='#f5f1fe', edgecolor='#d1c4e9', framealpha=0.9)
+
+        sm = ScalarMappable(cmap=self.cmap, norm=self.norm)
+        sm.set_array([])
+        self.colorbar = ax.figure.colorbar(sm, ax=ax, shrink=0.8)
+        self.colorbar.set_label('Traffic Load', rotation=270, labelpad=20, color='#5e35b1', fontweight='bold')
+        self.colorbar.ax.yaxis.set_tick_params(color='#5e35b1', labelcolor='#5e35b1')
+
+    def draw(self, topo):
+        """Show a topology.Topology (replaces whatever was drawn before)"""
+        scale = min(1.0, np.sqrt(50 / max(topo.n, 1)))
+
+        load = topo.edge_load()
+        segments = topo.pos[topo.edges]
+        rgba = np.empty((len(load), 4))
+        rgba[:] = self._edge_rgba
+        rgba[:, 3] = 0.3 + load * 0.4
+        widths = np.maximum((1 + load * 4) * scale, 0.3)
+        solid = load >= 0.5
+        for style, mask in (('solid', solid), ('dashed', ~solid)):
+            coll = self.edges[style]
+            coll.set_segments(segments[mask])
+            coll.set_color(rgba[mask])
+            coll.set_linewidths(widths[mask])
+
+        self.nodes.set_offsets(topo.pos)
+        self.nodes.set_array(topo.node_colors())
+        self.nodes.set_sizes(NODE_SIZES[topo.node_type] * scale ** 2)
+        self.nodes.set_linewidths(max(2 * scale, 0.3))
+        self._types = topo.node_type
+
+        for text in self.labels:
+            text.remove()
+        self.labels = []
+        if topo.n <= self.label_limit:
+            self.labels = [self.ax.text(x, y, "", fontsize=9, fontweight='bold', color='#311b92',
+                                        ha='center', va='center', zorder=3)
+                           for x, y in topo.pos.tolist()]
+        self.set_battery(topo.battery)
+
+    def set_battery(self, battery):
+        """Show battery levels (%): labels, red outline when low, faded when dead"""
+        battery = np.asarray(battery)
+        edge = NODE_EDGE_COLORS[self._types].copy()
+        edge[battery < LOW_BATTERY] = LOW_BATTERY_COLOR
+        edge[battery <= 0] = DEAD_COLOR
+        self.nodes.set_edgecolors(edge)
+        self.nodes.set_alpha(np.where(battery > 0, 0.9, 0.2))
+        for text, b in zip(self.labels, battery.tolist()):
+            text.set_text(f"{b}%")
+        self.ax.figure.canvas.draw_idle()
+
+
+# ============================================================
+# BENCHMARK (Agg, no display needed)
+# ============================================================
+PANELS = (("Heart Rate (BPM)", '#7e57c2', 72, 6),
+          ("SpO₂ (%)", '#5e35b1', 97, 1),
+          ("Temperature (°C)", '#4527a0', 25, 0.3),
+          ("Humidity (%)", '#9575cd', 55, 2),
+          ("Latency (ms)", '#b39ddb', 50, 5),
+          ("Throughput (bps)", '#d1c4e9', 2000, 100))
+
+
+def _new_figure():
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure(figsize=(14, 9), facecolor='#f5f1fe')
+    axes = fig.subplots(3, 2)
+    fig.subplots_adjust(hspace=0.4, wspace=0.3)
+    return FigureCanvasAgg(fig), [ax for row in axes for ax in row]
+
+
+def _legacy_frame(canvas, axes, series):
+    # What App.update_charts() did before: clear, restyle, replot, full draw
+    for ax, (title, color, _, _), y in zip(axes, PANELS, series):
+        ax.clear()
+        ax.plot(y, color=color, linewidth=LINE_WIDTH)
+        ax.set_title(title, **TITLE_STYLE)
+        ax.grid(True, **GRID_STYLE)
+        ax.set_facecolor(AXES_FACE)
+    canvas.draw()
+
+
+def benchmark(windows=(150, 1000, 5000), frames=40):
+    """Mean ms per frame: clear + full draw vs blitted set_data"""
+    rng = np.random.default_rng(0)
+    print(f"{'window':>7} {'legacy ms':>10} {'blit ms':>9} {'speedup':>8} {'full draws':>11}")
+    for window in windows:
+        total = window + frames
+        data = [base + spread * rng.standard_normal(total).cumsum() / np.sqrt(total)
+                for _, _, base, spread in PANELS]
+
+        canvas, axes = _new_figure()
+        _legacy_frame(canvas, axes, [d[:window] for d in data])
+        t0 = time.perf_counter()
+        for f in range(1, frames + 1):
+            _legacy_frame(canvas, axes, [d[f:f + window] for d in data])
+        legacy = (time.perf_counter() - t0) / frames * 1000
+
+        canvas, axes = _new_figure()
+        renderer = BlitChartRenderer(canvas, [(ax, t, c) for ax, (t, c, _, _) in zip(axes, PANELS)],
+                                     window=window)
+        renderer.update([d[:window] for d in data])
+        draws_before = renderer.full_draws
+        t0 = time.perf_counter()
+        for f in range(1, frames + 1):
+            renderer.update([d[f:f + window] for d in data])
+        blit = (time.perf_counter() - t0) / frames * 1000
+
+        print(f"{window:7d} {legacy:10.1f} {blit:9.1f} {legacy / blit:7.1f}x "
+              f"{renderer.full_draws - draws_before:11d}")
+
+
+def _legacy_topology(fig, ax, topo):
+    # What App.show_topology() did before: one draw call per edge, a new colorbar per redraw
+    import networkx as nx
+    from matplotlib.cm import ScalarMappable
+    from matplotlib.colors import Normalize
+    G, pos, battery, _, traffic_load, node_colors = topo.as_dicts()
+    ax.clear()
+    for u, v in G.edges():
+        load = (traffic_load[u] + traffic_load[v]) / 2
+        nx.draw_networkx_edges(G, pos, edgelist=[(u, v)], width=1 + load * 4, alpha=0.3 + load * 0.4,
+                               edge_color=EDGE_COLOR, style='dashed' if load < 0.5 else 'solid', ax=ax)
+    nx.draw_networkx_nodes(G, pos, node_color=node_colors, node_size=NODE_SIZES[topo.node_type].tolist(),
+                           cmap='Purples', edgecolors=NODE_EDGE_COLORS[topo.node_type].tolist(), ax=ax)
+    nx.draw_networkx_labels(G, pos, {n: f"{b}%" for n, b in battery.items()}, font_size=9, ax=ax)
+    sm = ScalarMappable(cmap='Purples', norm=Normalize(vmin=0, vmax=1))
+    sm.set_array([])
+    fig.colorbar(sm, ax=ax, shrink=0.8)
+    fig.canvas.draw()
+
+
+def benchmark_topology(sizes=(50, 1_000, 10_000), redraws=3, legacy_max=1_000):
+    """Seconds per topology redraw: per-edge networkx calls vs TopologyRenderer"""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from topology import generate_topology
+
+    print(f"{'nodes':>7} {'edges':>7} {'legacy s':>9} {'axes after':>11} {'batched s':>10} {'axes after':>11}")
+    for n in sizes:
+        topos = [generate_topology(n, seed=s) for s in range(redraws + 1)]
+        legacy, legacy_axes = "-", "-"
+        if n <= legacy_max:
+            fig = Figure(figsize=(10, 8))
+            FigureCanvasAgg(fig)
+            ax = fig.add_subplot(111)
+            t0 = time.perf_counter()
+            for topo in topos[1:]:
+                _legacy_topology(fig, ax, topo)
+            legacy = f"{(time.perf_counter() - t0) / redraws:.3f}"
+            legacy_axes = len(fig.axes)
+
+        fig = Figure(figsize=(10, 8))
+        canvas = FigureCanvasAgg(fig)
+        view = TopologyRenderer(fig.add_subplot(111))
+        view.draw(topos[0])
+        t0 = time.perf_counter()
+        for topo in topos[1:]:
+            view.draw(topo)             # draw_idle() renders immediately on Agg
+        batched = (time.perf_counter() - t0) / redraws
+        print(f"{n:7d} {len(topos[-1].edges):7d} {legacy:>9} {legacy_axes:>11} "
+              f"{batched:10.3f} {len(fig.axes):11d}")
+
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser(description="Realtime chart / topology redraw benchmark")
+    p.add_argument("--windows", type=int, nargs="+", default=[150, 1000, 5000])
+    p.add_argument("--frames", type=int, default=40)
+    p.add_argument("--topology", type=int, nargs="+", metavar="NODES",
+                   help="benchmark topology redraws at these node counts instead")
+    args = p.parse_args()
+    if args.topology:
+        benchmark_topology(args.topology)
+    else:
+        benchmark(args.windows, args.frames)
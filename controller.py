@@ -0,0 +1,301 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+
+import numpy as np
+
+from gateway import (BUFFER, CONNECT_TIMEOUT, POLL_INTERVAL, DeviceRegistry,
+                     IngestionGateway, start_fake_fleet)
+from metrics import PORT as METRICS_PORT, MetricsServer, WsnMetrics
+from sdn import DecisionStream, RuleEngine
+from tsstore import TimeSeriesStore, day_of
+
+log = logging.getLogger("controller")
+
+
+# ============================================================
+# CONTROLLER CONFIGURATION
+# ============================================================
+DEFAULT_CONFIG = {
+    "devices": [],             # [{"id", "host", "port", "mode"}]
+    "thresholds": {},          # overrides for sdn.THRESHOLDS
+    "rules": [],               # sdn rule list; empty = default ladder from thresholds
+    "poll_interval": POLL_INTERVAL,
+    "timeout": CONNECT_TIMEOUT,
+    "buffer": BUFFER,
+    "decision_interval": 2.0,  # log an unchanged decision at most this often
+    "stale_after": 10.0,       # skip devices with no data for this long
+    "data_dir": "data",
+    "flush_interval": 5.0,     # seconds between persistence flushes (and fsyncs)
+    "metrics_port": METRICS_PORT,  # Prometheus text format at /metrics; null = off
+}
+
+
+def load_config(path=None):
+    """DEFAULT_CONFIG updated with the JSON file at path (if any)"""
+    config = json.loads(json.dumps(DEFAULT_CONFIG))
+    if path:
+        with open(path, 'r') as f:
+            user = json.load(f)
+        unknown = set(user) - set(DEFAULT_CONFIG)
+        if unknown:
+            raise ValueError(f"Unknown config keys: {', '.join(sorted(unknown))}")
+        config.update(user)
+    return config
+
+
+def parse_device(spec):
+    """ID=HOST[:PORT][/MODE] -> config entry"""
+    device_id, _, addr = spec.partition("=")
+    addr, _, mode = addr.partition("/")
+    host, _, port = addr.partition(":")
+    if not device_id or not host:
+        raise argparse.ArgumentTypeError(f"expected ID=HOST[:PORT][/MODE], got {spec!r}")
+    return {"id": device_id, "host": host, "port": int(port or 8080), "mode": mode or "poll"}
+
+
+def parse_threshold(spec):
+    key, _, val = spec.partition("=")
+    try:
+        return key, float(val)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected KEY=NUMBER, got {spec!r}")
+
+
+# ============================================================
+# PERSISTENCE
+# ============================================================
+class JsonlLog:
+    """Buffered, append-only JSON-lines file, one file per UTC day (like the
+    history store's column files). write() files an entry under the day of
+    its "ts"; flush() may run on another thread."""
+
+    def __init__(self, data_dir, prefix):
+        self.data_dir = data_dir
+        self.prefix = prefix
+        self._pending = {}          # day -> lines
+        self._lock = threading.Lock()
+
+    def write(self, entry):
+        line = json.dumps(entry, separators=(",", ":"))
+        day = day_of(entry.get("ts", time.time()))
+        with self._lock:
+            self._pending.setdefault(day, []).append(line)
+
+    def path(self, ts=None):
+        return os.path.join(self.data_dir, f"{self.prefix}-{day_of(ts)}.jsonl")
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        os.makedirs(self.data_dir, exist_ok=True)
+        for day, lines in pending.items():
+            with open(os.path.join(self.data_dir, f"{self.prefix}-{day}.jsonl"), 'a') as f:
+                f.write("\n".join(lines) + "\n")
+
+
+# ============================================================
+# HEADLESS CONTROLLER
+# ============================================================
+class HeadlessController:
+    """Ingestion + SDN decisions + persistence, no Tk or matplotlib"""
+
+    def __init__(self, config):
+        self.config = config
+        self.engine = RuleEngine.from_config(config["rules"], config["thresholds"])
+        self.stream = DecisionStream(self.engine, on_decision=self._on_decisions,
+                                     heartbeat=config["decision_interval"])
+        self.registry = DeviceRegistry.from_config(config)
+        self.metrics = WsnMetrics().decisions(self.stream)
+        self.metrics_server = None
+        self.gateway = IngestionGateway(self.registry,
+                                        interval=config["poll_interval"],
+                                        timeout=config["timeout"],
+                                        buffer_size=config["buffer"],
+                                        on_reading=self._store_readings,
+                                        metrics=self.metrics)
+        self.decisions = JsonlLog(config["data_dir"], "decisions")
+        # Flushed and fsynced on the store's own thread, not on the ingestion loop
+        self.history = TimeSeriesStore(os.path.join(config["data_dir"], "history"),
+                                       fsync_interval=config["flush_interval"])
+        self.last_decision = {}
+        self._stop = None
+
+    # --------------------------------------------------------
+    def _store_readings(self, device_id, records):
+        """Gateway callback: stage readings + current link metrics for disk"""
+        buf = self.gateway.buffers[device_id]
+        self.history.append_batch(device_id, {
+            "ts": np.full(len(records), buf.last_data),
+            "temp": records["temp"], "hum": records["hum"],
+            "hr": records["hr"], "spo2": records["spo2"],
+            "lat": buf.lat[-1], "thr": buf.thr[-1],
+            "jit": buf.jit[-1] if len(buf.jit) else np.nan})
+        self.stream.submit(device_id, records, buf.arrived)
+
+    def _on_decisions(self, events):
+        """DecisionStream callback: persist and log decisions as they are made"""
+        now = round(time.time(), 3)
+        for event in events:
+            # float32 samples -> plain floats at the sensors' 0.1 resolution
+            temp, hum, hr, spo2 = (round(v, 2) for v in event.values)
+            self.decisions.write({"ts": now, "device": event.device_id,
+                                  "temp": temp, "hum": hum, "hr": hr, "spo2": spo2,
+                                  "states": event.states, "decision": event.decision,
+                                  "priority": event.priority,
+                                  "latency_ms": round(event.latency_ms, 3)})
+            if self.last_decision.get(event.device_id) != event.decision:
+                log.info("%s: %s (HR %.1f, SpO2 %.1f, temp %.1f, hum %.1f) in %.2f ms",
+                         event.device_id, event.decision, hr, spo2, temp, hum, event.latency_ms)
+                self.last_decision[event.device_id] = event.decision
+
+    def check_stale(self):
+        """Warn once about devices that stopped sending"""
+        now = time.time()
+        for device_id, buf in list(self.gateway.buffers.items()):
+            if buf.last_data and now - buf.last_data > self.config["stale_after"]:
+                if self.last_decision.pop(device_id, None) is not None:
+                    self.stream.last.pop(device_id, None)
+                    log.warning("%s: no data for %.0f s", device_id, now - buf.last_data)
+
+    async def _every(self, interval, fn, blocking=False):
+        """fn() every interval seconds; blocking ones (disk I/O) run in the
+        default executor so device tasks keep going meanwhile"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            if blocking:
+                await loop.run_in_executor(None, fn)
+            else:
+                fn()
+
+    def start_metrics(self):
+        """Serve /metrics on the configured port (skipped if off or taken)"""
+        port = self.config["metrics_port"]
+        if port is None:
+            return None
+        try:
+            self.metrics_server = MetricsServer(self.metrics.registry, port=port).start()
+        except OSError as e:
+            log.warning("metrics endpoint not started on port %s: %s", port, e)
+            return None
+        log.info("metrics at http://%s:%d/metrics", self.metrics_server.host, self.metrics_server.port)
+        return self.metrics_server
+
+    # --------------------------------------------------------
+    async def run(self, duration=None):
+        self._stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self._stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass        # e.g. Windows, or not on the main thread
+
+        log.info("controller started: %d device(s), data in %s",
+                 len(self.registry), self.config["data_dir"])
+        self.start_metrics()
+        self.history.start()
+        # Readings arrive on this loop; decide right after each callback returns
+        self.stream.notify = loop.call_soon
+        tasks = [asyncio.ensure_future(self.gateway.run()),
+                 asyncio.ensure_future(self._every(self.config["decision_interval"], self.check_stale)),
+                 asyncio.ensure_future(self._every(self.config["flush_interval"],
+                                                   self.decisions.flush, blocking=True))]
+        try:
+            if duration:
+                await asyncio.wait_for(self._stop.wait(), duration)
+            else:
+                await self._stop.wait()
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self.gateway.stop()
+            for task in tasks[1:]:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.flush()
+            self.history.close()
+            if self.metrics_server is not None:
+                self.metrics_server.stop()
+            log.info("controller stopped: %d reading(s)", self.gateway.total_readings)
+            log.info("decision latency: %s", self.stream.latency.summary())
+            log.info("critical decision latency: %s", self.stream.critical_latency.summary())
+
+    def flush(self):
+        self.decisions.flush()
+        self.history.flush()
+        self.history.sync()
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
+
+
+# ============================================================
+# COMMAND LINE ENTRY POINT
+# ============================================================
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Headless WSN-SDN controller (no GUI)")
+    p.add_argument("--config", help="JSON config file (see controller.example.json)")
+    p.add_argument("--device", action="append", type=parse_device, default=[],
+                   metavar="ID=HOST[:PORT][/MODE]", help="add a device (repeatable)")
+    p.add_argument("--threshold", action="append", type=parse_threshold, default=[],
+                   metavar="KEY=VALUE", help="override an SDN threshold, e.g. hr_high=130")
+    p.add_argument("--data-dir", help="where decisions (and readings) are persisted")
+    p.add_argument("--decision-interval", type=float)
+    p.add_argument("--metrics-port", type=int, help="Prometheus /metrics port (0 = any free port)")
+    p.add_argument("--duration", type=float, help="stop after this many seconds")
+    p.add_argument("--fake", type=int, default=0, metavar="N",
+                   help="also start N local fake ESP32 devices (dry run)")
+    p.add_argument("--log-level", default="INFO")
+    args = p.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level.upper(),
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    try:
+        config = load_config(args.config)
+        config["devices"] = config["devices"] + args.device
+        config["thresholds"] = dict(config["thresholds"], **dict(args.threshold))
+        if args.data_dir:
+            config["data_dir"] = args.data_dir
+        if args.decision_interval:
+            config["decision_interval"] = args.decision_interval
+        if args.metrics_port is not None:
+            config["metrics_port"] = args.metrics_port
+        RuleEngine.from_config(config["rules"], config["thresholds"])
+    except (OSError, ValueError) as e:
+        p.error(str(e))
+
+    if not config["devices"] and not args.fake:
+        p.error("no devices configured (use --config, --device or --fake)")
+
+    async def _run():
+        fleet = []
+        if args.fake:
+            fleet, fake_registry = await start_fake_fleet(args.fake, stream_interval=0.5)
+            for dev in fake_registry:
+                config["devices"].append({"id": dev.device_id, "host": dev.host,
+                                          "port": dev.port, "mode": "stream"})
+        controller = HeadlessController(config)
+        try:
+            await controller.run(args.duration)
+        finally:
+            for dev in fleet:
+                dev.close()
+
+    asyncio.run(_run())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+import time
+
+import numpy as np
+
+
+# ============================================================
+# DOWNSAMPLING FOR LONG-WINDOW CHARTS
+# ============================================================
+# A line can show at most about one distinct value per pixel column, so a
+# window is reduced to roughly the axis width before it is plotted.
+#
+#   "minmax" - keep the min and max of every bucket (envelope): every spike
+#              survives, which is what matters for HR / SpO2 alarms.
+#   "lttb"   - largest-triangle-three-buckets: one point per bucket chosen
+#              to preserve the visual shape; smoother, may thin the
+#              envelope.
+MODES = ("minmax", "lttb")
+
+
+def _buckets(start, stop, n):
+    """(n, width) index matrix splitting [start, stop) into n buckets.
+
+    Ragged buckets are padded by repeating their last index, which never
+    changes a bucket's min, max or argmax.
+    """
+    edges = np.linspace(start, stop, n + 1).astype(np.intp)
+    width = max(int(np.diff(edges).max()), 1)
+    idx = edges[:-1, None] + np.arange(width)
+    return np.minimum(idx, np.maximum(edges[1:] - 1, edges[:-1])[:, None]), edges
+
+
+def minmax(x, y, n_out):
+    """Indices of the min and max of n_out // 2 buckets, in x order"""
+    n = len(y)
+    if n <= n_out:
+        return np.arange(n)
+    idx, _ = _buckets(0, n, max(n_out // 2, 1))
+    rows = y[idx]
+    nan = np.isnan(rows)
+    lo = np.where(nan, np.inf, rows).argmin(axis=1)
+    hi = np.where(nan, -np.inf, rows).argmax(axis=1)
+    r = np.arange(len(idx))
+    keep = np.sort(np.stack([idx[r, lo], idx[r, hi]], axis=1), axis=1).ravel()
+    # Always keep the newest sample so the line ends at "now"
+    if keep[-1] != n - 1:
+        keep = np.append(keep, n - 1)
+    return keep
+
+
+def _fill_gaps(y, nan, idx, edges):
+    """(y with NaN set to its bucket's mean, first NaN index of each bucket)"""
+    n = len(y)
+    inner = slice(1, n - 1)
+    sums = np.add.reduceat(np.where(nan, 0.0, y)[inner], edges[:-1] - 1)
+    valid = np.add.reduceat((~nan[inner]).astype(np.intp), edges[:-1] - 1)
+    fallback = 0.0 if nan.all() else float(np.nanmean(y))
+    means = np.divide(sums, valid, out=np.full(len(valid), fallback), where=valid > 0)
+    filled = np.concatenate(([means[0]], np.repeat(means, np.diff(edges)), [means[-1]]))
+
+    rows = nan[idx]
+    first = idx[np.arange(len(idx)), rows.argmax(axis=1)]
+    return np.where(nan, filled, y), first[rows.any(axis=1)]
+
+
+def lttb(x, y, n_out):
+    """Indices chosen by largest-triangle-three-buckets (first/last kept).
+
+    NaN dropouts are scored at their bucket's mean, so they never crowd out
+    real extremes, and one NaN per gapped bucket is kept so the line still
+    breaks there.
+    """
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    nb = n_out - 2
+    idx, edges = _buckets(1, n - 1, nb)
+    counts = np.diff(edges)
+    nan = np.isnan(y)
+    gaps = None
+    if nan.any():
+        y, gaps = _fill_gaps(y, nan, idx, edges)
+    # Bucket averages (the "C" point of each triangle); the last bucket's
+    # right neighbour is the final sample
+    cx = np.append(np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts, x[-1])
+    cy = np.append(np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / counts, y[-1])
+    bx, by = x[idx], y[idx]
+
+    keep = np.empty(n_out, dtype=np.intp)
+    keep[0], keep[-1] = 0, n - 1
+    ax, ay = x[0], y[0]
+    # Each bucket's anchor is the point picked in the previous one, so the
+    # buckets are walked in order; the work inside a bucket is vectorized.
+    for i in range(nb):
+        area = np.abs((ax - cx[i + 1]) * (by[i] - ay) - (ax - bx[i]) * (cy[i + 1] - ay))
+        j = area.argmax()
+        keep[i + 1] = idx[i, j]
+        ax, ay = bx[i, j], by[i, j]
+    if gaps is not None and len(gaps):
+        keep = np.union1d(keep, gaps)
+    return keep
+
+
+def downsample(x, y, n_out, mode="minmax"):
+    """(x, y) reduced to about n_out points; unchanged if already short"""
+    y = np.asarray(y)
+    if mode is None or len(y) <= n_out:
+        return x, y
+    if mode == "minmax":
+        keep = minmax(x, y, n_out)
+    elif mode == "lttb":
+        keep = lttb(x, y, n_out)
+    else:
+        raise ValueError(f"Unknown downsampling mode: {mode}")
+    return x[keep], y[keep]
+
+
+def pixel_width(ax):
+    """Width of an axes in display pixels (the useful number of points)"""
+    return max(int(ax.bbox.width), 2)
+
+
+# ============================================================
+# BENCHMARK (Agg, no display needed)
+# ============================================================
+def benchmark(lengths=(1_000, 10_000, 100_000, 1_000_000), frames=5):
+    """Mean ms per full 6-panel draw vs window length, raw and downsampled"""
+    from charts import PANELS, _new_figure
+
+    rng = np.random.default_rng(0)
+    canvas, axes = _new_figure()
+    lines = [ax.plot([], [], color=color)[0] for ax, (_, color, _, _) in zip(axes, PANELS)]
+    canvas.draw()
+    width = pixel_width(axes[0])
+
+    def frame(data, mode):
+        x = np.arange(len(data[0]))
+        for ax, line, y in zip(axes, lines, data):
+            line.set_data(*downsample(x, y, width, mode))
+            ax.set_xlim(0, len(y))
+            ax.set_ylim(y.min(), y.max())
+        canvas.draw()
+
+    print(f"axis width: {width} px")
+    print(f"{'points':>9} " + " ".join(f"{m or 'raw':>10}" for m in (None,) + MODES) + "  (ms/frame)")
+    for n in lengths:
+        data = []
+        for _, _, base, spread in PANELS:
+            y = base + spread * rng.standard_normal(n).cumsum() / np.sqrt(n) * 10
+            y[rng.integers(0, n, 5)] += spread * 8          # isolated spikes
+            data.append(y.astype(np.float32))
+        row = []
+        for mode in (None,) + MODES:
+            frame(data, mode)
+            t0 = time.perf_counter()
+            for _ in range(frames):
+                frame(data, mode)
+            row.append((time.perf_counter() - t0) / frames * 1000)
+        print(f"{n:9d} " + " ".join(f"{ms:10.1f}" for ms in row))
+
+    # Spikes survive the envelope
+    y = np.zeros(1_000_000, dtype=np.float32)
+    y[123_457] = 1.0
+    for mode in MODES:
+        _, ys = downsample(np.arange(len(y)), y, width, mode)
+        print(f"{mode}: single-sample spike kept = {bool(ys.max() == 1.0)}")
+
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser(description="Chart downsampling benchmark")
+    p.add_argument("--lengths", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    p.add_argument("--frames", type=int, default=5)
+    args = p.parse_args()
+    benchmark(args.lengths, args.frames)
@@ -0,0 +1,158 @@
+import time
+
+import numpy as np
+
+from topology import NODE_TYPES
+
+# ============================================================
+# FIRST-ORDER RADIO MODEL
+# ============================================================
+# Sending k bits over d metres costs E_ELEC*k + EPS_FS*k*d^2 below the
+# crossover distance D0 and E_ELEC*k + EPS_MP*k*d^4 beyond it; receiving
+# costs E_ELEC*k. Listening in between costs IDLE_POWER watts.
+E_ELEC = 50e-9                  # J/bit, transmitter / receiver electronics
+EPS_FS = 10e-12                 # J/bit/m^2, free-space amplifier
+EPS_MP = 0.0013e-12             # J/bit/m^4, multipath amplifier
+D0 = float(np.sqrt(EPS_FS / EPS_MP))
+IDLE_POWER = 0.3e-3             # W, duty-cycled listening
+CAPACITY_J = 2430.0             # J, a full battery (CR2032 coin cell: 225 mAh at 3 V)
+FIELD_SIZE = 100.0              # m, side of the field the unit-square topology maps to
+PACKET_BITS = 512               # one 64-byte packet
+
+
+def tx_energy(bits, distance):
+    """J to send `bits` over `distance` metres (arrays broadcast)"""
+    d = np.asarray(distance, dtype=np.float64)
+    amp = np.where(d < D0, EPS_FS * d ** 2, EPS_MP * d ** 4)
+    return bits * (E_ELEC + amp)
+
+
+def rx_energy(bits):
+    """J to receive `bits`"""
+    return bits * E_ELEC
+
+
+# ============================================================
+# ROUTED TRAFFIC -> PER-NODE ENERGY
+# ============================================================
+def route_energy(pos_m, tables, sources, packets, bits=PACKET_BITS, cls=0, max_hops=64):
+    """J spent by every node to carry `packets` (per source) along `tables`.
+
+    All sources are walked hop by hop at once; each hop charges the
+    sender tx_energy() over the hop length and the receiver rx_energy().
+    tables is a netsim.ForwardingTables (two-leg next-hop arrays).
+    """
+    n = len(pos_m)
+    spent = np.zeros(n)
+    node = np.asarray(sources, dtype=np.intp)
+    weight = np.broadcast_to(np.asarray(packets, dtype=np.float64), node.shape).copy()
+    leg = np.zeros(len(node), dtype=np.intp)
+    for _ in range(max_hops):
+        live = ~tables.sinks[node]
+        nxt = tables.next_hop[cls, leg, node]
+        live &= nxt >= 0
+        if not live.any():
+            break
+        node, nxt, leg, weight = node[live], nxt[live], leg[live], weight[live]
+        d = np.hypot(*(pos_m[nxt] - pos_m[node]).T)
+        np.add.at(spent, node, weight * tx_energy(bits, d))
+        np.add.at(spent, nxt, weight * rx_energy(bits))
+        leg = leg | tables.switch[cls, node]
+        node = nxt
+    return spent
+
+
+# ============================================================
+# BATTERIES
+# ============================================================
+class BatteryModel:
+    """Residual energy of every node, drained in vectorized timesteps.
+
+    drain(spent, dt) subtracts the given per-node active energy plus
+    IDLE_POWER * dt from every live battery node, records the time each
+    node hits zero and returns the nodes that died in this step.
+    """
+
+    def __init__(self, level, capacity=CAPACITY_J, idle_power=IDLE_POWER, powered=None):
+        self.level = np.asarray(level, dtype=np.float64).copy()
+        self.capacity = np.broadcast_to(np.asarray(capacity, dtype=np.float64), self.level.shape)
+        self.idle_power = idle_power
+        # Mains-powered nodes (controllers) never drain and never die
+        self.powered = np.zeros(len(self.level), dtype=bool) if powered is None else np.asarray(powered)
+        self.level[self.powered] = self.capacity[self.powered]
+        self.t = 0.0
+        self.death = np.full(len(self.level), np.inf)
+        self.death[self.level <= 0] = 0.0
+        self.consumed = 0.0
+
+    @classmethod
+    def from_topology(cls, topo, capacity=CAPACITY_J, idle_power=IDLE_POWER, powered=("controller",)):
+        """Start from the topology's battery percentages"""
+        mains = np.isin(topo.node_type, [NODE_TYPES.index(t) for t in powered])
+        return cls(capacity * topo.battery / 100.0, capacity, idle_power, mains)
+
+    @property
+    def n(self):
+        return len(self.level)
+
+    def alive(self):
+        return self.level > 0
+
+    def percent(self):
+        """Battery in whole percent (int16, like Topology.battery)"""
+        return np.ceil(self.level / self.capacity * 100).astype(np.int16)
+
+    def drain(self, spent, dt):
+        alive = self.alive()
+        before = self.level.sum()
+        self.level -= np.where(alive & ~self.powered, spent + self.idle_power * dt, 0.0)
+        np.maximum(self.level, 0.0, out=self.level)
+        self.consumed += before - self.level.sum()
+        self.t += dt
+        died = np.flatnonzero(alive & (self.level <= 0))
+        self.death[died] = self.t
+        return died
+
+    def lifetime(self):
+        """Network lifetime: time of the first death and of half the battery nodes dead"""
+        order = np.sort(self.death[~self.powered])
+        half = order[(len(order) + 1) // 2 - 1] if len(order) else np.inf
+        first = order[0] if len(order) else np.inf
+        return {"first_death": None if np.isinf(first) else float(first),
+                "half_dead": None if np.isinf(half) else float(half),
+                "alive": int(self.alive().sum()),
+                "consumed_j": float(self.consumed)}
+
+
+# ============================================================
+# BENCHMARK
+# ============================================================
+def benchmark(sizes=(1_000, 10_000, 100_000), steps=100):
+    """Cost of one vectorized timestep (traffic walk + drain) vs node count"""
+    from netsim import hop_tables
+    from topology import generate_topology
+
+    print(f"{'nodes':>7} {'route ms':>9} {'drain us':>9}")
+    for n in sizes:
+        topo = generate_topology(n, seed=0)
+        tables = hop_tables(topo)
+        sources = np.flatnonzero(topo.node_type == 0)
+        pos_m = topo.pos * FIELD_SIZE
+        batteries = BatteryModel.from_topology(topo)
+
+        t0 = time.perf_counter()
+        spent = route_energy(pos_m, tables, sources, 10.0)
+        route = (time.perf_counter() - t0) * 1000
+        t0 = time.perf_counter()
+        for _ in range(steps):
+            batteries.drain(spent, 10.0)
+        drain = (time.perf_counter() - t0) / steps * 1e6
+        print(f"{n:7d} {route:9.1f} {drain:9.0f}")
+
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser(description="Energy model timestep benchmark")
+    p.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    args = p.parse_args()
+    benchmark(args.sizes)
@@ -0,0 +1,427 @@
+import asyncio
+import random
+import json
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from protocol import ESP_CMD, STREAM_CMD, StreamDecoder, decode_any, encode_frame
+from ringbuffer import RingBuffer
+
+
+# ============================================================
+# GATEWAY CONFIGURATION
+# ============================================================
+POLL_INTERVAL = 1.0      # seconds between polls of one device
+CONNECT_TIMEOUT = 3.0    # per-poll connect + read budget
+MAX_CONCURRENCY = 512    # connection attempts in flight at the same time
+RECONNECT_MIN = 0.5      # streaming reconnect backoff bounds (seconds)
+RECONNECT_MAX = 10.0
+BUFFER = 250
+
+# mode is "poll" (connect per reading) or "stream" (one long-lived connection)
+Device = namedtuple("Device", "device_id host port mode", defaults=("poll",))
+
+
+# ============================================================
+# DEVICE REGISTRY
+# ============================================================
+class DeviceRegistry:
+    def __init__(self, devices=()):
+        self.devices = {}
+        for dev in devices:
+            self.add(*dev)
+
+    def add(self, device_id, host, port=8080, mode="poll"):
+        """Register (or replace) a device"""
+        if mode not in ("poll", "stream"):
+            raise ValueError(f"Unknown device mode: {mode}")
+        self.devices[device_id] = Device(device_id, host, int(port), mode)
+        return self.devices[device_id]
+
+    def remove(self, device_id):
+        self.devices.pop(device_id, None)
+
+    def __iter__(self):
+        return iter(list(self.devices.values()))
+
+    def __len__(self):
+        return len(self.devices)
+
+    @classmethod
+    def from_config(cls, cfg):
+        """Build from a config dict: {"devices": [{"id", "host", "port", "mode"}]}"""
+        return cls((d["id"], d["host"], d.get("port", 8080), d.get("mode", "poll"))
+                   for d in cfg.get("devices", []))
+
+    @classmethod
+    def from_file(cls, path):
+        """Load devices from a JSON config file"""
+        with open(path, 'r') as f:
+            return cls.from_config(json.load(f))
+
+
+# ============================================================
+# PER-DEVICE BUFFERS
+# ============================================================
+class DeviceBuffer:
+    """Readings and link metrics for a single device"""
+
+    VITALS = ("temp", "hum", "hr", "spo2")
+    LINK = ("lat", "thr", "jit")
+
+    def __init__(self, size=BUFFER):
+        for name in self.VITALS:
+            setattr(self, name, RingBuffer(size, np.float32))
+        for name in self.LINK:
+            setattr(self, name, RingBuffer(size))
+        self.readings = 0
+        self.malformed = 0
+        self.failures = 0
+        self.connected = False
+        self.last_data = 0.0
+        self.arrived = 0.0          # perf_counter() when the last batch was received
+        self._prev_lat = None
+
+    def record(self, records, latency, nbytes):
+        """Store a PACKET_DTYPE batch; returns False if it was empty"""
+        n = len(records)
+        if n == 0:
+            return False
+        now = time.time()
+        for name in self.VITALS:
+            getattr(self, name).extend(records[name], now)
+
+        self.lat.append(latency, now)
+        if self._prev_lat is not None:
+            self.jit.append(abs(latency - self._prev_lat), now)
+        self._prev_lat = latency
+        self.thr.append(nbytes * 8 / ((latency / 1000) + 0.001), now)
+
+        self.readings += n
+        self.last_data = now
+        self.connected = True
+        return True
+
+
+# ============================================================
+# ASYNCIO INGESTION GATEWAY
+# ============================================================
+class IngestionGateway:
+    """Polls every registered device concurrently.
+
+    Each device gets its own task, so a slow or dead node only ever
+    burns its own timeout budget and never delays the others. metrics, if
+    given, is a metrics.WsnMetrics fed per poll / chunk / batch.
+    """
+
+    def __init__(self, registry, interval=POLL_INTERVAL, timeout=CONNECT_TIMEOUT,
+                 buffer_size=BUFFER, max_concurrency=MAX_CONCURRENCY, on_reading=None,
+                 metrics=None):
+        self.registry = registry
+        self.metrics = metrics
+        self.interval = interval
+        self.timeout = timeout
+        self.buffer_size = buffer_size
+        self.max_concurrency = max_concurrency
+        self.on_reading = on_reading
+        self.buffers = {}
+        self.loop = None
+        self._tasks = {}
+        self._sem = None
+        self._stopped = None
+
+    def buffer(self, device_id):
+        buf = self.buffers.get(device_id)
+        if buf is None:
+            buf = self.buffers[device_id] = DeviceBuffer(self.buffer_size)
+        return buf
+
+    @property
+    def total_readings(self):
+        return sum(b.readings for b in self.buffers.values())
+
+    # --------------------------------------------------------
+    async def poll_once(self, dev):
+        """One connect / READ_ALL / read round trip; returns (raw bytes, latency_ms)"""
+        start = time.perf_counter()
+        async with self._sem:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(dev.host, dev.port), self.timeout)
+            try:
+                writer.write(ESP_CMD.encode())
+                await writer.drain()
+                # The sketch closes after its packet, so read to EOF
+                raw = await asyncio.wait_for(reader.read(), self.timeout)
+            finally:
+                writer.close()
+        return raw, (time.perf_counter() - start) * 1000
+
+    async def _poll_device(self, dev):
+        buf = self.buffer(dev.device_id)
+        metrics = self.metrics
+        next_due = time.monotonic()
+        while not self._stopped.is_set():
+            try:
+                raw, latency = await self.poll_once(dev)
+                buf.arrived = time.perf_counter()
+                records, bad = decode_any(raw)
+                buf.malformed += bad
+                if metrics is not None:
+                    metrics.polled(dev.device_id, latency / 1000)
+                    metrics.reject(dev.device_id, bad)
+                    metrics.record(dev.device_id, records)
+                if buf.record(records, latency, len(raw)) and self.on_reading:
+                    self.on_reading(dev.device_id, records)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                buf.failures += 1
+                if metrics is not None:
+                    metrics.connect_failed(dev.device_id)
+                if time.time() - buf.last_data > self.timeout + self.interval:
+                    buf.connected = False
+
+            # Fixed-rate schedule: a slow poll does not push later polls back
+            next_due += self.interval
+            delay = next_due - time.monotonic()
+            if delay < 0:
+                next_due = time.monotonic()
+                delay = 0
+            await asyncio.sleep(delay)
+
+    async def _stream_device(self, dev):
+        """Hold one connection open and consume newline-framed packets.
+
+        There is no request to time in this mode, so the latency series
+        records the inter-arrival gap between packets instead.
+        """
+        buf = self.buffer(dev.device_id)
+        metrics = self.metrics
+        parser = StreamDecoder()
+        backoff = RECONNECT_MIN
+        while not self._stopped.is_set():
+            writer = None
+            try:
+                async with self._sem:
+                    reader, writer = await asyncio.wait_for(
+                        asyncio.open_connection(dev.host, dev.port), self.timeout)
+                writer.write(STREAM_CMD.encode())
+                await writer.drain()
+                parser.reset()
+                last = prev_chunk = time.perf_counter()
+                # wait_for() can swallow a cancel on 3.11, so the stop flag is
+                # checked too
+                while not self._stopped.is_set():
+                    chunk = await asyncio.wait_for(reader.read(65536), self.timeout)
+                    if not chunk:
+                        raise ConnectionResetError("stream closed by device")
+                    now = buf.arrived = time.perf_counter()
+                    records, bad = parser.feed(chunk)
+                    buf.malformed += bad
+                    if metrics is not None:
+                        metrics.chunk_gap(dev.device_id, now - prev_chunk)
+                        metrics.reject(dev.device_id, bad)
+                        metrics.record(dev.device_id, records)
+                    prev_chunk = now
+                    if len(records):
+                        gap = (now - last) * 1000 / len(records)
+                        if buf.record(records, gap, len(chunk)):
+                            backoff = RECONNECT_MIN
+                            if self.on_reading:
+                                self.on_reading(dev.device_id, records)
+                        last = now
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+                buf.failures += 1
+                buf.connected = False
+                if metrics is not None:
+                    metrics.connect_failed(dev.device_id)
+            finally:
+                if writer is not None:
+                    writer.close()
+
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, RECONNECT_MAX)
+
+    # --------------------------------------------------------
+    def _spawn(self, dev):
+        self.buffer(dev.device_id)
+        worker = self._stream_device if dev.mode == "stream" else self._poll_device
+        self._tasks[dev.device_id] = self.loop.create_task(worker(dev))
+
+    def sync_registry(self):
+        """Start tasks for new devices and cancel tasks for removed ones"""
+        for dev in self.registry:
+            if dev.device_id not in self._tasks:
+                self._spawn(dev)
+        for device_id in list(self._tasks):
+            if device_id not in self.registry.devices:
+                self._tasks.pop(device_id).cancel()
+
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        self._sem = asyncio.Semaphore(self.max_concurrency)
+        self._stopped = asyncio.Event()
+        self.sync_registry()
+        try:
+            await self._stopped.wait()
+        finally:
+            for task in self._tasks.values():
+                task.cancel()
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+            self._tasks.clear()
+
+    def stop(self):
+        """Thread-safe stop request"""
+        if self.loop is not None and self._stopped is not None:
+            self.loop.call_soon_threadsafe(self._stopped.set)
+
+    def start_in_thread(self):
+        """Run the gateway on its own event loop in a daemon thread"""
+        thread = threading.Thread(target=asyncio.run, args=(self.run(),), daemon=True)
+        thread.start()
+        return thread
+
+
+# ============================================================
+# FAKE ESP32 DEVICE (LOCAL TESTING)
+# ============================================================
+class FakeESP32:
+    """Local stand-in for sketch_dec10a.ino.
+
+    A client that sends READ_ALL gets one packet and the socket is closed;
+    a client that sends STREAM keeps the socket and receives a packet every
+    stream_interval seconds, like the sketch's loop() does.
+
+    delay -- seconds to wait before answering (slow node)
+    dead  -- accept connections but never answer
+    fmt   -- "text" packets or "binary" frames (USE_BINARY_FRAMES)
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, delay=0.0, dead=False,
+                 stream_interval=0.05, fmt="text", device_id=0, seed=None):
+        self.host = host
+        self.port = port
+        self.delay = delay
+        self.dead = dead
+        self.stream_interval = stream_interval
+        self.fmt = fmt
+        self.device_id = device_id
+        self.seq = 0
+        self.started = time.monotonic()
+        self.rng = random.Random(seed)
+        self.served = 0
+        self.server = None
+
+    def readings(self):
+        """Next (temp, hum, hr, spo2) sample"""
+        rng = self.rng
+        return (round(rng.uniform(24, 27), 1), round(rng.uniform(50, 60), 1),
+                round(rng.uniform(65, 90), 1), round(rng.uniform(95, 99), 1))
+
+    def packet(self):
+        """Next packet as bytes, in this device's wire format"""
+        self.seq += 1
+        return self.encode(self.readings())
+
+    def encode(self, vals):
+        if self.fmt == "binary":
+            ts_ms = (time.monotonic() - self.started) * 1000
+            return encode_frame(self.device_id, self.seq, ts_ms, *vals)
+        return ("TEMP:%.1f|HUM:%.1f|HR:%.1f|SPO2:%.1f\r\n" % vals).encode()
+
+    async def _handle(self, reader, writer):
+        try:
+            cmd = await asyncio.wait_for(reader.readline(), 5)
+            if self.dead:
+                await reader.read()              # hold the socket until the client gives up
+                return
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            if cmd.startswith(STREAM_CMD.strip().encode()):
+                await self._stream(writer)
+                return
+            writer.write(self.packet())
+            await writer.drain()
+            self.served += 1
+        except (OSError, asyncio.TimeoutError, asyncio.CancelledError):
+            pass                                 # client went away or fleet shut down
+        finally:
+            writer.close()
+
+    async def _stream(self, writer):
+        while not writer.is_closing():
+            writer.write(self.packet())
+            await writer.drain()
+            self.served += 1
+            await asyncio.sleep(self.stream_interval)
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+
+
+async def start_fake_fleet(n, mode="poll", **kwargs):
+    """Start n fake devices; returns (devices, registry)"""
+    fleet = [await FakeESP32(seed=i, device_id=i, **kwargs).start() for i in range(n)]
+    registry = DeviceRegistry((f"fake-{i:04d}", d.host, d.port, mode)
+                              for i, d in enumerate(fleet))
+    return fleet, registry
+
+
+# ============================================================
+# BENCHMARK
+# ============================================================
+async def _bench_one(n_devices, duration, interval, dead, mode, stream_interval, fmt):
+    fleet, registry = await start_fake_fleet(n_devices, mode=mode, fmt=fmt,
+                                             stream_interval=stream_interval)
+    dead_nodes = [await FakeESP32(dead=True).start() for _ in range(dead)]
+    for i, d in enumerate(dead_nodes):
+        registry.add(f"dead-{i:04d}", d.host, d.port)
+
+    gw = IngestionGateway(registry, interval=interval, timeout=1.0)
+    runner = asyncio.ensure_future(gw.run())
+    await asyncio.sleep(0.5)                         # warm-up
+    start_count, start = gw.total_readings, time.perf_counter()
+    await asyncio.sleep(duration)
+    rate = (gw.total_readings - start_count) / (time.perf_counter() - start)
+
+    gw.stop()
+    await runner
+    for d in fleet + dead_nodes:
+        d.close()
+    return rate
+
+
+def benchmark(counts=(1, 10, 50, 100, 250), duration=3.0, interval=0.0, dead=0,
+              mode="poll", stream_interval=0.0, fmt="text"):
+    """Print sustained readings/sec as the device count grows"""
+    print(f"mode: {mode}  format: {fmt}")
+    print(f"{'devices':>8} {'dead':>5} {'readings/s':>12} {'per device':>11}")
+    for n in counts:
+        rate = asyncio.run(_bench_one(n, duration, interval, dead, mode,
+                                      stream_interval, fmt))
+        print(f"{n:8d} {dead:5d} {rate:12.1f} {rate / n:11.1f}")
+
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser(description="Ingestion gateway benchmark")
+    p.add_argument("--devices", type=int, nargs="+", default=[1, 10, 50, 100, 250])
+    p.add_argument("--duration", type=float, default=3.0)
+    p.add_argument("--interval", type=float, default=0.0,
+                   help="poll interval per device (0 = as fast as possible)")
+    p.add_argument("--dead", type=int, default=0, help="extra unresponsive devices")
+    p.add_argument("--mode", choices=["poll", "stream"], default="poll")
+    p.add_argument("--stream-interval", type=float, default=0.0,
+                   help="seconds between pushed packets in stream mode")
+    p.add_argument("--format", choices=["text", "binary"], default="text",
+                   help="wire format spoken by the fake devices")
+    args = p.parse_args()
+    benchmark(args.devices, args.duration, args.interval, args.dead,
+              args.mode, args.stream_interval, args.format)
@@ -0,0 +1,271 @@
+import asyncio
+import json
+import multiprocessing as mp
+import os
+import threading
+import time
+
+import numpy as np
+
+from gateway import DeviceRegistry, FakeESP32, IngestionGateway
+
+try:
+    import resource
+except ImportError:         # Windows
+    resource = None
+
+
+# ============================================================
+# LOAD TEST CONFIGURATION
+# ============================================================
+# Emulated devices run in a child process so the CPU / memory figures
+# belong to the ingestion side only. Each packet's humidity field carries
+# a sequence tag (0.0 - 99.9) and the send time of every tag is written to
+# shared memory; both processes use the same monotonic clock, so the
+# consumer can compute end-to-end latency per reading.
+TAG_SPACE = 1000
+LATENCY_PERCENTILES = (50, 90, 99, 99.9)
+
+
+# ============================================================
+# EMULATED ESP32
+# ============================================================
+class EmulatedESP32(FakeESP32):
+    """FakeESP32 with a sample rate, send jitter, packet loss and disconnects.
+
+    rate             -- packets per second (stream) / expected polls per second
+    jitter           -- +/- seconds of uniform noise on each send time (stream)
+    loss             -- probability that a packet is silently dropped
+    disconnect_every -- mean seconds between dropped connections (0 = never)
+    """
+
+    def __init__(self, rate=10.0, jitter=0.0, loss=0.0, disconnect_every=0.0,
+                 sent=None, slot=0, **kwargs):
+        super().__init__(stream_interval=1.0 / rate, **kwargs)
+        self.rate = rate
+        self.jitter = jitter
+        self.loss = loss
+        self.disconnect_every = disconnect_every
+        self.sent = sent
+        self.slot = slot
+        self.lost = 0
+        self.disconnects = 0
+
+    def readings(self):
+        temp, _, hr, spo2 = super().readings()
+        return temp, (self.seq % TAG_SPACE) / 10, hr, spo2
+
+    def packet(self):
+        self.seq += 1
+        if self.loss and self.rng.random() < self.loss:
+            self.lost += 1
+            return b""
+        data = self.encode(self.readings())
+        if self.sent is not None:
+            self.sent[self.slot * TAG_SPACE + self.seq % TAG_SPACE] = time.monotonic()
+        return data
+
+    async def _stream(self, writer):
+        rng = self.rng
+        p_drop = self.stream_interval / self.disconnect_every if self.disconnect_every else 0.0
+        next_due = time.monotonic()
+        while not writer.is_closing():
+            data = self.packet()
+            if data:
+                writer.write(data)
+                await writer.drain()
+                self.served += 1
+            if p_drop and rng.random() < p_drop:
+                self.disconnects += 1
+                return                           # _handle closes the socket
+
+            # Fixed rate with jitter around each nominal send time
+            next_due += self.stream_interval
+            delay = next_due - time.monotonic()
+            if self.jitter:
+                delay += rng.uniform(-self.jitter, self.jitter)
+            await asyncio.sleep(max(delay, 0.0))
+
+
+# ============================================================
+# FLEET PROCESS
+# ============================================================
+def _fleet_main(conn, n, options, sent):
+    asyncio.run(_serve_fleet(conn, n, options, sent))
+
+
+async def _serve_fleet(conn, n, options, sent):
+    fleet = [await EmulatedESP32(device_id=i, seed=i, slot=i, sent=sent, **options).start()
+             for i in range(n)]
+    conn.send([d.port for d in fleet])
+    await asyncio.get_running_loop().run_in_executor(None, conn.recv)     # stop request
+    conn.send({"served": sum(d.served for d in fleet),
+               "lost": sum(d.lost for d in fleet),
+               "disconnects": sum(d.disconnects for d in fleet)})
+    for d in fleet:
+        d.close()
+
+
+# ============================================================
+# INGESTION SIDE
+# ============================================================
+def _peak_rss_mb():
+    if resource is None:
+        return float("nan")
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if os.uname().sysname == "Darwin" else rss / 1024
+
+
+class _ChartLoad:
+    """Renders the first device's buffers on Agg, like the monitor tab does"""
+
+    def __init__(self, buf, fps):
+        import matplotlib
+        matplotlib.use("Agg")
+        from charts import PANELS, BlitChartRenderer, _new_figure
+        canvas, axes = _new_figure()
+        self.renderer = BlitChartRenderer(
+            canvas, [(ax, title, color) for ax, (title, color, _, _) in zip(axes, PANELS)])
+        self.buf = buf
+        self.period = 1.0 / fps
+        self.frame_ms = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        buf = self.buf
+        while not self._stop.wait(self.period):
+            t0 = time.perf_counter()
+            self.renderer.update([buf.hr.window(150), buf.spo2.window(150),
+                                  buf.temp.window(150), buf.hum.window(150),
+                                  buf.lat.window(150), buf.thr.window(150)])
+            self.frame_ms.append((time.perf_counter() - t0) * 1000)
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+async def _drive(ports, sent, mode, rate, duration, warmup, charts_fps):
+    registry = DeviceRegistry((f"emu-{i:04d}", "127.0.0.1", port, mode)
+                              for i, port in enumerate(ports))
+    slots = {f"emu-{i:04d}": i for i in range(len(ports))}
+    sent_at = np.frombuffer(sent, dtype=np.float64)
+    latencies = []
+
+    def on_reading(device_id, records):
+        now = time.monotonic()
+        tags = np.rint(records["hum"] * 10).astype(np.intp) % TAG_SPACE
+        latencies.append(now - sent_at[slots[device_id] * TAG_SPACE + tags])
+
+    gw = IngestionGateway(registry, interval=1.0 / rate, timeout=2.0, on_reading=on_reading)
+    runner = asyncio.ensure_future(gw.run())
+    await asyncio.sleep(warmup)
+    chart = _ChartLoad(gw.buffer(next(iter(slots))), charts_fps) if charts_fps else None
+
+    latencies.clear()
+    readings0 = gw.total_readings
+    failures0 = sum(b.failures for b in gw.buffers.values())
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    await asyncio.sleep(duration)
+    wall = time.perf_counter() - wall0
+    cpu = time.process_time() - cpu0
+    readings = gw.total_readings - readings0
+    failures = sum(b.failures for b in gw.buffers.values()) - failures0
+    malformed = sum(b.malformed for b in gw.buffers.values())
+
+    if chart is not None:
+        chart.stop()
+    gw.stop()
+    await runner
+
+    lat_ms = np.concatenate(latencies) * 1000 if latencies else np.empty(0)
+    report = {
+        "readings": readings,
+        "readings_per_s": readings / wall,
+        "latency_ms": {f"p{p:g}": float(np.percentile(lat_ms, p)) if len(lat_ms) else None
+                       for p in LATENCY_PERCENTILES},
+        "latency_max_ms": float(lat_ms.max()) if len(lat_ms) else None,
+        "cpu_percent": cpu / wall * 100,
+        "peak_rss_mb": _peak_rss_mb(),
+        "connect_failures": failures,
+        "malformed": malformed,
+    }
+    if chart is not None and chart.frame_ms:
+        report["chart_frame_ms"] = {f"p{p:g}": float(np.percentile(chart.frame_ms, p))
+                                    for p in (50, 99)}
+    return report
+
+
+def run(devices=50, mode="stream", rate=10.0, jitter=0.0, loss=0.0, disconnect_every=0.0,
+        fmt="text", duration=10.0, warmup=1.0, charts_fps=0.0):
+    """Start the emulated fleet, drive the ingestion gateway, return a report dict"""
+    sent = mp.RawArray("d", devices * TAG_SPACE)
+    parent, child = mp.Pipe()
+    options = dict(rate=rate, jitter=jitter, loss=loss,
+                   disconnect_every=disconnect_every, fmt=fmt)
+    proc = mp.Process(target=_fleet_main, args=(child, devices, options, sent), daemon=True)
+    proc.start()
+    try:
+        ports = parent.recv()
+        report = asyncio.run(_drive(ports, sent, mode, rate, duration, warmup, charts_fps))
+        parent.send("stop")
+        fleet = parent.recv()
+    finally:
+        proc.join(5)
+        if proc.is_alive():
+            proc.terminate()
+
+    config = dict(devices=devices, mode=mode, format=fmt, rate=rate, jitter=jitter, loss=loss,
+                  disconnect_every=disconnect_every, duration=duration)
+    report = dict(config=config, fleet=fleet, **report)
+    expected = devices * rate * (1 - loss)
+    report["expected_per_s"] = expected
+    return report
+
+
+def print_report(report):
+    cfg = report["config"]
+    print(f"{cfg['devices']} device(s), {cfg['mode']}/{cfg['format']}, {cfg['rate']:g} Hz, "
+          f"jitter {cfg['jitter'] * 1000:g} ms, loss {cfg['loss']:.1%}, "
+          f"disconnect every {cfg['disconnect_every'] or '-'} s, {cfg['duration']:g} s")
+    print(f"  readings/s     {report['readings_per_s']:10.1f}   "
+          f"(expected ~{report['expected_per_s']:.1f})")
+    lat = "  ".join(f"{k} {v:.2f}" for k, v in report["latency_ms"].items() if v is not None)
+    print(f"  latency ms     {lat}  max {report['latency_max_ms'] or 0:.2f}")
+    print(f"  cpu            {report['cpu_percent']:10.1f} % of one core")
+    print(f"  peak rss       {report['peak_rss_mb']:10.1f} MB")
+    print(f"  failures       {report['connect_failures']:10d}   "
+          f"(device disconnects {report['fleet']['disconnects']}, "
+          f"lost {report['fleet']['lost']}, malformed {report['malformed']})")
+    if "chart_frame_ms" in report:
+        frame = report["chart_frame_ms"]
+        print(f"  chart frame ms p50 {frame['p50']:.1f}  p99 {frame['p99']:.1f}")
+
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser(description="Load test the ingestion path with an emulated ESP32 fleet")
+    p.add_argument("--devices", type=int, nargs="+", default=[50])
+    p.add_argument("--mode", choices=["poll", "stream"], default="stream")
+    p.add_argument("--rate", type=float, default=10.0, help="packets/s per device")
+    p.add_argument("--jitter", type=float, default=0.0, help="+/- seconds on each send")
+    p.add_argument("--loss", type=float, default=0.0, help="packet loss probability")
+    p.add_argument("--disconnect-every", type=float, default=0.0,
+                   help="mean seconds between dropped connections (0 = never)")
+    p.add_argument("--format", choices=["text", "binary"], default="text")
+    p.add_argument("--duration", type=float, default=10.0)
+    p.add_argument("--warmup", type=float, default=1.0)
+    p.add_argument("--charts", type=float, default=0.0, metavar="FPS",
+                   help="also render realtime charts (Agg) at this rate")
+    p.add_argument("--json", action="store_true", help="print machine-readable reports")
+    args = p.parse_args()
+
+    for n in args.devices:
+        report = run(n, args.mode, args.rate, args.jitter, args.loss, args.disconnect_every,
+                     args.format, args.duration, args.warmup, args.charts)
+        if args.json:
+            print(json.dumps(report))
+        else:
+            print_report(report)
@@ -0,0 +1,140 @@
+import logging
+import os
+import time
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+
+# ============================================================
+# LOG VIEW CONFIGURATION
+# ============================================================
+MAX_ENTRIES = 200                   # entries kept in the on-screen log
+LOG_MAX_BYTES = 5 * 1024 * 1024     # per on-disk file before it rotates
+LOG_BACKUPS = 5                     # rotated files kept (.1 ... .5)
+
+
+def rotating_logger(name, path, max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS):
+    """A logger writing "<time> <message>" lines to a size-rotated file.
+
+    Safe to call again with the same name: the handler is only added once.
+    """
+    logger = logging.getLogger(name)
+    if not logger.handlers:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+# ============================================================
+# BOUNDED TEXT LOG
+# ============================================================
+class BoundedTextLog:
+    """The last max_entries entries of a tk.Text log, kept in O(1) per append.
+
+    The line count of every entry on screen is remembered, so the widget is
+    never read back: a new entry's first line number is known before it is
+    inserted, a highlight is tagged by line index as part of the insert,
+    and trimming deletes the oldest entry's lines from the top. One tag is
+    configured per colour, once. The view only follows new entries while
+    it is scrolled to the bottom.
+    """
+
+    def __init__(self, text, max_entries=MAX_ENTRIES, font=('Consolas', 9, 'bold')):
+        self.text = text
+        self.max_entries = max_entries
+        self.font = font
+        self._sizes = deque()           # lines per entry, oldest first
+        self._lines = 0                 # complete lines in the widget
+        self._tags = set()
+        self.appended = 0
+
+    def _tag(self, color):
+        name = f"color-{color}"
+        if name not in self._tags:
+            self.text.tag_config(name, foreground=color, font=self.font)
+            self._tags.add(name)
+        return name
+
+    def append(self, entry, highlight=None, color=None):
+        """Add one entry (newline-terminated); `highlight` text is drawn in `color`"""
+        if not entry.endswith("\n"):
+            entry += "\n"
+        follow = self.text.yview()[1] >= 1.0
+
+        pos = entry.find(highlight) if highlight and color else -1
+        if pos >= 0:
+            end = pos + len(highlight)
+            self.text.insert("end", entry[:pos], (), entry[pos:end], (self._tag(color),), entry[end:], ())
+        else:
+            self.text.insert("end", entry)
+
+        lines = entry.count("\n")
+        self._sizes.append(lines)
+        self._lines += lines
+        self.appended += 1
+        while len(self._sizes) > self.max_entries:
+            oldest = self._sizes.popleft()
+            self.text.delete("1.0", f"{oldest + 1}.0")
+            self._lines -= oldest
+        if follow:
+            self.text.see("end")
+
+    def clear(self):
+        self.text.delete("1.0", "end")
+        self._sizes.clear()
+        self._lines = 0
+
+
+# ============================================================
+# BENCHMARK (needs a display)
+# ============================================================
+def _legacy_append(widget, entry, decision, color):
+    # What App.append_to_sdn_log() did before: unbounded insert + full-text scan
+    widget.insert("end", entry)
+    widget.see("end")
+    lines = widget.get("1.0", "end").split('\n')
+    for i, line in enumerate(lines):
+        if decision in line:
+            widget.tag_add("decision", f"{i + 1}.3", f"{i + 1}.51")
+            widget.tag_config("decision", foreground=color)
+            break
+
+
+def benchmark(totals=(1_000, 5_000, 20_000), sample=200):
+    """us per append after N entries: legacy unbounded log vs BoundedTextLog"""
+    import tkinter as tk
+    root = tk.Tk()
+    entry = "\n".join(f"║ line {i:2d} {'.' * 40} ║" for i in range(12)) + "\n║ {0:50} ║\n\n"
+    print(f"{'entries':>8} {'legacy us':>10} {'bounded us':>11}")
+    for total in totals:
+        row = []
+        for bounded in (False, True):
+            widget = tk.Text(root)
+            view = BoundedTextLog(widget)
+            timed = 0.0
+            for i in range(total):
+                decision = f"Decision {i % 5}"
+                text = entry.format(decision)
+                t0 = time.perf_counter()
+                if bounded:
+                    view.append(text, decision, "#ef5350")
+                else:
+                    _legacy_append(widget, text, decision, "#ef5350")
+                if i >= total - sample:
+                    timed += time.perf_counter() - t0
+            row.append(timed / sample * 1e6)
+            widget.destroy()
+        print(f"{total:8d} {row[0]:10.0f} {row[1]:11.0f}")
+    root.destroy()
+
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser(description="SDN log append-cost benchmark (Tk)")
+    p.add_argument("--totals", type=int, nargs="+", default=[1_000, 5_000, 20_000])
+    args = p.parse_args()
+    benchmark(args.totals)
@@ -0,0 +1,423 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+log = logging.getLogger("metrics")
+
+
+# ============================================================
+# METRICS CONFIGURATION
+# ============================================================
+# Prometheus text exposition format 0.0.4, served at http://HOST:PORT/metrics.
+# Times are exported in seconds (Prometheus base units).
+HOST = "127.0.0.1"              # local only
+PORT = 9108
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+COLLECT_ERRORS = "wsn_metrics_collect_errors_total"
+SENSOR_FIELDS = ("temp", "hum", "hr", "spo2")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(v):
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+# ============================================================
+# HOT-PATH INSTRUMENTS
+# ============================================================
+# labels() is looked up once (keep the child); inc() / observe() are a
+# lock, an add and, for histograms, one bisect on a short list.
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, n=1):
+        with self._lock:
+            self.value += n
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    def time(self):
+        """Context manager observing the seconds spent in its block"""
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ("child", "t0")
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.t0)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """The child for these label values (created on first use)"""
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name}: expected labels {self.labelnames}")
+        values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._child())
+        return child
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _child(self):
+        return _CounterChild()
+
+    def inc(self, n=1):
+        self._default.inc(n)
+
+    def collect(self):
+        lines = self.header()
+        for values, child in list(self._children.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, values)} {_number(child.value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.bounds = sorted(float(b) for b in buckets)
+        super().__init__(name, help, labels)
+
+    def _child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+    def collect(self):
+        lines = self.header()
+        for values, child in list(self._children.items()):
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            lines += _histogram_lines(self.name, self.labelnames, values,
+                                      self.bounds, counts, total)
+        return lines
+
+
+def _histogram_lines(name, labelnames, values, bounds, counts, total):
+    lines = []
+    running = 0
+    for bound, count in zip(list(bounds) + [float("inf")], counts):
+        running += int(count)
+        le = f'le="{_number(float(bound))}"'
+        lines.append(f"{name}_bucket{_labels(labelnames, values, le)} {running}")
+    lines.append(f"{name}_sum{_labels(labelnames, values)} {_number(float(total))}")
+    lines.append(f"{name}_count{_labels(labelnames, values)} {running}")
+    return lines
+
+
+# ============================================================
+# SCRAPE-TIME METRICS
+# ============================================================
+class CallbackMetric:
+    """Values read only when scraped: fn() -> {label values tuple: value}
+    (or a plain number when there are no labels). Zero hot-path cost."""
+
+    def __init__(self, name, help, fn, kind="gauge", labels=()):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.kind = kind
+        self.labelnames = tuple(labels)
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        values = self.fn()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for key, value in values.items():
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class LatencyHistogramMetric:
+    """Exports an existing sdn.LatencyHistogram (bounds in ms) as a
+    Prometheus histogram in seconds; it keeps recording as before."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, hist, labels=(), values=(), scale=1e-3):
+        self.name = name
+        self.help = help
+        self.series = [(tuple(values), hist)]
+        self.labelnames = tuple(labels)
+        self.scale = scale
+
+    def add(self, values, hist):
+        """Another histogram under the same name (different label values)"""
+        self.series.append((tuple(values), hist))
+        return self
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, hist in self.series:
+            counts, total, _ = hist.snapshot()
+            lines += _histogram_lines(self.name, self.labelnames, values,
+                                      [round(b * self.scale, 12) for b in hist.bounds.tolist()],
+                                      counts.tolist(), total * self.scale)
+        return lines
+
+
+# ============================================================
+# WSN INSTRUMENTS
+# ============================================================
+class WsnMetrics:
+    """The instruments the dashboard (app2) and the headless controller
+    both export, on one Registry.
+
+    Ingestion code calls connect_failed() / polled() / chunk_gap() /
+    record() / reject() per device; decisions(stream) exports a
+    sdn.DecisionStream's latency histograms.
+    """
+
+    def __init__(self, registry=None, fields=SENSOR_FIELDS):
+        self.registry = r = registry if registry is not None else Registry()
+        self.fields = fields
+        self.connect_failures = r.counter(
+            "wsn_connect_failures_total", "Device connections that failed, dropped or timed out",
+            ["device"])
+        self.poll_latency = r.histogram(
+            "wsn_poll_latency_seconds", "Connect + READ_ALL + read round trip of one poll", ["device"])
+        self.stream_gap = r.histogram(
+            "wsn_stream_gap_seconds", "Time between chunks received on a streaming connection",
+            ["device"])
+        self.packets = r.counter("wsn_packets_total", "Packets received", ["device"])
+        self.readings = r.counter(
+            "wsn_readings_total", "Valid (non-NaN) readings per sensor", ["device", "sensor"])
+        self.parse_failures = r.counter(
+            "wsn_parse_failures_total", "Packets or replies that could not be parsed", ["device"])
+
+    def connect_failed(self, device):
+        self.connect_failures.labels(device).inc()
+
+    def polled(self, device, seconds):
+        self.poll_latency.labels(device).observe(seconds)
+
+    def chunk_gap(self, device, seconds):
+        self.stream_gap.labels(device).observe(seconds)
+
+    def record(self, device, packets):
+        """Count a parsed batch: its packets and each field's non-NaN readings"""
+        self.packets.labels(device).inc(len(packets))
+        for field in self.fields:
+            valid = int(np.count_nonzero(~np.isnan(packets[field])))
+            if valid:
+                self.readings.labels(device, field).inc(valid)
+
+    def reject(self, device, count):
+        if count:
+            self.parse_failures.labels(device).inc(count)
+
+    def decisions(self, stream):
+        """Export the arrival-to-decision latency of a DecisionStream"""
+        self.registry.register(LatencyHistogramMetric(
+            "wsn_decision_latency_seconds", "Packet arrival to SDN decision", stream.latency))
+        self.registry.register(LatencyHistogramMetric(
+            "wsn_critical_decision_latency_seconds", "Packet arrival to critical SDN decision",
+            stream.critical_latency))
+        return self
+
+
+# ============================================================
+# REGISTRY + HTTP ENDPOINT
+# ============================================================
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self.scrapes = 0
+        # Rendered last, so a scrape already reports its own failures
+        self.collect_errors = Counter(COLLECT_ERRORS, "Metrics whose collection failed during a scrape",
+                                      ["metric"])
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def callback(self, name, help, fn, kind="gauge", labels=()):
+        return self.register(CallbackMetric(name, help, fn, kind, labels))
+
+    def render(self):
+        """Every metric in Prometheus text format"""
+        self.scrapes += 1
+        lines = []
+        for metric in self._metrics:
+            try:
+                lines += metric.collect()
+            except Exception:
+                # One broken collector must not hide the rest
+                self.collect_errors.labels(metric.name).inc()
+                log.exception("Collecting %s failed", metric.name)
+        lines += self.collect_errors.collect()
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """GET /metrics on a local HTTP server (daemon thread)"""
+
+    def __init__(self, registry, host=HOST, port=PORT):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        if self._server is not None:
+            return self
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = self._thread = None
+
+
+# ============================================================
+# BENCHMARK
+# ============================================================
+def benchmark(n=1_000_000):
+    """ns per recorded event on the hot path"""
+    from sdn import LatencyHistogram
+
+    registry = Registry()
+    counter = registry.counter("bench_total", "benchmark counter", ["device"]).labels("esp32")
+    hist = registry.histogram("bench_seconds", "benchmark histogram", ["device"]).labels("esp32")
+    legacy = LatencyHistogram()
+    values = (np.random.default_rng(0).lognormal(-5, 1.5, 1024)).tolist()
+
+    def per_op(fn, count):
+        t0 = time.perf_counter()
+        fn(count)
+        return (time.perf_counter() - t0) / count * 1e9
+
+    def loop_inc(count):
+        for _ in range(count):
+            counter.inc()
+
+    def loop_observe(count):
+        for i in range(count):
+            hist.observe(values[i & 1023])
+
+    def loop_legacy(count):
+        for i in range(count):
+            legacy.observe(values[i & 1023])
+
+    def loop_empty(count):
+        for i in range(count):
+            values[i & 1023]
+
+    base = per_op(loop_empty, n)
+    print(f"{'operation':>34} {'ns/op':>7}")
+    print(f"{'Counter.inc()':>34} {per_op(loop_inc, n) - base:7.0f}")
+    print(f"{'Histogram.observe(x)':>34} {per_op(loop_observe, n) - base:7.0f}")
+    print(f"{'LatencyHistogram.observe(x)':>34} {per_op(loop_legacy, n // 20) - base:7.0f}")
+    t0 = time.perf_counter()
+    text = registry.render()
+    print(f"{'render()':>34} {(time.perf_counter() - t0) * 1e9:7.0f}  ({len(text)} bytes)")
+
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser(description="Metrics recording overhead benchmark")
+    p.add_argument("-n", type=int, default=1_000_000)
+    args = p.parse_args()
+    benchmark(args.n)
@@ -0,0 +1,264 @@
+import multiprocessing as mp
+import os
+import pickle
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from scipy import stats
+
+from netsim import NetworkSimulator, engine_tables, policy_tables
+from topology import generate_topology
+
+
+# ============================================================
+# MONTE CARLO CONFIGURATION
+# ============================================================
+# Replication i runs every policy with seed + i, so the policies see the
+# same traffic pattern (common random numbers) and their bands compare
+# like with like.
+METRICS = ("throughput_kbps", "latency_ms", "energy_mj")
+SCALARS = ("pdr", "throughput_kbps", "latency_mean_ms", "energy_per_packet_mj")
+CONFIDENCE = 0.95
+UPDATE_INTERVAL = 0.25          # s between progress callbacks while results stream in
+
+
+# ============================================================
+# WORKER PROCESS
+# ============================================================
+# A pool outlives one comparison, so the topology and the forwarding tables
+# are not pool initializer arguments: each comparison pickles them to a job
+# file once, tasks carry its path, and a worker loads it on its first task
+# of that comparison (keeping only the latest).
+_worker = {}
+
+
+def process_pool(workers=None):
+    """A worker pool for MonteCarloComparison (reusable across comparisons)"""
+    # spawn: the GUI process has live threads, which fork would copy mid-state
+    return ProcessPoolExecutor(workers or os.cpu_count() or 1, mp_context=mp.get_context("spawn"))
+
+
+def _load_job(job):
+    if _worker.get("job") != job:
+        with open(job, 'rb') as f:
+            _worker["topo"], _worker["tables"] = pickle.load(f)
+        _worker["job"] = job
+    return _worker["topo"], _worker["tables"]
+
+
+def _replicate(job, policy, seed, traffic):
+    topo, tables = _load_job(job)
+    sim = NetworkSimulator(topo, policy, seed=seed, tables=tables[policy])
+    r = sim.run(**traffic)
+    return policy, {"series": {k: r["series"][k] for k in METRICS},
+                    **{k: r[k] for k in SCALARS}}
+
+
+# ============================================================
+# CONFIDENCE BANDS
+# ============================================================
+def confidence_interval(samples, confidence=CONFIDENCE):
+    """(mean, low, high) along axis 0 with a Student-t half width; NaNs ignored"""
+    samples = np.asarray(samples, dtype=np.float64)
+    n = np.sum(~np.isnan(samples), axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.nanmean(samples, axis=0) if samples.size else np.full(samples.shape[1:], np.nan)
+        sd = np.nanstd(samples, axis=0, ddof=1) if len(samples) > 1 else np.zeros_like(mean)
+        half = stats.t.ppf((1 + confidence) / 2, np.maximum(n - 1, 1)) * sd / np.sqrt(n)
+    half = np.where(n > 1, half, 0.0)
+    return mean, mean - half, mean + half
+
+
+class ReplicationStats:
+    """Per-policy results collected so far, summarized on demand"""
+
+    def __init__(self, policies, bins, bin_s=1.0, confidence=CONFIDENCE):
+        self.policies = list(policies)
+        self.bins = bins
+        self.bin_s = bin_s
+        self.confidence = confidence
+        self.results = {p: [] for p in self.policies}
+
+    def add(self, policy, result):
+        self.results[policy].append(result)
+
+    def _aligned(self, runs, metric):
+        out = np.full((len(runs), self.bins), np.nan)
+        for row, r in zip(out, runs):
+            y = r["series"][metric][:self.bins]
+            row[:len(y)] = y
+        return out
+
+    def summary(self):
+        """{policy: {"n", "t", "series": {metric: (mean, lo, hi)}, scalar: (mean, lo, hi)}}"""
+        out = {}
+        for policy, runs in self.results.items():
+            entry = {"n": len(runs), "t": np.arange(self.bins) * self.bin_s,
+                     "series": {metric: confidence_interval(self._aligned(runs, metric), self.confidence)
+                                for metric in METRICS}}
+            for key in SCALARS:
+                vals = [np.nan if r[key] is None else r[key] for r in runs]
+                ci = confidence_interval(np.array(vals).reshape(-1, 1), self.confidence)
+                entry[key] = tuple(float(v[0]) for v in ci)
+            out[policy] = entry
+        return out
+
+
+# ============================================================
+# PARALLEL RUNNER
+# ============================================================
+class MonteCarloComparison:
+    """Seeded replications of several policies across a process pool.
+
+    start() returns at once: forwarding tables are built, the pool is
+    started and results are collected on a background thread. on_update
+    is called with a fresh summary at most every UPDATE_INTERVAL seconds
+    while replications complete (and once more at the end), from that
+    thread -- a GUI should hand it to its own loop (e.g. root.after).
+
+    `topo` is read from that thread, so it must not change while the
+    comparison runs (pass a Topology.copy()). A live routing `engine` is
+    only read here, in the constructor (the caller's thread): its tables
+    are taken for "sdn" at once. `tables` may supply prebuilt tables per
+    policy; the rest are built in the background from `topo`.
+
+    `pool` (see process_pool()) is used and left running, so a GUI can keep
+    one for every comparison; without it a pool of `workers` processes is
+    started and shut down per comparison. cancel() only drops this
+    comparison's tasks.
+    """
+
+    def __init__(self, topo, policies=("sdn", "shortest-hop"), replications=32, workers=None,
+                 seed=0, confidence=CONFIDENCE, engine=None, duration=30.0, bin_s=1.0,
+                 tables=None, pool=None, **traffic):
+        self.topo = topo
+        self.policies = list(policies)
+        self.tables = dict(tables or {})
+        if engine is not None and "sdn" in self.policies and "sdn" not in self.tables:
+            self.tables["sdn"] = engine_tables(engine, topo.n)
+        self.replications = replications
+        self.workers = workers or os.cpu_count() or 1
+        self.seed = seed
+        self.traffic = dict(traffic, duration=duration, bin_s=bin_s)
+        self.stats = ReplicationStats(self.policies, int(np.ceil(duration / bin_s)), bin_s, confidence)
+        self.total = replications * len(self.policies)
+        self.completed = 0
+        self.errors = []
+        self.elapsed = 0.0
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._pool = pool
+        self._own_pool = pool is None
+        self._futures = []
+        self._thread = None
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def start(self, on_update=None):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(on_update,), daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self, on_update):
+        t0 = time.perf_counter()
+        job = None
+        try:
+            tables = {p: self.tables[p] if p in self.tables else policy_tables(self.topo, p)
+                      for p in self.policies}
+            if self._cancel.is_set():
+                return
+            fd, job = tempfile.mkstemp(prefix="montecarlo-", suffix=".pkl")
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((self.topo, tables), f, protocol=pickle.HIGHEST_PROTOCOL)
+            if self._pool is None:
+                self._pool = process_pool(self.workers)
+            self._futures = [self._pool.submit(_replicate, job, policy, self.seed + i, self.traffic)
+                             for i in range(self.replications) for policy in self.policies]
+            if self._cancel.is_set():
+                self._drop_futures()
+                return
+            last = 0.0
+            for future in as_completed(self._futures):
+                if self._cancel.is_set():
+                    break
+                try:
+                    policy, result = future.result()
+                except Exception as e:
+                    self.errors.append(e)
+                    continue
+                self.stats.add(policy, result)
+                self.completed += 1
+                now = time.perf_counter()
+                if on_update is not None and now - last >= UPDATE_INTERVAL:
+                    last = now
+                    on_update(self.stats.summary())
+        except Exception as e:
+            self.errors.append(e)           # e.g. tables or pool failed; report what finished
+        finally:
+            self._drop_futures()
+            if self._own_pool and self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            if job is not None:
+                try:
+                    os.remove(job)          # late tasks of a cancelled run fail, unread
+                except OSError:
+                    pass
+            self.elapsed = time.perf_counter() - t0
+            self._done.set()
+        if on_update is not None and not self._cancel.is_set():
+            on_update(self.stats.summary())
+
+    def _drop_futures(self):
+        for future in self._futures:
+            future.cancel()
+
+    def cancel(self):
+        """Stop collecting; queued replications are dropped"""
+        self._cancel.set()
+        self._drop_futures()
+
+    def result(self, timeout=None):
+        """Block until every replication has finished; returns the summary"""
+        self._done.wait(timeout)
+        return self.stats.summary()
+
+
+# ============================================================
+# BENCHMARK
+# ============================================================
+def benchmark(nodes=200, replications=16, workers=None, duration=30.0, rate=5.0):
+    """Wall time of the same replications with 1..N worker processes"""
+    topo = generate_topology(nodes, seed=0)
+    cores = os.cpu_count() or 1
+    counts = workers or sorted({1, cores} | {2 ** k for k in range(1, 6) if 2 ** k < cores})
+    print(f"{nodes} nodes, {replications} replications x 2 policies, {duration:g} s at {rate:g} pkt/s")
+    base = None
+    for w in counts:
+        mc = MonteCarloComparison(topo, replications=replications, workers=w,
+                                  duration=duration, rate=rate).start()
+        summary = mc.result()
+        base = base or mc.elapsed
+        print(f"  {w:2d} worker(s): {mc.elapsed:6.2f} s  ({base / mc.elapsed:.1f}x)")
+    for policy, entry in summary.items():
+        pdr, lo, hi = entry["pdr"]
+        lat, llo, lhi = entry["latency_mean_ms"]
+        print(f"  {policy:>13}: PDR {pdr:.2%} [{lo:.2%}, {hi:.2%}]  "
+              f"latency {lat:.2f} ms [{llo:.2f}, {lhi:.2f}]  n={entry['n']}")
+
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser(description="Parallel Monte Carlo comparison benchmark")
+    p.add_argument("--nodes", type=int, default=200)
+    p.add_argument("--replications", type=int, default=16)
+    p.add_argument("--workers", type=int, nargs="+")
+    p.add_argument("--duration", type=float, default=30.0)
+    p.add_argument("--rate", type=float, default=5.0)
+    args = p.parse_args()
+    benchmark(args.nodes, args.replications, args.workers, args.duration, args.rate)
@@ -0,0 +1,355 @@
+import re
+import struct
+import time
+
+import numpy as np
+
+
+# ============================================================
+# ESP32 SENSOR PROTOCOL
+# ============================================================
+# Text packets sent by sketch_dec10a.ino, one per line:
+#   TEMP:25.0|HUM:55.0|HR:72.0|SPO2:98.0
+#
+# or, with USE_BINARY_FRAMES, fixed 20-byte little-endian frames:
+#   magic u8 | version u8 | device_id u16 | seq u32 | ts_ms u32 |
+#   temp i16 | hum i16 | hr i16 | spo2 i16      (vitals in tenths)
+# ts_ms is the device clock (millis()). Readers tell the two formats apart
+# by the first byte (0xA5 vs ASCII text).
+
+ESP_CMD = "READ_ALL\n"
+STREAM_CMD = "STREAM\n"   # keep the connection open and push every packet
+FIELDS = ("TEMP", "HUM", "HR", "SPO2")
+
+# One parsed record per complete packet line
+PACKET_DTYPE = np.dtype([("temp", "f4"), ("hum", "f4"), ("hr", "f4"), ("spo2", "f4")])
+MAX_LINE = 4096           # a partial line longer than this is dropped as malformed
+MAX_FIELD = 24            # longer numbers are rejected as malformed, never truncated
+
+FRAME_MAGIC = 0xA5
+FRAME_VERSION = 1
+FRAME_DTYPE = np.dtype([("magic", "u1"), ("version", "u1"), ("device_id", "<u2"),
+                        ("seq", "<u4"), ("ts_ms", "<u4"),
+                        ("temp", "<i2"), ("hum", "<i2"), ("hr", "<i2"), ("spo2", "<i2")])
+FRAME_STRUCT = struct.Struct("<BBHIIhhhh")
+FRAME_SIZE = FRAME_STRUCT.size                       # 20 bytes
+_FRAME_HEADER = bytes((FRAME_MAGIC, FRAME_VERSION))
+
+# Decoded binary frames: the PACKET_DTYPE fields plus frame metadata
+FRAME_RECORD_DTYPE = np.dtype([("temp", "f4"), ("hum", "f4"), ("hr", "f4"), ("spo2", "f4"),
+                               ("device_id", "u2"), ("seq", "u4"), ("ts", "f8")])
+
+_NUM = rb"([-+]?\d+(?:\.\d*)?)"
+_PACKET_RE = re.compile(
+    rb"^[ \t]*TEMP:" + _NUM + rb"\|HUM:" + _NUM + rb"\|HR:" + _NUM +
+    rb"\|SPO2:" + _NUM + rb"[ \t\r]*$", re.M)
+_LINE_RE = re.compile(rb"^[ \t\r]*[^\s]", re.M)
+
+# Fast path: with the numbers deleted, a clean buffer is this skeleton n times
+_NUMERIC = b"0123456789.-+"
+_TO_SPACE = bytes(c if c in _NUMERIC else 0x20 for c in range(256))
+_SKELETONS = (b"TEMP:|HUM:|HR:|SPO:\r\n", b"TEMP:|HUM:|HR:|SPO:\n")
+
+
+# ============================================================
+# PARSE SENSOR PACKET
+# ============================================================
+def parse_packet(line):
+    vals = {"TEMP": None, "HUM": None, "HR": None, "SPO2": None}
+
+    try:
+        for p in line.strip().split("|"):
+            if ":" in p:
+                key, val = p.split(":")
+                if key in vals:
+                    vals[key] = float(val)
+    except:
+        pass
+
+    return vals
+
+
+# ============================================================
+# BATCH PACKET PARSER
+# ============================================================
+def parse_batch(buf):
+    """Parse every packet line in a byte buffer.
+
+    Returns (records, malformed): a PACKET_DTYPE array with one row per
+    well-formed TEMP|HUM|HR|SPO2 line, and the number of non-blank lines
+    that did not match. The buffer is treated as complete lines; use
+    PacketParser when reads can split a line.
+    """
+    records = _parse_clean(buf)
+    if records is not None:
+        return records, 0
+
+    fields = [f for f in _PACKET_RE.findall(buf) if max(map(len, f)) <= MAX_FIELD]
+    malformed = len(_LINE_RE.findall(buf)) - len(fields)
+    if not fields:
+        return np.empty(0, dtype=PACKET_DTYPE), malformed
+    vals = np.array(fields, dtype=f"S{MAX_FIELD}").astype(np.float32)
+    return vals.view(PACKET_DTYPE).ravel(), malformed
+
+
+def _parse_clean(buf):
+    """Vectorised parse of a buffer made only of well-formed lines, else None"""
+    n = buf.count(b"\n")
+    if n == 0 or buf[-1:] != b"\n":
+        return None
+    skeleton = buf.translate(None, _NUMERIC)
+    if skeleton != _SKELETONS[0] * n and skeleton != _SKELETONS[1] * n:
+        return None
+    tokens = buf.replace(b"SPO2:", b"SPO:").translate(_TO_SPACE).split()
+    if len(tokens) != 4 * n:          # an empty field
+        return None
+    if max(map(len, tokens)) > MAX_FIELD:
+        return None                   # let the slow path count the over-long line
+    try:
+        vals = np.array(tokens, dtype=np.float32)
+    except ValueError:                # e.g. "1.2.3" or a bare "-"
+        return None
+    return vals.view(PACKET_DTYPE)
+
+
+class PacketParser:
+    """Incremental parser for a byte stream of packet lines.
+
+    Complete lines are parsed in one batch per feed(); a trailing partial
+    line is carried over and completed by the next read.
+    """
+
+    def __init__(self):
+        self._tail = b""
+        self.parsed = 0
+        self.malformed = 0
+
+    def feed(self, data):
+        """Returns (records, malformed) for the lines completed by data"""
+        buf = self._tail + data if self._tail else data
+        cut = buf.rfind(b"\n")
+        if cut < 0:
+            self._tail = buf
+            if len(buf) > MAX_LINE:
+                self._tail = b""
+                self.malformed += 1
+                return np.empty(0, dtype=PACKET_DTYPE), 1
+            return np.empty(0, dtype=PACKET_DTYPE), 0
+
+        self._tail = buf[cut + 1:]
+        records, bad = parse_batch(buf[:cut + 1])
+        self.parsed += len(records)
+        self.malformed += bad
+        return records, bad
+
+    def reset(self):
+        """Forget any partial line (call after a reconnect)"""
+        self._tail = b""
+
+
+# ============================================================
+# BINARY FRAME CODEC
+# ============================================================
+def _tenths(x):
+    return int(round(x * 10))
+
+
+def encode_frame(device_id, seq, ts_ms, temp, hum, hr, spo2):
+    """Pack one reading into a 20-byte frame"""
+    return FRAME_STRUCT.pack(FRAME_MAGIC, FRAME_VERSION, device_id,
+                             seq & 0xFFFFFFFF, int(ts_ms) & 0xFFFFFFFF,
+                             _tenths(temp), _tenths(hum), _tenths(hr), _tenths(spo2))
+
+
+def encode_frames(device_id, seq, ts_ms, temp, hum, hr, spo2):
+    """Pack arrays of readings into one bytes object (scalars broadcast)"""
+    n = max(np.size(x) for x in (seq, ts_ms, temp, hum, hr, spo2))
+    frames = np.empty(n, dtype=FRAME_DTYPE)
+    frames["magic"] = FRAME_MAGIC
+    frames["version"] = FRAME_VERSION
+    frames["device_id"] = device_id
+    frames["seq"] = np.asarray(seq, dtype=np.int64) & 0xFFFFFFFF
+    frames["ts_ms"] = np.asarray(ts_ms, dtype=np.int64) & 0xFFFFFFFF
+    for name, vals in (("temp", temp), ("hum", hum), ("hr", hr), ("spo2", spo2)):
+        frames[name] = np.rint(np.asarray(vals, dtype=np.float64) * 10)
+    return frames.tobytes()
+
+
+def frames_to_records(frames):
+    """Scale raw FRAME_DTYPE rows into FRAME_RECORD_DTYPE (one vectorised pass)"""
+    records = np.empty(len(frames), dtype=FRAME_RECORD_DTYPE)
+    for name in ("temp", "hum", "hr", "spo2"):
+        np.divide(frames[name], np.float32(10), out=records[name], casting="unsafe")
+    records["device_id"] = frames["device_id"]
+    records["seq"] = frames["seq"]
+    records["ts"] = frames["ts_ms"] / 1000.0
+    return records
+
+
+def decode_frames(buf):
+    """Decode every complete frame in buf.
+
+    Returns (records, consumed, malformed): a FRAME_RECORD_DTYPE array, how
+    many bytes of buf were used (the rest is a partial frame) and how many
+    corrupt frames were skipped while resynchronising on the magic byte.
+    """
+    n = len(buf) // FRAME_SIZE
+    frames = np.frombuffer(buf, dtype=FRAME_DTYPE, count=n)
+    ok = (frames["magic"] == FRAME_MAGIC) & (frames["version"] == FRAME_VERSION)
+    if ok.all():
+        return frames_to_records(frames), n * FRAME_SIZE, 0
+
+    # Slow path: walk the buffer, skipping to the next header after a bad frame
+    buf = bytes(buf)
+    good, pos, malformed = [], 0, 0
+    while len(buf) - pos >= FRAME_SIZE:
+        if buf[pos] == FRAME_MAGIC and buf[pos + 1] == FRAME_VERSION:
+            good.append(buf[pos:pos + FRAME_SIZE])
+            pos += FRAME_SIZE
+            continue
+        malformed += 1
+        nxt = buf.find(_FRAME_HEADER, pos + 1)
+        if nxt < 0:
+            # Keep a lone trailing magic byte: it may start the next frame
+            pos = len(buf) - 1 if buf[-1] == FRAME_MAGIC else len(buf)
+            break
+        pos = nxt
+    frames = np.frombuffer(b"".join(good), dtype=FRAME_DTYPE)
+    return frames_to_records(frames), pos, malformed
+
+
+class StreamDecoder:
+    """Auto-detecting decoder for a device's byte stream.
+
+    The first non-blank byte picks the format (binary frames start with
+    FRAME_MAGIC, text packets with an ASCII letter). feed() returns
+    (records, malformed); records have temp/hum/hr/spo2 fields in both
+    formats, plus device_id/seq/ts for binary frames.
+    """
+
+    def __init__(self):
+        self.format = None          # "text" | "binary" once detected
+        self._text = PacketParser()
+        self._tail = b""
+        self.parsed = 0
+        self.malformed = 0
+
+    def feed(self, data):
+        if self.format is None:
+            data = (self._tail + data).lstrip()
+            self._tail = b""
+            if not data:
+                return np.empty(0, dtype=PACKET_DTYPE), 0
+            self.format = "binary" if data[0] == FRAME_MAGIC else "text"
+
+        if self.format == "text":
+            records, bad = self._text.feed(data)
+        else:
+            buf = self._tail + data if self._tail else data
+            records, used, bad = decode_frames(buf)
+            self._tail = buf[used:]
+        self.parsed += len(records)
+        self.malformed += bad
+        return records, bad
+
+    def reset(self):
+        """Forget the format and any partial input (call after a reconnect)"""
+        self.format = None
+        self._text.reset()
+        self._tail = b""
+
+
+def decode_any(buf):
+    """One-shot decode of a complete buffer in either format"""
+    if buf[:1] == _FRAME_HEADER[:1]:
+        records, used, bad = decode_frames(buf)
+        return records, bad + (used < len(buf))
+    return parse_batch(buf)
+
+
+# ============================================================
+# BENCHMARK
+# ============================================================
+def benchmark(lines=200_000, bad_every=50):
+    """Lines/sec of parse_packet (one line at a time) vs parse_batch"""
+    good = b"TEMP:25.3|HUM:55.1|HR:72.4|SPO2:98.0\r\n"
+    bad = b"TEMP:25.3|HUM:??|HR\r\n"
+    buf = b"".join(bad if bad_every and i % bad_every == 0 else good
+                   for i in range(lines))
+
+    t0 = time.perf_counter()
+    text = buf.decode()
+    n_old = 0
+    for line in text.split("\n"):
+        if "TEMP:" in line:
+            vals = parse_packet(line)
+            n_old += vals["TEMP"] is not None
+    old = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    records, malformed = parse_batch(buf)
+    new = time.perf_counter() - t0
+
+    # Same buffer, delivered in 1 KiB reads like the listener sees it
+    parser = PacketParser()
+    t0 = time.perf_counter()
+    for i in range(0, len(buf), 1024):
+        parser.feed(buf[i:i + 1024])
+    chunked = time.perf_counter() - t0
+
+    print(f"lines: {lines}  (1 malformed every {bad_every})")
+    print(f"{'parser':<22} {'lines/s':>12} {'parsed':>9} {'malformed':>10}")
+    print(f"{'parse_packet':<22} {lines / old:12.0f} {n_old:9d} {'-':>10}")
+    print(f"{'parse_batch':<22} {lines / new:12.0f} {len(records):9d} {malformed:10d}")
+    print(f"{'PacketParser 1KiB':<22} {lines / chunked:12.0f} "
+          f"{parser.parsed:9d} {parser.malformed:10d}")
+
+
+def benchmark_formats(records=200_000):
+    """Wire size and decode throughput: text packets vs binary frames"""
+    rng = np.random.default_rng(0)
+    temp = np.round(rng.uniform(24, 27, records), 1)
+    hum = np.round(rng.uniform(50, 60, records), 1)
+    hr = np.round(rng.uniform(60, 120, records), 1)
+    spo2 = np.round(rng.uniform(92, 99, records), 1)
+
+    text = "".join("TEMP:%.1f|HUM:%.1f|HR:%.1f|SPO2:%.1f\r\n" % row
+                   for row in zip(temp, hum, hr, spo2)).encode()
+    binary = encode_frames(7, np.arange(records), np.arange(records) * 50, temp, hum, hr, spo2)
+
+    t0 = time.perf_counter()
+    text_recs, _ = parse_batch(text)
+    text_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    bin_recs, _, _ = decode_frames(binary)
+    bin_s = time.perf_counter() - t0
+
+    # Same streams in 1 KiB reads through the auto-detecting decoder
+    results = []
+    for buf in (text, binary):
+        dec = StreamDecoder()
+        t0 = time.perf_counter()
+        for i in range(0, len(buf), 1024):
+            dec.feed(buf[i:i + 1024])
+        results.append((dec.parsed, time.perf_counter() - t0))
+
+    assert np.allclose(text_recs["hr"], bin_recs["hr"])
+    print(f"records: {records}")
+    print(f"{'format':<8} {'bytes/rec':>10} {'decode rec/s':>14} {'1KiB stream rec/s':>19}")
+    print(f"{'text':<8} {len(text) / records:10.1f} {records / text_s:14.0f} "
+          f"{results[0][0] / results[0][1]:19.0f}")
+    print(f"{'binary':<8} {len(binary) / records:10.1f} {records / bin_s:14.0f} "
+          f"{results[1][0] / results[1][1]:19.0f}")
+
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser(description="Packet parser microbenchmark")
+    p.add_argument("--lines", type=int, default=200_000)
+    p.add_argument("--bad-every", type=int, default=50,
+                   help="insert a malformed line every N lines (0 = none)")
+    args = p.parse_args()
+    benchmark(args.lines, args.bad_every)
+    print()
+    benchmark_formats(args.lines)
@@ -0,0 +1,188 @@
+import time
+
+import numpy as np
+
+
+# ============================================================
+# FIXED-SIZE NUMPY RING BUFFER
+# ============================================================
+class RingBuffer:
+    """Preallocated ring of samples with timestamps.
+
+    Every sample is written twice (slot i and slot i + capacity), so the
+    last n samples are always one contiguous slice and window() returns a
+    zero-copy view.
+
+    Single writer, many readers, no locks: the writer fills both slots
+    before publishing the new count, so a reader that samples the count
+    once sees a complete window. A view stays valid for capacity - n
+    further appends; copy it if it has to outlive that. A full-capacity
+    window starts at the slot the next append overwrites, so it is
+    always returned as a copy.
+    """
+
+    def __init__(self, capacity, dtype=np.float64):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._data = np.zeros(2 * capacity, dtype=dtype)
+        self._ts = np.zeros(2 * capacity, dtype=np.float64)
+        self._count = 0          # total samples ever appended
+
+    # --------------------------------------------------------
+    # WRITER SIDE
+    # --------------------------------------------------------
+    def append(self, value, ts=None):
+        """O(1) append of one sample"""
+        cap = self.capacity
+        i = self._count % cap
+        if ts is None:
+            ts = time.time()
+        self._data[i] = value
+        self._data[i + cap] = value
+        self._ts[i] = ts
+        self._ts[i + cap] = ts
+        self._count += 1         # publish
+
+    def extend(self, values, ts=None):
+        """Append a batch of samples (ts: scalar, array or None = now)"""
+        values = np.asarray(values, dtype=self._data.dtype).ravel()
+        n = len(values)
+        if n == 0:
+            return
+        if ts is None:
+            ts = time.time()
+        ts = np.broadcast_to(np.asarray(ts, dtype=np.float64), (n,))
+
+        cap = self.capacity
+        if n > cap:
+            # Only the newest capacity samples survive anyway
+            skip = n - cap
+            values, ts = values[skip:], ts[skip:]
+            count, n = self._count + skip, cap
+        else:
+            count = self._count
+
+        start = count % cap
+        first = min(n, cap - start)
+        for lo, hi, src in ((start, start + first, slice(0, first)),
+                            (0, n - first, slice(first, n))):
+            if hi > lo:
+                self._data[lo:hi] = values[src]
+                self._data[lo + cap:hi + cap] = values[src]
+                self._ts[lo:hi] = ts[src]
+                self._ts[lo + cap:hi + cap] = ts[src]
+        self._count = count + n  # publish
+
+    def clear(self):
+        self._count = 0
+
+    # --------------------------------------------------------
+    # READER SIDE
+    # --------------------------------------------------------
+    def _bounds(self, n, count):
+        size = min(count, self.capacity)
+        n = size if n is None else max(0, min(n, size))
+        start = (count - n) % self.capacity
+        return start, start + n
+
+    def _slice(self, arr, lo, hi):
+        view = arr[lo:hi]
+        return view.copy() if hi - lo == self.capacity else view
+
+    def window(self, n=None):
+        """Zero-copy view of the last n samples (all samples if n is None)"""
+        lo, hi = self._bounds(n, self._count)
+        return self._slice(self._data, lo, hi)
+
+    def times(self, n=None):
+        """Zero-copy view of the timestamps matching window(n)"""
+        lo, hi = self._bounds(n, self._count)
+        return self._slice(self._ts, lo, hi)
+
+    def snapshot(self, n=None):
+        """(timestamps, values) views taken against the same count"""
+        lo, hi = self._bounds(n, self._count)
+        return self._slice(self._ts, lo, hi), self._slice(self._data, lo, hi)
+
+    def since(self, t0):
+        """Views of every sample stamped at or after t0"""
+        ts, vals = self.snapshot()
+        i = int(np.searchsorted(ts, t0, side='left'))
+        return ts[i:], vals[i:]
+
+    @property
+    def total(self):
+        """Number of samples appended over the buffer's lifetime"""
+        return self._count
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    def __getitem__(self, key):
+        # Keeps list-style access working: buf[-1], buf[-150:]
+        if isinstance(key, slice):
+            if key.step is None and key.stop is None and key.start is not None and key.start < 0:
+                return self.window(-key.start)
+            return self.window()[key]
+        size = len(self)
+        if key < 0:
+            key += size
+        if not 0 <= key < size:
+            raise IndexError("ring buffer index out of range")
+        lo, _ = self._bounds(size, self._count)
+        return self._data[lo + key]
+
+    def __iter__(self):
+        return iter(self.window())
+
+    def __repr__(self):
+        return f"RingBuffer(capacity={self.capacity}, len={len(self)}, dtype={self._data.dtype})"
+
+
+# ============================================================
+# BENCHMARK
+# ============================================================
+def benchmark(sizes=(250, 10_000, 100_000), samples=200_000, window=150):
+    """Compare list + pop(0) against RingBuffer for append and windowing"""
+    print(f"{'size':>8} {'list append':>13} {'ring append':>13} "
+          f"{'list [-w:]':>12} {'ring [-w:]':>12}   (ns/op)")
+    for size in sizes:
+        buf = []
+        t0 = time.perf_counter()
+        for i in range(samples):
+            buf.append(float(i))
+            if len(buf) > size:
+                buf.pop(0)
+        list_append = (time.perf_counter() - t0) / samples * 1e9
+
+        ring = RingBuffer(size, np.float32)
+        t0 = time.perf_counter()
+        for i in range(samples):
+            ring.append(float(i), 0.0)
+        ring_append = (time.perf_counter() - t0) / samples * 1e9
+
+        w = min(window, size) if window else size
+        reps = 20_000
+        t0 = time.perf_counter()
+        for _ in range(reps):
+            buf[-w:]
+        list_win = (time.perf_counter() - t0) / reps * 1e9
+        t0 = time.perf_counter()
+        for _ in range(reps):
+            ring[-w:]
+        ring_win = (time.perf_counter() - t0) / reps * 1e9
+
+        print(f"{size:8d} {list_append:13.0f} {ring_append:13.0f} "
+              f"{list_win:12.0f} {ring_win:12.0f}")
+
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser(description="Ring buffer benchmark")
+    p.add_argument("--sizes", type=int, nargs="+", default=[250, 10_000, 100_000])
+    p.add_argument("--samples", type=int, default=200_000)
+    p.add_argument("--window", type=int, default=150,
+                   help="window length to slice (0 = whole buffer)")
+    args = p.parse_args()
+    benchmark(args.sizes, args.samples, args.window)
@@ -0,0 +1,457 @@
+import heapq
+import time
+
+import networkx as nx
+import numpy as np
+
+
+# ============================================================
+# ROUTE CLASSES AND COST FUNCTIONS
+# ============================================================
+# Edge costs are built from the endpoints' traffic_load (mean, 0..1) and
+# battery (min, as a 0..1 fraction). Every function takes NumPy arrays
+# over all edges, so a whole topology is weighted in one call.
+def medical_cost(load, battery):
+    """Fastest path: avoid congestion at almost any energy price"""
+    return 1.0 + 6.0 * load ** 2 + 0.2 * (1.0 - battery)
+
+
+def emergency_cost(load, battery):
+    """Fast, but steer clear of nearly-dead relays"""
+    return 1.0 + 3.0 * load + 2.0 * (1.0 - battery) ** 2
+
+
+def normal_cost(load, battery):
+    """Energy-aware: spare low-battery nodes, accept longer paths"""
+    return 1.0 + load + 6.0 * (1.0 - battery) ** 2
+
+
+COST_FUNCTIONS = {
+    "medical": medical_cost,
+    "emergency": emergency_cost,
+    "normal": normal_cost,
+}
+
+# SDN decision (sdn.DECISIONS) -> route class
+DECISION_CLASS = {
+    "Medical Priority Path": "medical",
+    "Emergency Routing": "emergency",
+    "Alert Routing": "normal",
+    "Environmental Routing": "normal",
+    "Normal Routing": "normal",
+}
+
+ROOT = None          # parent of a tree root (a controller / a gateway's offset edge)
+INF = float("inf")
+
+
+def edge_arrays(G, battery, traffic_load, edges=None):
+    """(edges, mean load, min battery fraction) as NumPy arrays"""
+    edges = list(G.edges()) if edges is None else list(edges)
+    if not edges:
+        return edges, np.empty(0), np.empty(0)
+    u, v = zip(*edges)
+    load_u = np.fromiter((traffic_load[n] for n in u), np.float64, len(u))
+    load_v = np.fromiter((traffic_load[n] for n in v), np.float64, len(v))
+    bat_u = np.fromiter((battery[n] for n in u), np.float64, len(u)) / 100.0
+    bat_v = np.fromiter((battery[n] for n in v), np.float64, len(v)) / 100.0
+    return edges, (load_u + load_v) / 2, np.minimum(bat_u, bat_v)
+
+
+# ============================================================
+# DYNAMIC SHORTEST-PATH TREE
+# ============================================================
+class ShortestPathTree:
+    """Multi-source shortest-path tree that is repaired, not rebuilt.
+
+    sources maps each root to its starting distance (0 for controllers,
+    the controller cost for gateways). After edge weights change,
+    repair() only touches the affected part of the tree:
+
+      * a tree edge that got more expensive (or vanished) invalidates the
+        subtree below it; those nodes are re-seeded from their intact
+        neighbours;
+      * an edge that got cheaper seeds its endpoints;
+
+    and one Dijkstra pass from those seeds settles everything that moves.
+    """
+
+    def __init__(self, G, weight, sources):
+        self.G = G
+        self.weight = weight
+        self.sources = dict(sources)
+        self.dist = {}
+        self.parent = {}
+        self.children = {}
+        self.rebuild()
+
+    def rebuild(self):
+        """Plain multi-source Dijkstra over the whole graph"""
+        self.dist = {}
+        self.parent = {}
+        self.children = {}
+        heap = []
+        for s, d in self.sources.items():
+            if d < self.dist.get(s, INF):
+                self.dist[s] = d
+                heap.append((d, s))
+        for s in self.dist:
+            self._attach(s, ROOT)
+        heapq.heapify(heap)
+        self._settle(heap, set())
+
+    # --------------------------------------------------------
+    def _attach(self, node, parent):
+        old = self.parent.get(node, ROOT)
+        if old is not ROOT and old in self.children:
+            self.children[old].discard(node)
+        self.parent[node] = parent
+        if parent is not ROOT:
+            self.children.setdefault(parent, set()).add(node)
+
+    def _settle(self, heap, changed):
+        dist, adj, weight = self.dist, self.G.adj, self.weight
+        while heap:
+            d, x = heapq.heappop(heap)
+            if d > dist.get(x, INF):
+                continue
+            changed.add(x)
+            for y, attrs in adj[x].items():
+                nd = d + attrs[weight]
+                if nd < dist.get(y, INF):
+                    dist[y] = nd
+                    self._attach(y, x)
+                    heapq.heappush(heap, (nd, y))
+        return changed
+
+    def _subtree(self, root):
+        out, stack = [], [root]
+        while stack:
+            x = stack.pop()
+            out.append(x)
+            stack.extend(self.children.get(x, ()))
+        return out
+
+    # --------------------------------------------------------
+    def repair(self, edges=(), sources=None, removed_nodes=()):
+        """Fix the tree after the given edges changed weight (or were added /
+        removed) and/or root offsets changed. Returns the set of nodes whose
+        distance or parent may have changed."""
+        dist, parent, adj, weight = self.dist, self.parent, self.G.adj, self.weight
+        invalid = set()
+
+        for node in removed_nodes:
+            for child in list(self.children.get(node, ())):
+                invalid.update(self._subtree(child))
+            self._attach(node, ROOT)
+            dist.pop(node, None)
+            parent.pop(node, None)
+            self.children.pop(node, None)
+            self.sources.pop(node, None)
+
+        seeds = []
+        if sources is not None:
+            for s, d in sources.items():
+                old = self.sources.get(s)
+                self.sources[s] = d
+                if s in dist and parent.get(s, 0) is ROOT and (old is None or d > old):
+                    invalid.update(self._subtree(s))
+                elif d < dist.get(s, INF):
+                    seeds.append((s, d, ROOT))
+            for s in set(self.sources) - set(sources):
+                del self.sources[s]
+                if s in dist and parent.get(s, 0) is ROOT:
+                    invalid.update(self._subtree(s))
+
+        for u, v in edges:
+            for a, b in ((u, v), (v, u)):
+                if a not in dist or b not in adj:
+                    continue
+                attrs = adj[a].get(b) if a in adj else None
+                w = INF if attrs is None else attrs[weight]
+                if dist[a] + w < dist.get(b, INF):
+                    seeds.append((b, dist[a] + w, a))      # cheaper way in
+                elif b in dist and parent.get(b, 0) == a and dist[a] + w > dist[b]:
+                    invalid.update(self._subtree(b))       # tree edge got worse
+
+        # Cut the invalid region loose, then re-seed it from the outside
+        for x in invalid:
+            dist[x] = INF
+        for x in invalid:
+            self._attach(x, ROOT)
+        heap = []
+        for x in invalid:
+            if x not in adj:
+                dist.pop(x, None)
+                parent.pop(x, None)
+                continue
+            best, via = self.sources.get(x, INF), ROOT
+            for y, attrs in adj[x].items():
+                if y not in invalid:
+                    nd = dist.get(y, INF) + attrs[weight]
+                    if nd < best:
+                        best, via = nd, y
+            if best < INF:
+                dist[x] = best
+                self._attach(x, via)
+                heap.append((best, x))
+            else:
+                del dist[x]
+                parent.pop(x, None)                           # unreachable now
+        for b, d, a in seeds:
+            if a in invalid:
+                continue                    # its distance was just thrown away
+            if d < dist.get(b, INF):
+                dist[b] = d
+                self._attach(b, a)
+                heap.append((d, b))
+
+        heapq.heapify(heap)
+        return self._settle(heap, set(invalid))
+
+    def path_to_root(self, node):
+        path = [node]
+        while True:
+            p = self.parent.get(path[-1], ROOT)
+            if p is ROOT:
+                return path
+            path.append(p)
+
+
+# ============================================================
+# ROUTING ENGINE
+# ============================================================
+class _ClassRoutes:
+    """Trees + cached routes of one route class"""
+
+    def __init__(self, ctrl, gw):
+        self.ctrl = ctrl            # controllers -> every node
+        self.gw = gw                # gateways (offset by their controller cost) -> every node
+        self.paths = {}             # node -> full route, filled on lookup
+
+    def is_sink(self, node):
+        return node in self.ctrl.sources
+
+    def route(self, node):
+        path = self.paths.get(node)
+        if path is None:
+            if self.is_sink(node):
+                return (node,)
+            tree = self.gw or self.ctrl
+            if node not in tree.dist:
+                return None
+            leg = tree.path_to_root(node)
+            if self.gw is not None:
+                leg += self.ctrl.path_to_root(leg[-1])[1:]     # gateway -> controller
+            path = self.paths[node] = tuple(leg)
+        return path
+
+    def cost(self, node):
+        if self.is_sink(node):
+            return 0.0
+        return (self.gw or self.ctrl).dist.get(node)
+
+
+class RoutingEngine:
+    """Precomputed sensor -> gateway -> controller routes, one table per class.
+
+    For every class the edge weights are computed in one vectorized call,
+    then two shortest-path trees are built:
+
+      1. from all controllers: each gateway's cost to reach the nearest one;
+      2. from all gateways, each starting at that cost: every node's
+         cheapest path to *some* controller through *some* gateway.
+
+    route() / next_hop() / cost() are dict lookups (routes are cached
+    after their first lookup). When batteries, loads or links change,
+    update_nodes() / remove_edge() / add_edge() re-weigh only the touched
+    edges and repair both trees incrementally instead of rebuilding.
+    Without gateways nodes route straight to a controller; without
+    controllers, gateways are the sinks. The engine weighs and edits its
+    own copies of G, battery and traffic_load, never the caller's (e.g.
+    the graph a topology.Topology caches).
+    """
+
+    def __init__(self, G, battery, node_types, traffic_load, cost_functions=COST_FUNCTIONS):
+        self.G = G.copy()
+        self.battery = dict(battery)
+        self.node_types = node_types
+        self.traffic_load = dict(traffic_load)
+        self.cost_functions = dict(cost_functions)
+        self.tables = {}
+        self.build_time = 0.0
+        self.update_time = 0.0
+        self.build()
+
+    def nodes_of(self, kind):
+        return [n for n in self.G.nodes() if self.node_types.get(n) == kind]
+
+    # --------------------------------------------------------
+    def weigh(self, edges=None):
+        """Set a 'w_<class>' attribute on the given (default: all) edges"""
+        edges, load, bat = edge_arrays(self.G, self.battery, self.traffic_load, edges)
+        adj = self.G.adj
+        for cls, fn in self.cost_functions.items():
+            key = f"w_{cls}"
+            for (u, v), c in zip(edges, fn(load, bat).tolist()):
+                adj[u][v][key] = c
+        return edges
+
+    def _roots(self):
+        controllers = self.nodes_of("controller")
+        gateways = self.nodes_of("gateway")
+        if not controllers:
+            controllers, gateways = gateways, []
+        return controllers, gateways
+
+    def build(self):
+        """(Re)compute every routing table from scratch"""
+        t0 = time.perf_counter()
+        self.weigh()
+        controllers, gateways = self._roots()
+        self.tables = {}
+        for cls in self.cost_functions:
+            weight = f"w_{cls}"
+            ctrl = ShortestPathTree(self.G, weight, {c: 0.0 for c in controllers})
+            gw = None
+            if gateways:
+                gw = ShortestPathTree(self.G, weight, self._gateway_offsets(ctrl, gateways))
+            self.tables[cls] = _ClassRoutes(ctrl, gw)
+        self.build_time = time.perf_counter() - t0
+        return self.tables
+
+    @staticmethod
+    def _gateway_offsets(ctrl, gateways):
+        return {g: ctrl.dist[g] for g in gateways if g in ctrl.dist}
+
+    # --------------------------------------------------------
+    def _repair(self, edges, removed_nodes=()):
+        t0 = time.perf_counter()
+        _, gateways = self._roots()
+        changed = set()
+        for routes in self.tables.values():
+            moved = routes.ctrl.repair(edges, removed_nodes=removed_nodes)
+            if routes.gw is not None:
+                offsets = self._gateway_offsets(routes.ctrl, gateways)
+                moved |= routes.gw.repair(edges, sources=offsets, removed_nodes=removed_nodes)
+            if moved:
+                routes.paths = {}           # routes through moved nodes are rebuilt on lookup
+            changed |= moved
+        self.update_time = time.perf_counter() - t0
+        return changed
+
+    def update_nodes(self, battery=None, traffic_load=None):
+        """Apply {node: value} changes and repair the tables; returns moved nodes"""
+        touched = set()
+        for values, target in ((battery, self.battery), (traffic_load, self.traffic_load)):
+            for node, val in (values or {}).items():
+                target[node] = val
+                touched.add(node)
+        edges = {(u, v) for n in touched for u, v in self.G.edges(n)}
+        self.weigh(edges)
+        return self._repair(edges)
+
+    def add_edge(self, u, v):
+        self.G.add_edge(u, v)
+        self.weigh([(u, v)])
+        return self._repair([(u, v)])
+
+    def remove_edge(self, u, v):
+        self.G.remove_edge(u, v)
+        return self._repair([(u, v)])
+
+    def remove_node(self, node):
+        return self.remove_nodes([node])
+
+    def remove_nodes(self, nodes):
+        """Drop several nodes with one repair of every table"""
+        nodes = [n for n in nodes if n in self.G]
+        edges = [e for n in nodes for e in self.G.edges(n)]
+        self.G.remove_nodes_from(nodes)
+        return self._repair(edges, removed_nodes=nodes)
+
+    # --------------------------------------------------------
+    def table(self, decision):
+        """Routes of an SDN decision name or a route class"""
+        return self.tables[DECISION_CLASS.get(decision, decision)]
+
+    def route(self, node, decision="Normal Routing"):
+        """Full path node -> gateway -> controller (None if unreachable)"""
+        return self.table(decision).route(node)
+
+    def next_hop(self, node, decision="Normal Routing"):
+        path = self.route(node, decision)
+        return path[1] if path and len(path) > 1 else None
+
+    def cost(self, node, decision="Normal Routing"):
+        return self.table(decision).cost(node)
+
+
+# ============================================================
+# BENCHMARK
+# ============================================================
+def _random_network(n, seed=0):
+    rng = np.random.default_rng(seed)
+    G = nx.random_geometric_graph(n, np.sqrt(8 / (np.pi * n)), seed=seed)
+    kinds = np.array(['sensor', 'router', 'gateway', 'controller'])
+    types = kinds[rng.choice(4, n, p=[0.6, 0.3, 0.08, 0.02])]
+    types[0] = 'controller'
+    battery = dict(enumerate(rng.integers(10, 101, n).tolist()))
+    load = dict(enumerate(rng.uniform(0.1, 0.9, n).tolist()))
+    return G, battery, dict(enumerate(types.tolist())), load
+
+
+def _same_tables(a, b):
+    for cls in a.tables:
+        for tree in ("ctrl", "gw"):
+            ta, tb = getattr(a.tables[cls], tree), getattr(b.tables[cls], tree)
+            if (ta is None) != (tb is None):
+                return False
+            if ta is not None and (ta.dist.keys() != tb.dist.keys() or any(
+                    abs(ta.dist[k] - tb.dist[k]) > 1e-9 for k in ta.dist)):
+                return False
+    return True
+
+
+def benchmark(sizes=(1_000, 5_000, 20_000, 50_000), changes=(1, 10), rounds=5, lookups=100_000):
+    """Incremental repair vs full rebuild after small random perturbations"""
+    print(f"{'nodes':>6} {'edges':>7} {'build ms':>9} {'lookup ns':>10} "
+          f"{'changed':>8} {'repair ms':>10} {'speedup':>8}  exact")
+    for n in sizes:
+        G, battery, types, load = _random_network(n)
+        engine = RoutingEngine(G, battery, types, load)
+        rng = np.random.default_rng(1)
+        sensors = [v for v in G if types[v] == 'sensor']
+        picks = [sensors[i] for i in rng.integers(0, len(sensors), 1000)]
+        for s in picks:
+            engine.route(s, "Medical Priority Path")
+        t0 = time.perf_counter()
+        for _ in range(lookups // 1000):
+            for s in picks:
+                engine.route(s, "Medical Priority Path")
+        lookup_ns = (time.perf_counter() - t0) / lookups * 1e9
+
+        for k in changes:
+            repair = 0.0
+            for _ in range(rounds):
+                nodes = rng.choice(n, k, replace=False).tolist()
+                engine.update_nodes(
+                    battery={v: int(np.clip(engine.battery[v] + rng.integers(-10, 11), 1, 100)) for v in nodes},
+                    traffic_load={v: float(np.clip(engine.traffic_load[v] + rng.normal(0, 0.1), 0.05, 0.95))
+                                  for v in nodes})
+                repair += engine.update_time
+            repair /= rounds
+            fresh = RoutingEngine(G, engine.battery, types, engine.traffic_load)
+            print(f"{n:6d} {G.number_of_edges():7d} {fresh.build_time * 1000:9.1f} "
+                  f"{lookup_ns:10.0f} {k:8d} {repair * 1000:10.2f} "
+                  f"{fresh.build_time / repair:7.0f}x  {_same_tables(engine, fresh)}")
+
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser(description="Routing table build / repair benchmark")
+    p.add_argument("--sizes", type=int, nargs="+", default=[1_000, 5_000, 20_000, 50_000])
+    p.add_argument("--changes", type=int, nargs="+", default=[1, 10],
+                   help="nodes perturbed per update")
+    args = p.parse_args()
+    benchmark(args.sizes, args.changes)
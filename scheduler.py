@@ -0,0 +1,171 @@
+import threading
+import time
+from collections import deque
+
+
+# ============================================================
+# SCHEDULER CONFIGURATION
+# ============================================================
+FRAME_MS = 50                   # one Tk after() per frame (20 fps at most)
+MAX_QUEUED = 1_000              # unkeyed posts kept between frames (oldest dropped)
+
+
+# ============================================================
+# FRAME SCHEDULER
+# ============================================================
+class UIScheduler:
+    """Every periodic GUI task and every cross-thread GUI update, on one
+    root.after() chain.
+
+    every(name, interval, fn) registers a periodic task by name, so
+    registering it again replaces it instead of adding a second one.
+    post(fn, *args, key=...) may be called from any thread: posts with a
+    key are coalesced (only the latest per key runs), unkeyed posts run
+    in order. Each frame runs the queued posts, then the due tasks, and
+    re-arms a single after(). start() is idempotent and stop() cancels
+    the chain and forgets everything. on_frame(seconds), if given, gets
+    the duration of every frame.
+    """
+
+    def __init__(self, root, frame_ms=FRAME_MS, max_queued=MAX_QUEUED, on_frame=None):
+        self.root = root
+        self.frame_ms = frame_ms
+        self.on_frame = on_frame
+        self._tasks = {}                # name -> [interval s, fn, next due]
+        self._latest = {}               # key -> (fn, args), latest wins
+        self._queue = deque(maxlen=max_queued)
+        self._lock = threading.Lock()
+        self._after = None
+        self.frames = 0
+        self.frame_s = 0.0              # duration of the last frame
+        self.errors = 0
+
+    @property
+    def running(self):
+        return self._after is not None
+
+    def every(self, name, interval, fn):
+        """Run fn() every `interval` seconds (on the Tk thread), starting next frame"""
+        self._tasks[name] = [interval, fn, 0.0]
+
+    def cancel(self, name):
+        self._tasks.pop(name, None)
+
+    def __contains__(self, name):
+        return name in self._tasks
+
+    def post(self, fn, *args, key=None):
+        """Run fn(*args) on the Tk thread at the next frame (thread-safe)"""
+        with self._lock:
+            if key is None:
+                self._queue.append((fn, args))
+            else:
+                self._latest[key] = (fn, args)
+
+    def start(self):
+        if self._after is None:
+            self._after = self.root.after(self.frame_ms, self._frame)
+        return self
+
+    def stop(self):
+        if self._after is not None:
+            try:
+                self.root.after_cancel(self._after)
+            except Exception:
+                pass                    # window already destroyed
+            self._after = None
+        self._tasks.clear()
+        with self._lock:
+            self._latest.clear()
+            self._queue.clear()
+
+    def _call(self, fn, args):
+        try:
+            fn(*args)
+        except Exception:
+            self.errors += 1            # one failing update must not stop the others
+
+    def _frame(self):
+        t0 = time.perf_counter()
+        with self._lock:
+            queued, self._queue = self._queue, deque(maxlen=self._queue.maxlen)
+            latest, self._latest = self._latest, {}
+        for fn, args in queued:
+            self._call(fn, args)
+        for fn, args in latest.values():
+            self._call(fn, args)
+
+        now = time.monotonic()
+        for task in list(self._tasks.values()):
+            interval, fn, due = task
+            if now >= due:
+                task[2] = now + interval
+                self._call(fn, ())
+
+        self.frames += 1
+        self.frame_s = time.perf_counter() - t0
+        if self.on_frame is not None:
+            self.on_frame(self.frame_s)
+        if self._after is not None:
+            try:
+                self._after = self.root.after(self.frame_ms, self._frame)
+            except Exception:
+                self._after = None      # window destroyed by one of the updates
+
+
+# ============================================================
+# BENCHMARK (needs a display)
+# ============================================================
+def benchmark(rates=(10, 100, 1_000), duration=3.0):
+    """Tk callbacks and main-thread ms/s for N decision events/s from a
+    worker thread: one root.after(0) per update (legacy) vs UIScheduler"""
+    import tkinter as tk
+    root = tk.Tk()
+    label = tk.Label(root)
+    label.pack()
+    print(f"{'events/s':>8} {'legacy calls':>13} {'legacy ms/s':>12} "
+          f"{'frames':>7} {'sched ms/s':>11}")
+
+    for rate in rates:
+        row = []
+        for scheduled in (False, True):
+            stats = {"calls": 0, "busy": 0.0}
+            sched = UIScheduler(root).start() if scheduled else None
+
+            def update(i):
+                t0 = time.perf_counter()
+                label.config(text=f"event {i}")
+                stats["calls"] += 1
+                stats["busy"] += time.perf_counter() - t0
+
+            def producer():
+                for i in range(int(rate * duration)):
+                    if sched is None:
+                        root.after(0, update, i)
+                        root.after(0, update, i)
+                    else:
+                        sched.post(update, i, key="live")
+                        sched.post(update, i, key="route")
+                    time.sleep(1 / rate)
+
+            worker = threading.Thread(target=producer, daemon=True)
+            worker.start()
+            end = time.monotonic() + duration + 0.2
+            while time.monotonic() < end:
+                root.update()
+            worker.join()
+            calls = sched.frames if sched else stats["calls"]
+            row += [calls, stats["busy"] / duration * 1000]
+            if sched is not None:
+                sched.stop()
+        print(f"{rate:8d} {row[0]:13d} {row[1]:12.1f} {row[2]:7d} {row[3]:11.1f}")
+    root.destroy()
+
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser(description="GUI update scheduling benchmark (Tk)")
+    p.add_argument("--rates", type=int, nargs="+", default=[10, 100, 1_000])
+    p.add_argument("--duration", type=float, default=3.0)
+    args = p.parse_args()
+    benchmark(args.rates, args.duration)
@@ -0,0 +1,424 @@
+import re
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+# ============================================================
+# SDN DECISION ENGINE
+# ============================================================
+# Shared by the Tk dashboard and the headless controller; must not
+# import tkinter or matplotlib.
+
+THRESHOLDS = {
+    "hr_high": 120.0,     # BPM
+    "spo2_low": 95.0,     # %
+    "temp_high": 38.0,    # °C
+    "hum_high": 85.0,     # %
+}
+
+# Decisions in priority order, with the colour used in the SDN log
+DECISIONS = (
+    ("Medical Priority Path", "#ef5350"),
+    ("Emergency Routing", "#ff9800"),
+    ("Alert Routing", "#ffb74d"),
+    ("Environmental Routing", "#4fc3f7"),
+    ("Normal Routing", "#81c784"),
+)
+# Decisions whose latency counts against the critical-path target
+CRITICAL_DECISIONS = frozenset({"Medical Priority Path", "Emergency Routing"})
+
+
+def load_thresholds(overrides=None):
+    """Default thresholds updated with a (partial) dict from config"""
+    thresholds = dict(THRESHOLDS)
+    for key, val in (overrides or {}).items():
+        if key not in THRESHOLDS:
+            raise ValueError(f"Unknown threshold: {key}")
+        thresholds[key] = float(val)
+    return thresholds
+
+
+# ============================================================
+# VECTORIZED RULE ENGINE
+# ============================================================
+# A rule is {"decision": name, "when": ["spo2 < 95", ...]} (all conditions
+# must hold), optionally with "priority" (0 = most urgent; defaults to its
+# position in the list), "color" and "critical" (defaults to whether the
+# decision is in CRITICAL_DECISIONS, never to its priority). The first
+# matching rule by priority wins; a device that matches none gets the
+# default decision.
+RULE_FIELDS = ("temp", "hum", "hr", "spo2")
+_CONDITION_RE = re.compile(r"\s*(\w+)\s*(>=|<=|>|<)\s*([-+]?\d+(?:\.\d*)?)\s*$")
+_OPS = {">": (1.0, True), ">=": (1.0, False), "<": (-1.0, True), "<=": (-1.0, False)}
+_COLORS = dict(DECISIONS)
+
+
+def default_rules(thresholds=THRESHOLDS):
+    """The dashboard's original decision ladder as rules"""
+    t = thresholds
+    return [
+        {"decision": DECISIONS[0][0], "when": [f"spo2 < {t['spo2_low']}"]},
+        {"decision": DECISIONS[1][0], "when": [f"hr > {t['hr_high']}"]},
+        {"decision": DECISIONS[2][0], "when": [f"temp > {t['temp_high']}"]},
+        {"decision": DECISIONS[3][0], "when": [f"hum > {t['hum_high']}"]},
+    ]
+
+
+def parse_condition(text):
+    """"hr > 120" -> (field, op, value)"""
+    m = _CONDITION_RE.match(text)
+    if not m or m.group(1) not in RULE_FIELDS:
+        raise ValueError(f"Bad rule condition: {text!r} "
+                         f"(expected FIELD OP NUMBER, FIELD one of {', '.join(RULE_FIELDS)})")
+    return m.group(1), m.group(2), float(m.group(3))
+
+
+class RuleEngine:
+    """Threshold rules compiled to NumPy masks, evaluated for all devices at once.
+
+    evaluate() takes an (n, 4) array of [temp, hum, hr, spo2] rows and
+    returns one decision index per row (into .names / .colors /
+    .priorities / .critical). All conditions of all rules are one broadcast compare
+    ("<" rules are negated so every condition becomes "x > v"); rules are
+    then applied from lowest to highest priority so the most urgent
+    match is written last.
+    """
+
+    def __init__(self, rules, default=DECISIONS[-1][0]):
+        ordered = sorted(enumerate(rules), key=lambda ir: (ir[1].get("priority", ir[0]), ir[0]))
+        cols, signs, vals, strict, starts = [], [], [], [], []
+        names, colors, priorities, critical = [], [], [], []
+        self.conditions = []
+        for pos, rule in ordered:
+            conds = [parse_condition(c) for c in rule.get("when", ())]
+            if not conds or "decision" not in rule:
+                raise ValueError(f"Rule needs a decision and at least one condition: {rule!r}")
+            starts.append(len(cols))
+            for field, op, value in conds:
+                sign, is_strict = _OPS[op]
+                cols.append(RULE_FIELDS.index(field))
+                signs.append(sign)
+                vals.append(sign * value)
+                strict.append(is_strict)
+                self.conditions.append((field, op, value))
+            names.append(rule["decision"])
+            colors.append(rule.get("color", _COLORS.get(rule["decision"], "#9e9e9e")))
+            priorities.append(rule.get("priority", pos))
+            critical.append(bool(rule.get("critical", rule["decision"] in CRITICAL_DECISIONS)))
+
+        names.append(default)
+        colors.append(_COLORS.get(default, "#9e9e9e"))
+        priorities.append(max(priorities, default=-1) + 1)
+        critical.append(default in CRITICAL_DECISIONS)
+        self.names = tuple(names)
+        self.colors = tuple(colors)
+        self.priorities = np.array(priorities, dtype=np.int16)
+        self.critical = np.array(critical, dtype=bool)
+        self.default = len(names) - 1
+
+        self._cols = np.array(cols, dtype=np.intp)
+        self._sign = np.array(signs, dtype=np.float32)
+        self._vals = np.array(vals, dtype=np.float32)
+        self._strict = np.array(strict, dtype=bool)
+        self._all_strict = bool(self._strict.all())
+        self._rules = [slice(a, b) for a, b in zip(starts, starts[1:] + [len(cols)])]
+
+    @classmethod
+    def from_config(cls, rules=None, thresholds=None):
+        """Rules from config if given, else the default ladder for thresholds"""
+        return cls(rules or default_rules(load_thresholds(thresholds)))
+
+    def conditions_met(self, X):
+        """(n_conditions, n) bool mask"""
+        v = np.asarray(X, dtype=np.float32).T[self._cols] * self._sign[:, None]
+        vals = self._vals[:, None]
+        if self._all_strict:
+            return v > vals
+        return np.where(self._strict[:, None], v > vals, v >= vals)
+
+    def evaluate(self, X, cond=None):
+        """Decision index per row of X (n, 4); NaN never triggers a rule"""
+        if cond is None:
+            cond = self.conditions_met(X)
+        idx = np.full(cond.shape[1], self.default, dtype=np.int16)
+        for r in range(len(self._rules) - 1, -1, -1):
+            rows = cond[self._rules[r]]
+            hit = rows[0] if len(rows) == 1 else np.logical_and.reduce(rows)
+            idx = np.where(hit, np.int16(r), idx)
+        return idx
+
+    def flags(self, X, cond=None):
+        """Per-field state labels ("HIGH" / "LOW" / "Normal") for every row"""
+        if cond is None:
+            cond = self.conditions_met(X)
+        states = {field: np.full(cond.shape[1], "Normal", dtype=object) for field in RULE_FIELDS}
+        for j, (field, op, _) in enumerate(self.conditions):
+            states[field][cond[j]] = "HIGH" if op[0] == ">" else "LOW"
+        return states
+
+
+_engines = {}
+
+
+def classify(temp, hum, hr, spo2, thresholds=THRESHOLDS):
+    """Classify one snapshot; returns (states, decision, decision_color)"""
+    key = tuple(sorted(thresholds.items()))
+    engine = _engines.get(key)
+    if engine is None:
+        engine = _engines[key] = RuleEngine(default_rules(thresholds))
+
+    X = np.array([[temp, hum, hr, spo2]], dtype=np.float32)
+    cond = engine.conditions_met(X)
+    idx = int(engine.evaluate(X, cond)[0])
+    states = {field: labels[0] for field, labels in engine.flags(X, cond).items()}
+    return states, engine.names[idx], engine.colors[idx]
+
+
+# ============================================================
+# EVENT-DRIVEN DECISIONS
+# ============================================================
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 1000.0)
+MAX_PENDING = 1_024       # batches queued for the next drain; the oldest are dropped beyond this
+
+Decision = namedtuple("Decision", "device_id decision color priority values states "
+                                  "arrival latency_ms")
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram of latencies in ms (upper bounds, plus +Inf).
+
+    observe() and reset() hold a lock, so snapshot() -- e.g. for a scrape
+    on another thread -- never sees the counts and the sum of different
+    moments.
+    """
+
+    def __init__(self, bounds=LATENCY_BUCKETS_MS):
+        self.bounds = np.asarray(bounds, dtype=np.float64)
+        self.counts = np.zeros(len(self.bounds) + 1, dtype=np.int64)
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def count(self):
+        return int(self.counts.sum())
+
+    def observe(self, values):
+        values = np.atleast_1d(np.asarray(values, dtype=np.float64))
+        if not len(values):
+            return
+        buckets = np.searchsorted(self.bounds, values, side='left')
+        total, peak = float(values.sum()), float(values.max())
+        with self._lock:
+            np.add.at(self.counts, buckets, 1)
+            self.sum += total
+            self.max = max(self.max, peak)
+
+    def snapshot(self):
+        """(counts copy, sum, max) taken together"""
+        with self._lock:
+            return self.counts.copy(), self.sum, self.max
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile"""
+        total = self.count
+        if not total:
+            return float("nan")
+        i = int(np.searchsorted(np.cumsum(self.counts), total * q / 100, side='left'))
+        return min(float(self.bounds[i]), self.max) if i < len(self.bounds) else self.max
+
+    def summary(self):
+        if not self.count:
+            return "no events"
+        return (f"n={self.count} mean={self.sum / self.count:.2f} ms "
+                f"p50<={self.percentile(50):.2f} p99<={self.percentile(99):.2f} max={self.max:.2f} ms")
+
+    def reset(self):
+        with self._lock:
+            self.counts[:] = 0
+            self.sum = self.max = 0.0
+
+
+class DecisionStream:
+    """SDN decisions made when packets arrive instead of on a timer.
+
+    The ingestion path calls submit() with each parsed batch and its
+    arrival time (time.perf_counter()). Everything submitted before the
+    next drain() is evaluated in one RuleEngine pass; each batch yields the
+    most urgent decision among its samples. Arrival-to-decision latency
+    is recorded for every batch (critical decisions also separately).
+
+    on_decision(events) receives the Decision events worth reporting: a
+    device's decision changed, it is critical, or `heartbeat` seconds
+    passed since that device was last reported.
+
+    Draining is driven by `notify` (called when the queue becomes
+    non-empty, e.g. loop.call_soon_threadsafe) or by start(), which runs a
+    worker thread. At most max_pending batches wait for a drain; older
+    ones are dropped (counted in `dropped`) rather than decided late.
+    """
+
+    def __init__(self, engine=None, on_decision=None, heartbeat=2.0, notify=None,
+                 max_pending=MAX_PENDING):
+        self.engine = engine or RuleEngine(default_rules())
+        self.on_decision = on_decision
+        self.heartbeat = heartbeat
+        self.notify = notify
+        self.latency = LatencyHistogram()
+        self.critical_latency = LatencyHistogram()
+        self.last = {}                  # device_id -> (decision, reported at)
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._stopped = False
+
+    def submit(self, device_id, records, arrival=None):
+        """Queue a parsed batch (PACKET_DTYPE or anything with the vital fields)"""
+        if not len(records):
+            return
+        if arrival is None:
+            arrival = time.perf_counter()
+        rows = np.column_stack([records[f] for f in RULE_FIELDS])
+        with self._lock:
+            first = not self._pending
+            self._pending.append((device_id, rows, arrival))
+            if len(self._pending) > self.max_pending:
+                excess = len(self._pending) - self.max_pending
+                del self._pending[:excess]
+                self.dropped += excess
+        if first:
+            self._wake.set()
+            if self.notify is not None:
+                self.notify(self.drain)
+
+    def drain(self):
+        """Decide on everything queued so far; returns the reported events"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._wake.clear()
+        if not pending:
+            return []
+
+        engine = self.engine
+        X = np.concatenate([rows for _, rows, _ in pending])
+        idx = engine.evaluate(X)
+        priority = engine.priorities[idx]
+
+        # Most urgent sample of every batch
+        chosen = np.empty(len(pending), dtype=np.intp)
+        start = 0
+        for k, (_, rows, _) in enumerate(pending):
+            stop = start + len(rows)
+            chosen[k] = start + int(priority[start:stop].argmin())
+            start = stop
+
+        decided = time.perf_counter()
+        arrivals = np.array([arrival for _, _, arrival in pending])
+        latency = (decided - arrivals) * 1000
+        critical = engine.critical[idx[chosen]]
+        self.latency.observe(latency)
+        self.critical_latency.observe(latency[critical])
+
+        now = time.time()
+        report = []
+        for k, (device_id, _, _) in enumerate(pending):
+            name = engine.names[idx[chosen[k]]]
+            prev = self.last.get(device_id)
+            if prev is None or prev[0] != name or critical[k] or now - prev[1] >= self.heartbeat:
+                self.last[device_id] = (name, now)
+                report.append(k)
+        if not report or self.on_decision is None:
+            return []
+
+        rows = chosen[report]
+        states = engine.flags(X[rows])
+        events = [Decision(pending[k][0], engine.names[idx[r]], engine.colors[idx[r]],
+                           int(priority[r]), tuple(float(v) for v in X[r]),
+                           {field: states[field][j] for field in RULE_FIELDS},
+                           pending[k][2], float(latency[k]))
+                  for j, (k, r) in enumerate(zip(report, rows))]
+        self.on_decision(events)
+        return events
+
+    # --------------------------------------------------------
+    def start(self):
+        """Drain on a worker thread as soon as anything is submitted"""
+        if self._thread is None:
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(0.5)
+            try:
+                self.drain()
+            except Exception:
+                pass            # a bad callback must not kill the decision thread
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+# ============================================================
+# BENCHMARK
+# ============================================================
+def benchmark(counts=(100, 1_000, 10_000, 100_000), reps=200):
+    """Microseconds per evaluate() tick vs number of patients"""
+    rng = np.random.default_rng(0)
+    engine = RuleEngine(default_rules())
+    print(f"{'patients':>9} {'us/tick':>9} {'ns/patient':>11}  decisions")
+    for n in counts:
+        X = np.column_stack([rng.normal(37, 0.8, n), rng.normal(60, 15, n),
+                             rng.normal(85, 20, n), rng.normal(97, 2, n)]).astype(np.float32)
+        engine.evaluate(X)
+        t0 = time.perf_counter()
+        for _ in range(reps):
+            idx = engine.evaluate(X)
+        us = (time.perf_counter() - t0) / reps * 1e6
+        counts_by = np.bincount(idx, minlength=len(engine.names))
+        print(f"{n:9d} {us:9.1f} {us * 1000 / n:11.1f}  {counts_by.tolist()}")
+
+    # Same answers as the scalar ladder
+    X = np.column_stack([rng.uniform(35, 40, 5000), rng.uniform(40, 95, 5000),
+                         rng.uniform(60, 140, 5000), rng.uniform(90, 100, 5000)]).astype(np.float32)
+    idx = engine.evaluate(X)
+    ladder = [DECISIONS[0][0] if s < 95 else DECISIONS[1][0] if h > 120 else
+              DECISIONS[2][0] if t > 38 else DECISIONS[3][0] if u > 85 else DECISIONS[4][0]
+              for t, u, h, s in X.tolist()]
+    print("matches if-chain:", [engine.names[i] for i in idx] == ladder)
+
+
+def benchmark_events(devices=200, rate=10.0, duration=3.0):
+    """Arrival-to-decision latency with a worker thread, simulated arrivals"""
+    from protocol import PACKET_DTYPE
+    rng = np.random.default_rng(1)
+    stream = DecisionStream(on_decision=lambda events: None)
+    stream.start()
+    period = 1.0 / (devices * rate)
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        rec = np.zeros(1, dtype=PACKET_DTYPE)
+        rec["temp"], rec["hum"] = 36.8, 55
+        rec["hr"], rec["spo2"] = rng.normal(85, 20), rng.normal(97, 2)
+        stream.submit(f"dev-{rng.integers(devices)}", rec)
+        time.sleep(period)
+    stream.stop()
+    print(f"{devices} devices x {rate:g} Hz")
+    print("  all:     ", stream.latency.summary())
+    print("  critical:", stream.critical_latency.summary())
+
+
+if __name__ == "__main__":
+    benchmark()
+    benchmark_events()
@@ -3,6 +3,30 @@
 #include "MAX30105.h" // Targets the SparkFun MAX3010x library structure
 #include "DHT.h"
 
+// --- OUTPUT FORMAT ---
+// 0: text packets  "TEMP:25.0|HUM:55.0|HR:72.0|SPO2:98.0"
+// 1: 20-byte binary frames (see FRAME_* in protocol.py); the Python side
+//    detects the format from the first byte it receives
+#define USE_BINARY_FRAMES 0
+#define DEVICE_ID 1
+#define FRAME_MAGIC 0xA5
+#define FRAME_VERSION 1
+
+struct __attribute__((packed)) Frame {
+  uint8_t magic;
+  uint8_t version;
+  uint16_t deviceId;
+  uint32_t seq;
+  uint32_t tsMs;
+  int16_t temp;   // all vitals in tenths
+  int16_t hum;
+  int16_t hr;
+  int16_t spo2;
+};
+
+// Explicit prototype so the IDE's generated one does not precede Frame
+void sendPacket(WiFiClient &c, const String &packet, const Frame &frame);
+
 // --- DHT CONSTANTS ---
 #define DHTPIN 4
 #define DHTTYPE DHT11
@@ -11,6 +35,7 @@
 const char* ssid = "Manoj";
 const char* password = "charactersx7";
 WiFiServer server(8080);
+WiFiClient streamClient;   // long-lived client that asked for "STREAM"
 
 // --- OBJECTS ---
 MAX30105 particleSensor;
@@ -29,6 +54,7 @@ float bpm = 0;
 float spo2 = 0; 
 uint32_t irValue = 0; 
 uint32_t redValue = 0; 
+uint32_t frameSeq = 0;
 
 // ------------------------------------------------------------------
 // --- BEAT DETECTION FUNCTION (Using 2% rise sensitivity for reliability) ---
@@ -53,6 +79,16 @@ bool myCheckForBeat(long irValue) {
 
 // ------------------------------------------------------------------
 
+void sendPacket(WiFiClient &c, const String &packet, const Frame &frame) {
+#if USE_BINARY_FRAMES
+  c.write((const uint8_t*)&frame, sizeof(frame));
+#else
+  c.println(packet);
+#endif
+}
+
+// ------------------------------------------------------------------
+
 void setup() {
   Serial.begin(115200); 
   delay(500);
@@ -173,12 +209,48 @@ void loop() {
 
   Serial.println(packet);
 
+  Frame frame;
+  frame.magic = FRAME_MAGIC;
+  frame.version = FRAME_VERSION;
+  frame.deviceId = DEVICE_ID;
+  frame.seq = ++frameSeq;
+  frame.tsMs = millis();
+  frame.temp = (int16_t)lroundf(temp * 10);
+  frame.hum = (int16_t)lroundf(hum * 10);
+  frame.hr = (int16_t)lroundf(bpm * 10);
+  frame.spo2 = (int16_t)lroundf(spo2 * 10);
+
   // ---------- SEND TO PYTHON CLIENT ----------
+  // A client that opens with "STREAM" keeps its connection and gets every
+  // packet; any other client (READ_ALL) gets one packet and is closed.
   WiFiClient client = server.available();
   if (client) {
-    client.println(packet);
-    delay(5);
-    client.stop();
+    String cmd = "";
+    unsigned long waitStart = millis();
+    while (client.connected() && millis() - waitStart < 100) {
+      if (client.available()) {
+        char c = client.read();
+        if (c == '\n') break;
+        cmd += c;
+      }
+    }
+
+    if (cmd.startsWith("STREAM")) {
+      if (streamClient) streamClient.stop();
+      streamClient = client;
+    } else {
+      sendPacket(client, packet, frame);
+      delay(5);
+      client.stop();
+    }
+  }
+
+  if (streamClient) {
+    if (streamClient.connected()) {
+      sendPacket(streamClient, packet, frame);
+    } else {
+      streamClient.stop();
+    }
   }
 
   delay(50);
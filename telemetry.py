@@ -0,0 +1,244 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import NamedTuple
+
+import numpy as np
+
+from protocol import PACKET_DTYPE
+
+log = logging.getLogger("telemetry")
+
+# ============================================================
+# TELEMETRY BUS CONFIGURATION
+# ============================================================
+QUEUE_SIZE = 1_024              # records a queue subscriber may fall behind
+DROP_POLICIES = ("oldest", "newest")
+STALE_AFTER = 10.0              # seconds without data before a device counts as disconnected
+
+
+class Record(NamedTuple):
+    """One ingested batch; its packets are numbered seq ... seq + n - 1.
+
+    packets is a read-only structured array with (at least) the
+    PACKET_DTYPE fields, so a record can be shared by every subscriber
+    without copying.
+    """
+    seq: int
+    device_id: str
+    ts: float                   # time.time() at ingestion
+    arrival: float              # time.perf_counter() when the bytes were received
+    packets: np.ndarray
+    latency_ms: float
+    throughput: float           # bits/s of this batch
+    jitter: float               # |latency - previous latency| of the device (NaN for the first)
+
+    @property
+    def n(self):
+        return len(self.packets)
+
+    @property
+    def last(self):
+        """(temp, hum, hr, spo2) of the newest packet, all from the same packet"""
+        p = self.packets[-1]
+        return float(p["temp"]), float(p["hum"]), float(p["hr"]), float(p["spo2"])
+
+
+class Snapshot(NamedTuple):
+    """Bus state at one sequence number (taken under the publish lock)"""
+    seq: int                    # packets published so far
+    latest: dict                # device_id -> newest Record
+    packets: dict               # device_id -> packets published
+    malformed: dict             # device_id -> packets that failed to parse
+
+    def age(self, device_id, now=None):
+        """Seconds since the device's last record (inf if it never sent)"""
+        rec = self.latest.get(device_id)
+        return np.inf if rec is None else (now or time.time()) - rec.ts
+
+    def connected(self, device_id, stale_after=STALE_AFTER, now=None):
+        return self.age(device_id, now) <= stale_after
+
+
+# ============================================================
+# BOUNDED QUEUE SUBSCRIPTION
+# ============================================================
+class Subscription:
+    """A bounded queue of records for a consumer on its own thread.
+
+    When the queue is full, policy "oldest" drops the oldest queued record
+    and "newest" refuses the incoming one; either way `dropped` counts it,
+    and the publisher never blocks.
+    """
+
+    def __init__(self, maxlen=QUEUE_SIZE, policy="oldest"):
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy: {policy}")
+        self.maxlen = maxlen
+        self.policy = policy
+        self._queue = deque(maxlen=maxlen if policy == "oldest" else None)
+        self._ready = threading.Event()
+        self.dropped = 0
+
+    def put(self, record):
+        if len(self._queue) >= self.maxlen:
+            self.dropped += 1
+            if self.policy == "newest":
+                return
+        self._queue.append(record)
+        self._ready.set()
+
+    def get(self, timeout=None):
+        """The next record, or None after `timeout` seconds without one"""
+        while True:
+            try:
+                return self._queue.popleft()
+            except IndexError:
+                self._ready.clear()
+                if self._queue:
+                    continue
+                if not self._ready.wait(timeout):
+                    return None
+
+    def drain(self):
+        """Every queued record, oldest first"""
+        out = []
+        while True:
+            try:
+                out.append(self._queue.popleft())
+            except IndexError:
+                return out
+
+    def __len__(self):
+        return len(self._queue)
+
+
+# ============================================================
+# PUBLISH / SUBSCRIBE BUS
+# ============================================================
+class TelemetryBus:
+    """Every ingested batch becomes one immutable, sequence-numbered Record.
+
+    publish() numbers the record, updates the per-device state and hands
+    the record to every subscriber, all under one lock, so subscribers
+    see records in sequence order and snapshot() never mixes two batches.
+    Callbacks from subscribe() run on the publishing thread and must only
+    stage work (append to a buffer, queue it) -- and never publish. A
+    callback that raises is counted in `errors` (per callback name) and
+    logged; the other callbacks and the queues still get the record.
+    subscription() gives a bounded queue for a consumer thread instead.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self._queues = []
+        self._seq = 0
+        self._latest = {}
+        self._packets = {}
+        self._malformed = {}
+        self.errors = {}            # callback name -> exceptions raised
+
+    def subscribe(self, callback):
+        """callback(record) on the publishing thread, for every record"""
+        with self._lock:
+            self._callbacks = self._callbacks + [callback]
+        return callback
+
+    def subscription(self, maxlen=QUEUE_SIZE, policy="oldest"):
+        sub = Subscription(maxlen, policy)
+        with self._lock:
+            self._queues = self._queues + [sub]
+        return sub
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._callbacks = [c for c in self._callbacks if c is not subscriber]
+            self._queues = [q for q in self._queues if q is not subscriber]
+
+    def publish(self, device_id, packets, latency_ms, nbytes, arrival=None, ts=None):
+        """Publish a PACKET_DTYPE (or FRAME_RECORD_DTYPE) batch; returns its
+        Record (None if empty). The array is made read-only, not copied."""
+        n = len(packets)
+        if n == 0:
+            return None
+        packets.flags.writeable = False
+        ts = time.time() if ts is None else ts
+        arrival = time.perf_counter() if arrival is None else arrival
+        throughput = nbytes * 8 / ((latency_ms / 1000) + 0.001)
+
+        with self._lock:
+            prev = self._latest.get(device_id)
+            jitter = np.nan if prev is None else abs(latency_ms - prev.latency_ms)
+            record = Record(self._seq, device_id, ts, arrival, packets, latency_ms, throughput, jitter)
+            self._seq += n
+            self._latest[device_id] = record
+            self._packets[device_id] = self._packets.get(device_id, 0) + n
+            for callback in self._callbacks:
+                try:
+                    callback(record)
+                except Exception:
+                    name = getattr(callback, "__name__", repr(callback))
+                    self.errors[name] = self.errors.get(name, 0) + 1
+                    log.exception("Subscriber %s failed on record %d", name, record.seq)
+            for sub in self._queues:
+                sub.put(record)
+        return record
+
+    def reject(self, device_id, count):
+        """Count packets that failed to parse"""
+        if count:
+            with self._lock:
+                self._malformed[device_id] = self._malformed.get(device_id, 0) + count
+
+    def latest(self, device_id):
+        """The device's newest Record, or None"""
+        return self._latest.get(device_id)
+
+    def snapshot(self):
+        with self._lock:
+            return Snapshot(self._seq, dict(self._latest), dict(self._packets), dict(self._malformed))
+
+
+# ============================================================
+# BENCHMARK
+# ============================================================
+def benchmark(batch_sizes=(1, 10, 100), records=200_000, queue=QUEUE_SIZE):
+    """Publish cost per record with a callback and a queue subscriber, and
+    how many records a consumer 10x slower than the publisher loses"""
+    print(f"{'packets/rec':>11} {'us/record':>10} {'records/s':>10} {'packets/s':>11} "
+          f"{'dropped':>8} {'snapshot us':>12}")
+    for size in batch_sizes:
+        bus = TelemetryBus()
+        count = [0]
+
+        def on_record(rec):
+            count[0] += rec.n
+
+        bus.subscribe(on_record)
+        sub = bus.subscription(queue, "oldest")
+        batches = [np.zeros(size, dtype=PACKET_DTYPE) for _ in range(64)]
+
+        t0 = time.perf_counter()
+        for i in range(records):
+            bus.publish("dev", batches[i & 63], 12.5, 16 * size)
+            if i % 10 == 0:
+                sub.get(0)              # slow consumer
+        per = (time.perf_counter() - t0) / records
+
+        t0 = time.perf_counter()
+        for _ in range(10_000):
+            bus.snapshot()
+        snap = (time.perf_counter() - t0) / 10_000 * 1e6
+        print(f"{size:11d} {per * 1e6:10.2f} {1 / per:10.0f} {size / per:11.0f} "
+              f"{sub.dropped:8d} {snap:12.2f}")
+
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser(description="Telemetry bus publish benchmark")
+    p.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100])
+    p.add_argument("--records", type=int, default=200_000)
+    args = p.parse_args()
+    benchmark(args.batch_sizes, args.records)
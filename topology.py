@@ -0,0 +1,145 @@
+import time
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+# ============================================================
+# TOPOLOGY CONFIGURATION
+# ============================================================
+NODE_TYPES = ('sensor', 'router', 'gateway', 'controller')
+LEGACY_RADIUS = 0.35        # what nx.random_geometric_graph(n, 0.35) used
+TARGET_DEGREE = 10.0        # mean neighbours per node for the density-aware radius
+
+# Colour value per type (sensor / router follow their traffic load)
+_TYPE_BASE = np.array([0.0, 0.5, 0.8, 1.0])
+_TYPE_LOAD = np.array([1.0, 0.5, 0.0, 0.0])
+
+
+def density_radius(n, degree=TARGET_DEGREE):
+    """Radius giving about `degree` neighbours per node in the unit square"""
+    return float(np.sqrt(degree / (np.pi * max(n - 1, 1))))
+
+
+# ============================================================
+# ARRAY-BACKED TOPOLOGY
+# ============================================================
+class Topology:
+    """A random geometric WSN kept in NumPy arrays.
+
+    pos (n, 2) float, edges (m, 2) int, battery (n,) int %, node_type (n,)
+    index into NODE_TYPES, traffic_load (n,) float. A networkx graph is
+    only built by to_networkx(), for code that needs one.
+    """
+
+    def __init__(self, pos, edges, battery, node_type, traffic_load, radius):
+        self.pos = pos
+        self.edges = edges
+        self.battery = battery
+        self.node_type = node_type
+        self.traffic_load = traffic_load
+        self.radius = radius
+        self._graph = None
+
+    def __getstate__(self):
+        # Ship the arrays only (e.g. to worker processes); the graph is rebuilt on demand
+        return dict(self.__dict__, _graph=None)
+
+    def copy(self):
+        """An independent copy of the arrays (the graph is rebuilt on demand)"""
+        return Topology(self.pos.copy(), self.edges.copy(), self.battery.copy(),
+                        self.node_type.copy(), self.traffic_load.copy(), self.radius)
+
+    @property
+    def n(self):
+        return len(self.pos)
+
+    def degree(self):
+        return np.bincount(self.edges.ravel(), minlength=self.n)
+
+    def node_colors(self):
+        """Colour values used by the topology plot (Purples colormap)"""
+        return _TYPE_BASE[self.node_type] + _TYPE_LOAD[self.node_type] * self.traffic_load
+
+    def edge_load(self):
+        """Mean traffic load of each edge's endpoints"""
+        return (self.traffic_load[self.edges[:, 0]] + self.traffic_load[self.edges[:, 1]]) / 2
+
+    def to_networkx(self):
+        """networkx Graph with a 'pos' node attribute (built once, then cached)"""
+        if self._graph is None:
+            import networkx as nx
+            G = nx.Graph()
+            G.add_nodes_from((i, {"pos": (x, y)}) for i, (x, y) in enumerate(self.pos.tolist()))
+            G.add_edges_from(self.edges.tolist())
+            self._graph = G
+        return self._graph
+
+    def as_dicts(self):
+        """(G, pos, battery, node_types, traffic_load, node_colors) like the
+        dashboard's original generate_enhanced_topology()"""
+        G = self.to_networkx()
+        nodes = range(self.n)
+        pos = dict(zip(nodes, map(tuple, self.pos.tolist())))
+        battery = dict(zip(nodes, self.battery.tolist()))
+        types = np.array(NODE_TYPES)[self.node_type]
+        node_types = dict(zip(nodes, types.tolist()))
+        traffic_load = dict(zip(nodes, self.traffic_load.tolist()))
+        return G, pos, battery, node_types, traffic_load, self.node_colors().tolist()
+
+
+def generate_topology(n, radius=None, degree=TARGET_DEGREE, seed=None):
+    """Random geometric topology in the unit square via a KD-tree radius query.
+
+    radius -- fixed connection radius; None = density-aware
+              (about `degree` neighbours per node at any n)
+    """
+    rng = np.random.default_rng(seed)
+    if radius is None:
+        radius = density_radius(n, degree)
+    pos = rng.random((n, 2))
+    edges = cKDTree(pos).query_pairs(radius, output_type='ndarray')
+    return Topology(
+        pos=pos,
+        edges=edges.astype(np.int32),
+        battery=rng.integers(10, 101, n).astype(np.int16),
+        node_type=rng.integers(0, len(NODE_TYPES), n).astype(np.uint8),
+        traffic_load=rng.uniform(0.1, 0.9, n),
+        radius=radius,
+    )
+
+
+# ============================================================
+# BENCHMARK
+# ============================================================
+def benchmark(sizes=(1_000, 10_000, 100_000), legacy_max=5_000):
+    """Generation time and size: KD-tree + arrays vs nx.random_geometric_graph(n, 0.35)"""
+    import networkx as nx
+    print(f"{'nodes':>7} {'radius':>7} {'edges':>9} {'avg deg':>8} {'arrays s':>9} "
+          f"{'MB':>6} {'to_nx s':>8} {'legacy s':>9} {'legacy edges':>13}")
+    for n in sizes:
+        t0 = time.perf_counter()
+        topo = generate_topology(n, seed=0)
+        gen = time.perf_counter() - t0
+        mb = sum(a.nbytes for a in (topo.pos, topo.edges, topo.battery,
+                                    topo.node_type, topo.traffic_load)) / 1e6
+        t0 = time.perf_counter()
+        topo.to_networkx()
+        to_nx = time.perf_counter() - t0
+
+        legacy, legacy_edges = "-", "-"
+        if n <= legacy_max:
+            t0 = time.perf_counter()
+            G = nx.random_geometric_graph(n, LEGACY_RADIUS, seed=0)
+            legacy = f"{time.perf_counter() - t0:.2f}"
+            legacy_edges = G.number_of_edges()
+        print(f"{n:7d} {topo.radius:7.4f} {len(topo.edges):9d} {topo.degree().mean():8.1f} "
+              f"{gen:9.3f} {mb:6.1f} {to_nx:8.2f} {legacy:>9} {legacy_edges:>13}")
+
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser(description="Topology generator benchmark")
+    p.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    args = p.parse_args()
+    benchmark(args.sizes)
@@ -0,0 +1,349 @@
+import calendar
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+
+import numpy as np
+
+
+# ============================================================
+# TIME-SERIES STORE CONFIGURATION
+# ============================================================
+# One file per device per (UTC) day:  <root>/<device>/<YYYY-MM-DD>[.N].tsc
+#
+# Layout: a 4 KiB header, then one contiguous column per field, each
+# `capacity` rows long. Files are created sparse at full size, so unused
+# rows cost no disk. When a day outgrows a file the next part (.1, .2, ...)
+# is started.
+COLUMNS = (("ts", "f8"),
+           ("temp", "f4"), ("hum", "f4"), ("hr", "f4"), ("spo2", "f4"),
+           ("lat", "f4"), ("thr", "f4"), ("jit", "f4"))
+DAY_CAPACITY = 864_000       # rows per file: 10 Hz for 24 h
+FLUSH_INTERVAL = 1.0         # seconds between copies of pending rows into the map
+FSYNC_INTERVAL = 5.0         # seconds between msync() of dirty files
+
+MAGIC = b"WSNTS\x00\x01\x00"
+HEADER_SIZE = 4096
+_HEADER = struct.Struct("<8sIIQQ")          # magic, version, ncols, capacity, count
+_COUNT_OFFSET = 8 + 4 + 4 + 8
+_SAFE_NAME = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def day_of(ts):
+    return time.strftime("%Y-%m-%d", time.gmtime(ts))
+
+
+def _day_start(day):
+    return calendar.timegm(time.strptime(day, "%Y-%m-%d"))
+
+
+# ============================================================
+# ONE COLUMNAR FILE
+# ============================================================
+class ColumnFile:
+    """A memory-mapped columnar file; columns are NumPy views into the map"""
+
+    def __init__(self, path, capacity=DAY_CAPACITY, writable=False):
+        self.path = path
+        exists = os.path.exists(path)
+        if not exists and not writable:
+            raise FileNotFoundError(path)
+
+        if not exists:
+            size = HEADER_SIZE + capacity * sum(np.dtype(t).itemsize for _, t in COLUMNS)
+            with open(path, 'wb') as f:
+                f.write(_HEADER.pack(MAGIC, 1, len(COLUMNS), capacity, 0))
+                f.truncate(size)                # sparse
+
+        self._file = open(path, 'r+b' if writable else 'rb')
+        access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=access)
+        magic, _, ncols, self.capacity, _ = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or ncols != len(COLUMNS):
+            raise ValueError(f"{path}: not a time-series store file")
+
+        self.columns = {}
+        offset = HEADER_SIZE
+        for name, dtype in COLUMNS:
+            col = np.frombuffer(self._mm, dtype=dtype, count=self.capacity, offset=offset)
+            self.columns[name] = col
+            offset += col.nbytes
+        self.dirty = False
+
+    @property
+    def count(self):
+        """Committed rows (re-read from the header, so other writers are seen)"""
+        return struct.unpack_from("<Q", self._mm, _COUNT_OFFSET)[0]
+
+    def write(self, rows):
+        """Copy a dict of equal-length arrays after the committed rows"""
+        start = self.count
+        n = len(rows["ts"])
+        for name, _ in COLUMNS:
+            self.columns[name][start:start + n] = rows[name]
+        # Publish only once every column holds the new rows
+        struct.pack_into("<Q", self._mm, _COUNT_OFFSET, start + n)
+        self.dirty = True
+
+    def sync(self):
+        if self.dirty:
+            self._mm.flush()
+            self.dirty = False
+
+    def view(self, t0=None, t1=None):
+        """Zero-copy column views of the committed rows with t0 <= ts < t1"""
+        n = self.count
+        ts = self.columns["ts"][:n]
+        lo = 0 if t0 is None else int(np.searchsorted(ts, t0, side='left'))
+        hi = n if t1 is None else int(np.searchsorted(ts, t1, side='left'))
+        return {name: col[lo:hi] for name, col in self.columns.items()}
+
+    def close(self):
+        self.sync()
+        self.columns = {}
+        try:
+            self._mm.close()
+        except BufferError:
+            pass        # views still alive; the map is released when they are
+        self._file.close()
+
+
+# ============================================================
+# APPEND-ONLY STORE
+# ============================================================
+class TimeSeriesStore:
+    """Append-only vitals + network-metric history on memory-mapped files.
+
+    append()/append_batch() only stage rows in memory; flush() copies them
+    into the map (FLUSH_INTERVAL) and sync() fsyncs dirty files
+    (FSYNC_INTERVAL). start() runs both on a background thread. Rows of a
+    device must be appended in timestamp order.
+
+    _lock only guards the staged rows; _write_lock serializes everything
+    that touches the open files (flush from any thread, sync, close and
+    the reader's file lookup), so two flushes never write at the same
+    committed count.
+    """
+
+    def __init__(self, root, capacity=DAY_CAPACITY,
+                 flush_interval=FLUSH_INTERVAL, fsync_interval=FSYNC_INTERVAL):
+        self.root = root
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self._pending = {}          # device -> list of row dicts / arrays
+        self._writers = {}          # (device, day) -> ColumnFile (current part)
+        self._readers = {}          # path -> ColumnFile (read-only)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    # --------------------------------------------------------
+    # WRITE PATH
+    # --------------------------------------------------------
+    def append(self, device, ts, temp, hum, hr, spo2, lat=np.nan, thr=np.nan, jit=np.nan):
+        """Stage one row"""
+        self.append_batch(device, {"ts": ts, "temp": temp, "hum": hum, "hr": hr,
+                                   "spo2": spo2, "lat": lat, "thr": thr, "jit": jit})
+
+    def append_batch(self, device, rows):
+        """Stage many rows: dict of column -> scalar or array (missing = NaN)"""
+        n = np.size(rows["ts"])
+        batch = {}
+        for name, dtype in COLUMNS:
+            val = rows.get(name, np.nan)
+            batch[name] = np.broadcast_to(np.asarray(val, dtype=dtype), (n,)).copy()
+        with self._lock:
+            self._pending.setdefault(device, []).append(batch)
+
+    def _path(self, device, day, part):
+        suffix = f".{part}" if part else ""
+        return os.path.join(self.root, _SAFE_NAME.sub("_", device), f"{day}{suffix}.tsc")
+
+    def _writer(self, device, day):
+        key = (device, day)
+        cf = self._writers.get(key)
+        if cf is not None and cf.count < cf.capacity:
+            return cf
+        if cf is not None:
+            cf.close()
+
+        os.makedirs(os.path.dirname(self._path(device, day, 0)), exist_ok=True)
+        part = 0
+        while True:
+            path = self._path(device, day, part)
+            cf = self._readers.pop(path, None)
+            if cf is not None:
+                cf.close()
+            cf = ColumnFile(path, self.capacity, writable=True)
+            if cf.count < cf.capacity:
+                break
+            cf.close()
+            part += 1
+        self._writers[key] = cf
+        return cf
+
+    def flush(self):
+        """Copy staged rows into the mapped files"""
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            for device, batches in pending.items():
+                self._flush_device(device, batches)
+
+    def _flush_device(self, device, batches):
+        rows = {name: np.concatenate([b[name] for b in batches]) for name, _ in COLUMNS}
+        days = np.array([day_of(t) for t in rows["ts"][[0, -1]]])
+        if days[0] == days[1]:
+            self._write_day(device, days[0], rows)
+            return
+        # Batch straddles midnight (UTC): split per day
+        labels = np.array([day_of(t) for t in rows["ts"]])
+        for day in np.unique(labels):
+            mask = labels == day
+            self._write_day(device, day, {k: v[mask] for k, v in rows.items()})
+
+    def _write_day(self, device, day, rows):
+        start = 0
+        n = len(rows["ts"])
+        while start < n:
+            cf = self._writer(device, day)
+            take = min(n - start, cf.capacity - cf.count)
+            cf.write({k: v[start:start + take] for k, v in rows.items()})
+            start += take
+
+    def sync(self):
+        """fsync every file written since the last sync"""
+        with self._write_lock:
+            for cf in self._writers.values():
+                cf.sync()
+
+    def start(self):
+        """Flush / fsync on a background daemon thread"""
+        if self._thread is not None:
+            return self._thread
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def _run(self):
+        last_sync = time.monotonic()
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+            if time.monotonic() - last_sync >= self.fsync_interval:
+                self.sync()
+                last_sync = time.monotonic()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        with self._write_lock:
+            for cf in list(self._writers.values()) + list(self._readers.values()):
+                cf.close()
+            self._writers.clear()
+            self._readers.clear()
+
+    # --------------------------------------------------------
+    # READ PATH
+    # --------------------------------------------------------
+    def devices(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d for d in os.listdir(self.root)
+                      if os.path.isdir(os.path.join(self.root, d)))
+
+    def _files_for(self, device, t0, t1):
+        day = day_of(t0)
+        end = day_of(t1)
+        while day <= end:
+            part = 0
+            while True:
+                path = self._path(device, day, part)
+                if not os.path.exists(path):
+                    break
+                yield path
+                part += 1
+            day = day_of(_day_start(day) + 86400)
+
+    def _open(self, path):
+        with self._write_lock:
+            for cf in self._writers.values():
+                if cf.path == path:
+                    return cf
+            cf = self._readers.get(path)
+            if cf is None:
+                cf = self._readers[path] = ColumnFile(path)
+            return cf
+
+    def segments(self, device, t0, t1):
+        """Per-file zero-copy views covering t0 <= ts < t1"""
+        out = []
+        for path in self._files_for(device, t0, t1):
+            view = self._open(path).view(t0, t1)
+            if len(view["ts"]):
+                out.append(view)
+        return out
+
+    def read(self, device, t0, t1=None):
+        """Column views for a time range (zero-copy unless it spans files)"""
+        if t1 is None:
+            t1 = time.time() + 1
+        segs = self.segments(device, t0, t1)
+        if len(segs) == 1:
+            return segs[0]
+        if not segs:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS}
+        return {name: np.concatenate([s[name] for s in segs]) for name, _ in COLUMNS}
+
+
+# ============================================================
+# BENCHMARK
+# ============================================================
+def benchmark(root, rows=2_000_000, batch=1000, hours=6):
+    """Append throughput and range-read latency"""
+    import shutil
+    shutil.rmtree(root, ignore_errors=True)
+    store = TimeSeriesStore(root)
+    t_start = time.time() - hours * 3600
+    ts = t_start + np.arange(rows) * (hours * 3600 / rows)
+    vals = np.random.default_rng(0).uniform(50, 100, rows).astype(np.float32)
+
+    t0 = time.perf_counter()
+    for i in range(0, rows, batch):
+        store.append_batch("bench", {"ts": ts[i:i + batch], "temp": vals[i:i + batch],
+                                     "hum": vals[i:i + batch], "hr": vals[i:i + batch],
+                                     "spo2": vals[i:i + batch], "lat": 5.0})
+        if (i // batch) % 50 == 0:
+            store.flush()
+    store.flush()
+    store.sync()
+    write_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    reps = 200
+    for _ in range(reps):
+        view = store.read("bench", ts[-1] - 3600, ts[-1] + 1)
+    read_us = (time.perf_counter() - t0) / reps * 1e6
+    print(f"rows: {rows}  over {hours} h")
+    print(f"append+flush+fsync: {rows / write_s:,.0f} rows/s")
+    print(f"read last hour: {len(view['ts']):,} rows in {read_us:.0f} us "
+          f"(zero-copy: {not view['hr'].flags.owndata})")
+    store.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+    p = argparse.ArgumentParser(description="Time-series store benchmark")
+    p.add_argument("--rows", type=int, default=2_000_000)
+    p.add_argument("--root", default=os.path.join(tempfile.gettempdir(), "tsstore-bench"))
+    args = p.parse_args()
+    benchmark(args.root, args.rows)
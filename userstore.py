@@ -0,0 +1,266 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+# ============================================================
+# USER STORE CONFIGURATION
+# ============================================================
+# One SQLite file; username is the primary key and email has its own
+# index, so a login or a "forgot password" lookup is one B-tree probe
+# instead of parsing (and rewriting) the whole users.json.
+FLUSH_INTERVAL = 2.0            # seconds between batched last_login writes
+SCHEMA_VERSION = 1              # PRAGMA user_version once the schema (and migration) is done
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username   TEXT PRIMARY KEY,
+    password   TEXT NOT NULL,
+    email      TEXT,
+    created_at TEXT,
+    last_login TEXT
+);
+CREATE INDEX IF NOT EXISTS users_email ON users(email);
+"""
+_FIELDS = ("username", "password", "email", "created_at", "last_login")
+
+
+def now():
+    return time.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _legacy_record(username, entry):
+    # users.json holds bare hash strings (early accounts) and dicts
+    if isinstance(entry, str):
+        return (username, entry, None, None, None)
+    return (username, entry.get("password", ""), entry.get("email"),
+            entry.get("created_at"), entry.get("last_login"))
+
+
+# ============================================================
+# INDEXED USER STORE
+# ============================================================
+class UserStore:
+    """User accounts in SQLite with an in-memory read cache.
+
+    get() / find_by_email() hit the cache first and the indexes on a
+    miss; records are plain dicts (treat them as read-only). touch()
+    only stamps last_login in the cache and stages it -- flush() writes
+    all staged logins in one transaction, and start() runs it every
+    FLUSH_INTERVAL seconds on a background thread. The first open of a
+    fresh database imports `legacy_json` once.
+    """
+
+    def __init__(self, path, legacy_json=None, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._lock = threading.Lock()       # one connection, shared by the GUI and flush threads
+        self._cache = {}                    # username -> record (None = known missing)
+        self._emails = {}                   # email -> username (None = known missing)
+        self._pending = {}                  # username -> last_login to write
+        self._thread = None
+        self._stop = threading.Event()
+        self.migrated = 0
+        with self._lock, self._db:
+            self._db.executescript(_SCHEMA)
+            if self._db.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                if legacy_json:
+                    self.migrated = self._import_json(legacy_json)
+                self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _import_json(self, path):
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path, 'r') as f:
+                users = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        rows = [_legacy_record(u, e) for u, e in users.items()]
+        self._db.executemany("INSERT OR IGNORE INTO users VALUES (?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    # --------------------------------------------------------
+    # READ PATH
+    # --------------------------------------------------------
+    def get(self, username):
+        """The user's record, or None"""
+        if username in self._cache:
+            return self._cache[username]
+        with self._lock:
+            row = self._db.execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
+        record = dict(zip(_FIELDS, row)) if row else None
+        if record is not None and username in self._pending:
+            record["last_login"] = self._pending[username]
+        self._cache[username] = record
+        return record
+
+    def find_by_email(self, email):
+        """Username of the (first) account registered with `email`, or None"""
+        if email in self._emails:
+            return self._emails[email]
+        with self._lock:
+            row = self._db.execute("SELECT username FROM users WHERE email = ? LIMIT 1",
+                                   (email,)).fetchone()
+        self._emails[email] = username = row[0] if row else None
+        return username
+
+    def __contains__(self, username):
+        return self.get(username) is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    # --------------------------------------------------------
+    # WRITE PATH
+    # --------------------------------------------------------
+    def add(self, username, password, email=None, created_at=None):
+        """Insert a new account; False if the username is taken"""
+        record = {"username": username, "password": password, "email": email,
+                  "created_at": created_at or now(), "last_login": None}
+        try:
+            with self._lock, self._db:
+                self._db.execute("INSERT INTO users VALUES (?, ?, ?, ?, ?)",
+                                 tuple(record[k] for k in _FIELDS))
+        except sqlite3.IntegrityError:
+            return False
+        self._cache[username] = record
+        if email is not None and self._emails.get(email) is None:
+            self._emails[email] = username
+        return True
+
+    def set_password(self, username, password):
+        """Replace a stored password hash (written at once)"""
+        with self._lock, self._db:
+            self._db.execute("UPDATE users SET password = ? WHERE username = ?", (password, username))
+        record = self._cache.get(username)
+        if record is not None:
+            record["password"] = password
+
+    def touch(self, username, when=None):
+        """Stamp a login; written to disk by the next flush()"""
+        when = when or now()
+        record = self.get(username)
+        if record is not None:
+            record["last_login"] = when
+        with self._lock:
+            self._pending[username] = when
+
+    def flush(self):
+        """Write staged last_login stamps in one transaction"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            if pending:
+                with self._db:
+                    self._db.executemany("UPDATE users SET last_login = ? WHERE username = ?",
+                                         [(t, u) for u, t in pending.items()])
+
+    def start(self):
+        """Flush on a background daemon thread"""
+        if self._thread is not None:
+            return self._thread
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        with self._lock:
+            self._db.close()
+
+
+# ============================================================
+# BENCHMARK
+# ============================================================
+def _legacy_login(path, username, password):
+    # What app2.login_user() did before: parse users.json, rewrite it with indent=4
+    with open(path, 'r') as f:
+        users = json.load(f)
+    ok = username in users and users[username]['password'] == password
+    if ok:
+        users[username]['last_login'] = now()
+        with open(path, 'w') as f:
+            json.dump(users, f, indent=4)
+    return ok
+
+
+def _legacy_find_email(path, email):
+    with open(path, 'r') as f:
+        users = json.load(f)
+    for user, data in users.items():
+        if data['email'] == email:
+            return user
+    return None
+
+
+def benchmark(sizes=(100, 1_000, 5_000), logins=500):
+    """ms per login / email lookup: users.json vs UserStore (cold and cached)"""
+    import random
+    import tempfile
+
+    print(f"{'users':>6} {'json login':>11} {'json email':>11} {'store login':>12} "
+          f"{'cached':>7} {'store email':>12} {'migrate s':>10}")
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            legacy = os.path.join(tmp, "users.json")
+            users = {f"user{i}": {"password": f"{i:064x}", "email": f"user{i}@ward.example",
+                                  "created_at": now(), "last_login": None} for i in range(n)}
+            with open(legacy, 'w') as f:
+                json.dump(users, f, indent=4)
+            names = [f"user{random.randrange(n)}" for _ in range(logins)]
+            sample = names[:max(1, logins // 10)]
+
+            t0 = time.perf_counter()
+            for u in sample:
+                _legacy_login(legacy, u, users[u]["password"])
+            json_login = (time.perf_counter() - t0) / len(sample) * 1000
+            t0 = time.perf_counter()
+            for u in sample:
+                _legacy_find_email(legacy, users[u]["email"])
+            json_email = (time.perf_counter() - t0) / len(sample) * 1000
+
+            t0 = time.perf_counter()
+            store = UserStore(os.path.join(tmp, "users.db"), legacy_json=legacy)
+            migrate = time.perf_counter() - t0
+
+            def logins_ms():
+                t0 = time.perf_counter()
+                for u in names:
+                    if store.get(u)["password"] == users[u]["password"]:
+                        store.touch(u)
+                store.flush()
+                return (time.perf_counter() - t0) / len(names) * 1000
+
+            cold, cached = logins_ms(), logins_ms()
+            t0 = time.perf_counter()
+            for u in names:
+                store.find_by_email(users[u]["email"])
+            email = (time.perf_counter() - t0) / len(names) * 1000
+            store.close()
+        print(f"{n:6d} {json_login:11.3f} {json_email:11.3f} {cold:12.4f} "
+              f"{cached:7.4f} {email:12.4f} {migrate:10.3f}")
+
+
+if __name__ == "__main__":
+    import argparse
+    p = argparse.ArgumentParser(description="User store lookup benchmark")
+    p.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 5_000])
+    p.add_argument("--logins", type=int, default=500)
+    args = p.parse_args()
+    benchmark(args.sizes, args.logins)